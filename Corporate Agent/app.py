@@ -1,58 +1,186 @@
 import streamlit as st
 import os
-import json
-from utils.parser import extract_text_from_docx
-from utils.type_detector import detect_document_type
-from utils.checklist import check_required_docs
-from utils.redflags import detect_red_flags
-from utils.commenter import comment_on_docx
-from utils.summarizer import generate_summary_json
-from utils.rag_engine import query_rag
+import time
+from utils.checklist import check_required_docs, get_default_registry, CHECKLIST_VERSION
+from utils.pipeline import review_uploads
+from utils.job_queue import get_job_queue
+from utils.review_cache import get_review_cache
+from utils.summarizer import SummarySink, summary_bytes, summary_filename
+from utils.rag_engine import embedding_stats, query_rag_with_timings, prewarm_rag_async
+from utils.session_index import SessionIndex, session_stats
+from utils.metrics import get_metrics, profile, serve_prometheus
 
 # Ensure directories exist
-os.makedirs("temp", exist_ok=True)
 os.makedirs("outputs", exist_ok=True)
 
 st.set_page_config(page_title="Corporate Agent", layout="wide")
+
+# Summaries go to one JSONL run file per upload set in a session (see
+# summary_run); SUMMARY_PER_FILE=1 also writes the old one-JSON-per-document files
+SUMMARY_PER_FILE = os.getenv("SUMMARY_PER_FILE", "0") == "1"
+
+# Stream RAG answers token by token; RAG_STREAMING=0 waits for the full answer
+RAG_STREAMING = os.getenv("RAG_STREAMING", "1") != "0"
+
+# The RAG stack loads lazily on the first question. Set RAG_PREWARM=1 to
+# load it in the background once per process instead.
+if os.getenv("RAG_PREWARM") == "1":
+    prewarm_rag_async()
+
+# Prometheus metrics: METRICS_PORT serves /metrics over HTTP, METRICS_FILE is
+# rewritten after every run (e.g. for node_exporter's textfile collector)
+if os.getenv("METRICS_PORT"):
+    serve_prometheus(int(os.getenv("METRICS_PORT")))
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+
+# Uploads are reviewed by background workers (utils/job_queue.py) and the
+# page polls their progress; JOB_QUEUE=0 reviews inside the script run instead
+USE_JOB_QUEUE = os.getenv("JOB_QUEUE", "1") != "0"
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+# Profiles of the review and Q&A steps go here when enabled in the sidebar
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+
+def wait_for_review_job(uploaded_files: list) -> list:
+    """
+    Results of the background review job for these uploads. While it runs,
+    show per-document progress and re-run the script until it is done.
+    Submitting reads and hashes every upload and writes to the job table, so
+    it happens once per change in the upload set (names, sizes and upload
+    IDs); other re-runs, each progress poll included, only read the status.
+    """
+    queue = get_job_queue()
+    upload_set = tuple((f.name, f.size, getattr(f, "file_id", None)) for f in uploaded_files)
+    job = st.session_state.get("review_job")
+    if job is None or job[0] != upload_set:
+        job = (upload_set, queue.submit([(f.name, f.getvalue()) for f in uploaded_files]))
+        st.session_state.review_job = job
+    job_id = job[1]
+    finished = st.session_state.get("job_results")
+    if finished and finished[0] == job_id:
+        return finished[1]
+
+    status = queue.status(job_id)
+    if status["status"] != "done":
+        st.progress(status["finished"] / max(1, status["total"]),
+                    text=f"Reviewed {status['finished']} of {status['total']} documents")
+        icons = {"queued": "⏳", "running": "⚙️", "done": "✅", "error": "❌"}
+        for item in status["items"]:
+            seconds = f" ({item['seconds']:.1f}s)" if item["seconds"] is not None else ""
+            st.write(f"{icons.get(item['status'], '')} {item['filename']} – {item['status']}{seconds}")
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+    results = queue.results(job_id)
+    st.session_state.job_results = (job_id, results)
+    return results
+
+
+def summary_run(all_docs: list):
+    """
+    (sink, memo) for this session's current upload set. A different set
+    closes the previous run first, so its run record is written, and starts
+    a new one. The memo maps (sha256, summary key) to the summary already
+    added for that document; it lives in session_state because review cache
+    entries are shared by every session of the process.
+    """
+    uploads = tuple((doc["filename"], doc["sha256"]) for doc in all_docs)
+    run = st.session_state.get("summary_run")
+    if run is None or run["uploads"] != uploads:
+        close_summary_run()
+        run = {"uploads": uploads, "sink": SummarySink("outputs", per_file=SUMMARY_PER_FILE), "memo": {}}
+        st.session_state.summary_run = run
+    return run["sink"], run["memo"]
+
+
+def close_summary_run():
+    """Finish the session's summary run, if any: flush it and append its run record."""
+    run = st.session_state.pop("summary_run", None)
+    if run is not None:
+        run["sink"].close()
+
+
+def render_diagnostics():
+    """Sidebar panel with per-stage latencies and counters since the process started."""
+    metrics = get_metrics()
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("🩺 Diagnostics"):
+        st.caption(f"Process metrics, up {snapshot['uptime_seconds']:.0f}s")
+        if snapshot["stages"]:
+            st.table([dict(stage=name, **values) for name, values in snapshot["stages"].items()])
+        else:
+            st.write("No stages recorded yet.")
+        if snapshot["counters"]:
+            st.table([
+                {"counter": c["name"], "labels": ", ".join(f"{k}={v}" for k, v in c["labels"].items()),
+                 "value": c["value"]}
+                for c in snapshot["counters"]
+            ])
+        st.write({"review_cache": get_review_cache().stats(), "upload_index": session_stats(),
+                  "embeddings": embedding_stats()})
+        st.download_button("⬇️ Prometheus metrics", data=metrics.render_prometheus(),
+                           file_name="corporate_agent.prom", mime="text/plain")
+    if METRICS_FILE:
+        metrics.write_prometheus(METRICS_FILE)
+
+
 st.title("📄 Corporate Agent – ADGM Legal Document Reviewer")
 
 uploaded_files = st.file_uploader(
     "Upload one or more .docx files", type=["docx"], accept_multiple_files=True
 )
+process = st.selectbox("Process", get_default_registry().processes())
+profiling = st.sidebar.checkbox(
+    "Profile this request", value=os.getenv("PROFILE_REQUESTS") == "1",
+    help=f"cProfile (or pyinstrument with PROFILER=pyinstrument) reports in {PROFILE_DIR}/; "
+         "documents are reviewed in one process while this is on",
+)
 
 if uploaded_files:
     all_docs = []
     doc_types = []
 
-    with st.spinner("Processing uploaded documents..."):
-        for uploaded in uploaded_files:
-            temp_path = os.path.join("temp", uploaded.name)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded.getbuffer())
-
-            # extract text
-            text = extract_text_from_docx(temp_path) or ""
-            doc_type = detect_document_type(text) or "Unknown"
-            flags = detect_red_flags(text, doc_type) or []
-
-            # attempt to add comments (safe implementation)
-            try:
-                updated_path = comment_on_docx(temp_path, flags)
-            except Exception as e:
-                st.error(f"Failed to add comments to {uploaded.name}: {e}")
-                updated_path = temp_path
-
-            all_docs.append({
-                "filename": uploaded.name,
-                "type": doc_type,
-                "flags": flags,
-                "updated_path": updated_path,
-                "content": text
-            })
-            doc_types.append(doc_type)
+    review_profile = {"path": None}
+    if USE_JOB_QUEUE and not profiling:
+        # extract -> detect type -> red flags -> comment in the background
+        # workers; files already reviewed (same bytes, same rules) come from the cache
+        reviewed = wait_for_review_job(uploaded_files)
+    else:
+        uploads = [(uploaded.name, uploaded.getvalue()) for uploaded in uploaded_files]
+        # Worker processes are invisible to the profiler, so review in-process then
+        with st.spinner("Processing uploaded documents..."), \
+                profile("review", PROFILE_DIR, enabled=profiling) as review_profile:
+            reviewed = review_uploads(uploads, workers=1 if profiling else None)
+
+    for result in reviewed:
+        if result["error"]:
+            st.error(result["error"])
+
+        all_docs.append({
+            "filename": result["filename"],
+            "type": result["type"],
+            "type_scores": result["type_scores"],
+            "flags": result["flags"],
+            "updated_path": result["updated_path"],
+            "reviewed_bytes": result["reviewed_bytes"],
+            "content": result["content"],
+            "sha256": result["sha256"],
+            "timings": result["timings"],
+        })
+        doc_types.append(result["type"])
+
+    if review_profile["path"]:
+        st.caption(f"Review profile: {review_profile['path']}")
+
+    cache_stats = get_review_cache().stats()
+    st.caption(
+        f"Review cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+        f"{cache_stats['misses']} misses, {cache_stats['entries']} entries"
+    )
 
     # Checklist verification
-    checklist_result = check_required_docs(doc_types, "incorporation", documents=all_docs)
+    checklist_result = check_required_docs(doc_types, process, documents=all_docs)
 
     st.subheader("📋 Checklist Verification")
     st.write({
@@ -68,28 +196,24 @@ if uploaded_files:
 
     # Summaries
     st.subheader("🧾 Document Summaries")
+    summary_sink, summary_memo = summary_run(all_docs)
     for i, doc in enumerate(all_docs):
-        try:
-            summary_path = generate_summary_json(
-                filename=doc["filename"],
-                doc_type=doc["type"],
-                checklist_result=checklist_result,
-                red_flags=doc["flags"],
-                save_path="outputs",
-                content=doc.get("content", "")
-            )
-        except TypeError:
-            summary_path = generate_summary_json(
-                doc["filename"], doc["type"], checklist_result, doc["flags"], "outputs", doc.get("content", "")
+        # Summaries only change with the checklist outcome; reuse the dict otherwise
+        summary_key = "|".join(
+            [CHECKLIST_VERSION, doc["filename"], str(checklist_result.get("status"))]
+            + list(checklist_result.get("missing_docs", []))
+        )
+        summary_json = summary_memo.get((doc["sha256"], summary_key))
+        if summary_json is None:
+            summary_json = summary_sink.add(
+                doc["filename"], doc["type"], checklist_result, doc["flags"],
+                timings=doc["timings"], extra={"sha256": doc["sha256"]},
             )
-
-        try:
-            with open(summary_path, "r", encoding="utf-8") as f:
-                summary_json = json.load(f)
-        except Exception:
-            summary_json = {"error": "Failed to load summary JSON."}
+            summary_memo[(doc["sha256"], summary_key)] = summary_json
 
         st.markdown(f"### 📑 {doc['filename']} ({doc['type']})")
+        if doc["type_scores"]:
+            st.caption("Type confidence: " + ", ".join(f"{name} {conf:.0%}" for name, conf in doc["type_scores"]))
         if doc["flags"]:
             st.write("🚩 Issues Found:")
             for flag in doc["flags"]:
@@ -100,8 +224,7 @@ if uploaded_files:
             st.info("No red flags detected.")
 
         try:
-            with open(doc["updated_path"], "rb") as fh:
-                reviewed_bytes = fh.read()
+            reviewed_bytes = doc["reviewed_bytes"]
             reviewed_name = os.path.splitext(doc["filename"])[0] + "_reviewed.docx"
             st.download_button(
                 "⬇️ Download Reviewed Document",
@@ -117,18 +240,61 @@ if uploaded_files:
         st.json(summary_json)
         st.download_button(
             "⬇️ Download Summary JSON",
-            data=json.dumps(summary_json, ensure_ascii=False, indent=4),
-            file_name=os.path.basename(summary_path),
+            data=summary_bytes(summary_json),
+            file_name=os.path.basename(summary_json.get("summary_path") or summary_filename(doc["filename"])),
             key=f"download_summary_{i}",
             mime="application/json",
         )
 
+    summary_sink.flush()
+    st.caption(f"Summaries for run {summary_sink.run_id}: {summary_sink.path}")
+
     # RAG
     st.subheader("🤖 RAG Engine (local)")
     query = st.text_input("Ask a question about the uploaded docs (e.g. 'Does the AoA mention quorum?'):")
 
     if query:
-        response = query_rag(query)
-        st.success(response)
+        # Uploads are indexed for Q&A on the first question only, so the
+        # review-only path never loads the embedding model. The index lives
+        # in session_state and is dropped with the session.
+        if "upload_index" not in st.session_state:
+            st.session_state.upload_index = SessionIndex()
+        with st.spinner("Indexing uploaded documents for Q&A..."):
+            st.session_state.upload_index.sync(
+                [(doc["sha256"], doc["filename"], doc["content"]) for doc in all_docs]
+            )
+        with profile("rag_query", PROFILE_DIR, enabled=profiling) as rag_profile:
+            result = query_rag_with_timings(
+                query, session_index=st.session_state.upload_index, stream=RAG_STREAMING
+            )
+            if result["stream"] is not None:
+                # Render the answer as Gemini streams it instead of after the last token
+                answer_box = st.empty()
+                answer = ""
+                for piece in result["stream"]:
+                    answer += piece
+                    answer_box.success(answer + " ▌")
+                answer_box.success(answer)
+            else:
+                st.success(result["answer"])
+        if rag_profile["path"]:
+            st.caption(f"Q&A profile: {rag_profile['path']}")
+        if result["cache"]:
+            st.caption(f"Cached answer ({result['cache']} match) in {result['total_time'] * 1000:.0f} ms")
+        else:
+            # None when the stream ended before any text arrived
+            first_token = result["first_token_time"]
+            st.caption(
+                f"Index load: {result['load_time']:.2f}s · "
+                f"Embed: {result['embed_time']:.2f}s · "
+                f"Retrieve: {result['retrieve_time']:.2f}s · "
+                f"First token: {f'{first_token:.2f}s' if first_token is not None else 'n/a'} · "
+                f"LLM: {result['llm_time']:.2f}s ({result['context_tokens']} context tokens, "
+                f"{result['upload_chunks']} from uploads) · "
+                f"Total: {result['total_time']:.2f}s"
+            )
 else:
+    close_summary_run()
     st.info("Upload one or more .docx files to start the review.")
+
+render_diagnostics()
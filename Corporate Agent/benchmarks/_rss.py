@@ -0,0 +1,22 @@
+"""Peak-memory helper for the benchmark probes."""
+import resource
+import sys
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process in MB.
+
+    On Linux VmHWM is used: unlike ru_maxrss it is reset on exec, so a probe
+    started from a large benchmark process doesn't inherit the parent's peak.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
@@ -0,0 +1,144 @@
+"""
+Approximate-search evaluation: recall@k against the exact flat index, query
+latency and index size for each FAISS configuration, so a configuration can
+be chosen before running reindex_cli.py.
+
+Vectors come from the RAG store (or a synthetic clustered corpus of the
+requested size, to see how the options scale). Queries are corpus vectors
+plus a little noise, so no embedding model is needed.
+
+Usage:
+    python benchmarks/ann_eval.py [--store utils/vector_store] [--synthetic 100000]
+        [--kinds flat ivf_flat hnsw ivf_pq ivf_sq8] [--nprobe 1 4 16 64]
+        [--ef-search 16 64 256] [--k 5] [--queries 500] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from utils.ann_index import (  # noqa: E402
+    INDEX_KINDS, build_index, exact_vectors, index_spec, resolve_store_dir, set_search_params,
+)
+from utils.rag_engine import PERSIST_DIR  # noqa: E402
+
+
+def store_vectors(store_dir: str):
+    import faiss
+
+    store_dir = resolve_store_dir(store_dir)
+    index = faiss.read_index(os.path.join(store_dir, "default__vector_store.json"))
+    return exact_vectors(store_dir, index)
+
+
+def synthetic_vectors(n: int, dim: int = 384, clusters: int = 200, seed: int = 0):
+    """Unit vectors around random topic centres, roughly like sentence embeddings."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype("float32")
+    x = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def make_queries(vectors, count: int, noise: float = 0.05, seed: int = 1):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), count)]
+    q = picked + noise * rng.standard_normal(picked.shape).astype("float32")
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype("float32")
+
+
+def recall_at_k(found, truth, k: int) -> float:
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (k * len(truth))
+
+
+def measure(index, queries, truth, k: int) -> dict:
+    import faiss
+
+    # One query at a time, like the app, for latency percentiles
+    latencies, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    latencies.sort()
+
+    start = time.perf_counter()
+    index.search(queries, k)
+    batch = time.perf_counter() - start
+
+    return {
+        "recall": recall_at_k(found, truth, k),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000,
+        "batch_qps": len(queries) / batch if batch else float("inf"),
+        "size_mb": faiss.serialize_index(index).size / 2**20,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--store", default=PERSIST_DIR, help="vector store to read vectors from")
+    ap.add_argument("--synthetic", type=int, help="use N synthetic vectors instead of the store")
+    ap.add_argument("--kinds", nargs="+", default=list(INDEX_KINDS),
+                    help="index kinds or FAISS index_factory strings")
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--json", help="also write the results here")
+    args = ap.parse_args()
+
+    import faiss
+
+    vectors = synthetic_vectors(args.synthetic) if args.synthetic else store_vectors(args.store)
+    n, dim = vectors.shape
+    queries = make_queries(vectors, args.queries)
+    k = min(args.k, n)
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    print(f"{n} vectors x {dim} dims, {len(queries)} queries, recall@{k} vs exact search")
+    print(f"{'spec':<22} {'param':<12} {'build s':>8} {'recall':>7} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'batch qps':>10} {'size MB':>8}")
+
+    results = []
+    for kind in args.kinds:
+        spec = index_spec(kind, n, dim)
+        start = time.perf_counter()
+        index = build_index(vectors, spec)
+        build = time.perf_counter() - start
+
+        if "IVF" in spec:
+            params = [("nprobe", p) for p in args.nprobe]
+        elif "HNSW" in spec:
+            params = [("ef_search", e) for e in args.ef_search]
+        else:
+            params = [("", None)]
+
+        for name, value in params:
+            set_search_params(index, **({name: value} if name else {}))
+            row = {"spec": spec, "param": f"{name}={value}" if name else "-", "build_s": build}
+            row.update(measure(index, queries, truth, k))
+            results.append(row)
+            print(f"{row['spec']:<22} {row['param']:<12} {build:>8.2f} {row['recall']:>7.3f} "
+                  f"{row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} {row['batch_qps']:>10.0f} "
+                  f"{row['size_mb']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": n, "dim": dim, "k": k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+RAG answer cache benchmark: exact and near-duplicate lookup latency for
+caches of 100 to 10,000 answers with 384-dim (MiniLM-sized) embeddings.
+
+Compare against the uncached path that query_rag_with_timings reports
+(embed + retrieve + a Gemini round trip, typically 1-5 s).
+
+Usage:
+    python benchmarks/answer_cache_bench.py [--lookups 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.answer_cache import AnswerCache  # noqa: E402
+
+DIM = 384
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--lookups", type=int, default=200)
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'entries':>8} {'exact us':>10} {'semantic us':>12} {'miss us':>10}")
+    for n in (100, 1000, 10000):
+        cache = AnswerCache(path=None, max_entries=n)
+        vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+        for i in range(n):
+            cache.put(f"question {i}?", [f"node-{i}"], f"answer {i}", vectors[i])
+
+        picks = rng.integers(0, n, size=args.lookups)
+        start = time.perf_counter()
+        for i in picks:
+            cache.lookup(f"Question {i}", [f"node-{i}"], vectors[i])
+        exact = (time.perf_counter() - start) / args.lookups
+
+        # a paraphrase: same question, slightly perturbed embedding, other nodes
+        start = time.perf_counter()
+        for i in picks:
+            cache.lookup(f"reworded {i}", ["other"], vectors[i] + rng.normal(scale=0.05, size=DIM))
+        semantic = (time.perf_counter() - start) / args.lookups
+
+        start = time.perf_counter()
+        for _ in picks:
+            cache.lookup("unrelated", ["other"], rng.normal(size=DIM))
+        miss = (time.perf_counter() - start) / args.lookups
+
+        stats = cache.stats()
+        assert stats["semantic_hits"] == args.lookups, stats
+        print(f"{n:>8} {exact * 1e6:>10.1f} {semantic * 1e6:>12.1f} {miss * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Checklist engine benchmark: the compiled registry (utils/checklist.py),
+per pack and batched with check_packs(), versus the original
+check_required_docs that rebuilt its tables and re-scanned every content
+once per required section on each call. Runs synthetic company packs with
+the default incorporation process and with a custom checklist that adds
+allowed types, a minimum length and required sections, and checks that
+both implementations agree.
+
+Usage:
+    python benchmarks/checklist_bench.py [--packs 10000] [--kb 2] [--sections 8] [--seed 0]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.checklist import check_packs, check_required_docs, get_default_registry  # noqa: E402
+
+TYPES = ["Articles of Association", "Memorandum of Association", "Board Resolution",
+         "Shareholder Resolution", "Incorporation Form", "UBO Form",
+         "Register of Members and Directors", "Address Notice", "Employment Contract", "Unknown"]
+FILENAMES = ["aoa_final.docx", "moa_signed.docx", "board_resolution.docx", "ubo_form.docx",
+             "register.docx", "misc_notes.docx", "address_notice_v2.docx", "draft.docx"]
+BASE_SECTIONS = ["Share Capital", "Directors", "Governing Law", "Registered Office", "Dissolution",
+                 "Interpretation", "General Meetings", "Dividends"]
+WORDS = ["company", "shall", "director", "member", "notice", "resolution", "capital", "adgm",
+         "registered", "office", "meeting", "share", "the", "of", "in", "any"]
+
+
+
+def make_sections(n: int) -> list:
+    """The base headings, then numbered schedules up to n."""
+    return (BASE_SECTIONS + [f"Schedule {i}" for i in range(1, n)])[:n]
+
+
+def make_checklist(sections: list) -> dict:
+    return {
+        "required_documents": ["Articles of Association", "Memorandum of Association", "UBO Form", "Register"],
+        "allowed_document_types": [t.lower() for t in TYPES[:8]],
+        "minimum_content_length": 500,
+        "required_sections": {s: {"reference": f"ADGM CR 2020 ({s})"} for s in sections},
+    }
+
+
+def make_packs(n: int, kb: int, sections: list, rng) -> list:
+    packs = []
+    for _ in range(n):
+        docs = []
+        for _ in range(rng.randint(2, 8)):
+            words, size = [], 0
+            while size < kb * 1024:
+                word = rng.choice(sections) if rng.random() < 0.01 else rng.choice(WORDS)
+                words.append(word)
+                size += len(word) + 1
+            docs.append({
+                "type": rng.choice(TYPES),
+                "filename": rng.choice(FILENAMES),
+                "content": " ".join(words),
+            })
+        packs.append(docs)
+    return packs
+
+
+def legacy_check_required_docs(detected_docs, process="incorporation", checklist=None, documents=None) -> dict:
+    """The pre-registry implementation, verbatim apart from comments, this docstring
+    and the whole-word filename matching of CHECKLIST_VERSION 4 (marked below)."""
+    document_mapping = {
+        "Articles of Association": ["articles of association", "aoa"],
+        "Memorandum of Association": ["memorandum of association", "moa", "mou"],
+        "Board Resolution": ["board resolution templates", "board resolution"],
+        "Shareholder Resolution": ["shareholder resolution templates", "shareholder resolution"],
+        "Incorporation Form": ["incorporation application form", "incorporation form"],
+        "UBO Form": ["ubo declaration form", "ubo form"],
+        "Register": ["register of members and directors", "register"],
+        "Address Notice": ["change of registered address notice", "address notice"]
+    }
+    default_checklists = {
+        "incorporation": list(document_mapping.keys())
+    }
+    process_type = (process or "incorporation").lower()
+    if checklist and isinstance(checklist, dict):
+        required_docs = checklist.get("required_documents", default_checklists.get(process_type, []))
+    else:
+        required_docs = default_checklists.get(process_type, [])
+
+    uploaded_from_detected = set([d.lower() for d in (detected_docs or []) if d])
+    uploaded_from_documents = set()
+    if documents:
+        for d in documents:
+            dtype = (d.get("type") or "").lower()
+            fname = (d.get("filename") or "").lower()
+            if dtype and dtype != "unknown":
+                uploaded_from_documents.add(dtype)
+            elif fname:
+                uploaded_from_documents.add(fname)
+    uploaded_all = list(uploaded_from_detected.union(uploaded_from_documents))
+    # CHECKLIST_VERSION 4: filenames (of untyped documents here, as the packs
+    # carry no type scores) match aliases on whole words only
+    filenames = {(d.get("filename") or "").lower() for d in (documents or [])
+                 if (d.get("type") or "unknown").lower() == "unknown"}
+    uploaded_types = [u for u in uploaded_all if u not in filenames]
+    filename_words = [" " + " ".join(re.findall(r"[a-z0-9]+", os.path.splitext(f)[0])) + " " for f in filenames if f]
+
+    def doc_found(required_label: str) -> bool:
+        variations = document_mapping.get(required_label, [required_label])
+        variations = [v.lower() for v in variations]
+        return any(
+            any(var in uploaded for var in variations)
+            for uploaded in uploaded_types
+        ) or any(
+            any(" " + " ".join(re.findall(r"[a-z0-9]+", var)) + " " in words for var in variations)
+            for words in filename_words
+        )
+
+    missing_documents = [doc for doc in required_docs if not doc_found(doc)]
+    status_list = [
+        f"{doc} ✓" if doc not in missing_documents else doc
+        for doc in required_docs
+    ]
+    issues = []
+    if checklist and documents:
+        allowed = set([a.lower() for a in checklist.get("allowed_document_types", [])])
+        if allowed:
+            for d in documents:
+                dtype = (d.get("type") or "unknown").lower()
+                if dtype not in allowed:
+                    issues.append({
+                        "document": d.get("filename", "Unknown"),
+                        "section": "Document Type",
+                        "description": f"Invalid document type: {dtype}",
+                        "severity": "high",
+                        "suggestion": f'Upload a valid document type: {", ".join(allowed)}',
+                        "reference": "ADGM document requirements"
+                    })
+        min_len = int(checklist.get("minimum_content_length", 100))
+        for d in documents:
+            content = (d.get("content") or "")
+            if len(content) < min_len:
+                issues.append({
+                    "document": d.get("filename", "Unknown"),
+                    "section": "Content",
+                    "description": f"Document content too short ({len(content)} characters)",
+                    "severity": "medium",
+                    "suggestion": f"Ensure document has at least {min_len} characters",
+                    "reference": "ADGM content requirements"
+                })
+        required_sections = checklist.get("required_sections", {})
+        if isinstance(required_sections, dict) and required_sections:
+            for d in documents:
+                content_lc = (d.get("content") or "").lower()
+                for section, requirements in required_sections.items():
+                    if section and section.lower() not in content_lc:
+                        issues.append({
+                            "document": d.get("filename", "Unknown"),
+                            "section": section,
+                            "description": f"Missing required section: {section}",
+                            "severity": "high",
+                            "suggestion": f"Add the {section} section as per ADGM requirements",
+                            "reference": (requirements or {}).get("reference", "ADGM regulations")
+                        })
+
+    compliance_score = max(0, 100 - (len(missing_documents) * 20) - (len(issues) * 10))
+    overall_status = "complete" if not missing_documents else "incomplete"
+    return {
+        "process": process,
+        "status": overall_status,
+        "required_docs": required_docs,
+        "uploaded_docs": uploaded_all,
+        "missing_docs": missing_documents,
+        "checklist": status_list,
+        "total_documents": len(uploaded_all),
+        "issues": issues,
+        "process_type": process_type,
+        "compliance_score": compliance_score
+    }
+
+
+def _same(old: dict, new: dict) -> bool:
+    return (old["status"] == new["status"]
+            and set(old["uploaded_docs"]) == set(new["uploaded_docs"])
+            and old["missing_docs"] == new["missing_docs"]
+            and old["checklist"] == new["checklist"]
+            and old["issues"] == new["issues"]
+            and old["compliance_score"] == new["compliance_score"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--packs", type=int, default=10000)
+    ap.add_argument("--kb", type=int, default=2, help="content size per document")
+    ap.add_argument("--sections", type=int, default=8, help="required sections in the custom checklist")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    sections = make_sections(args.sections)
+    packs = make_packs(args.packs, args.kb, sections, random.Random(args.seed))
+    n_docs = sum(len(p) for p in packs)
+    start = time.perf_counter()
+    get_default_registry()
+    print(f"{len(packs)} packs, {n_docs} documents; registry compiled in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'checklist':<15} {'method':<12} {'seconds':>8} {'packs/s':>10} {'agree':>6}")
+    for label, checklist in (("incorporation", None), (f"custom/{len(sections)}", make_checklist(sections))):
+        start = time.perf_counter()
+        legacy = [legacy_check_required_docs([d["type"] for d in p], "incorporation", checklist, p) for p in packs]
+        t_legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single = [check_required_docs([d["type"] for d in p], "incorporation", checklist, p) for p in packs]
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = check_packs(packs, "incorporation", checklist)
+        t_batch = time.perf_counter() - start
+
+        for name, results, elapsed in (("legacy", legacy, t_legacy), ("registry", single, t_single),
+                                       ("check_packs", batch, t_batch)):
+            agree = sum(_same(old, new) for old, new in zip(legacy, results)) / len(packs)
+            print(f"{label:<15} {name:<12} {elapsed:>8.3f} {len(packs) / elapsed:>10.0f} {agree:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Annotation benchmark: native Word comments patched into the .docx zip
+(commenter.comment_on_docx) versus the old python-docx round trip that
+appends a "REVIEW NOTES" page (commenter.append_review_notes), on a large
+synthetic filing with an embedded picture.
+
+Reports time per call and how many bytes each approach re-encodes
+(decompressed + recompressed) and writes.
+
+Usage:
+    python benchmarks/commenter_bench.py [--paragraphs 20000] [--flags 50] [--picture-kb 2048] [--runs 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.extract_bench import make_docx  # noqa: E402
+from utils.commenter import add_word_comments, append_review_notes  # noqa: E402
+from utils.parser import extract_text_with_sections  # noqa: E402
+
+
+def make_png(path: str, kb: int, seed: int = 0):
+    """Noise image of about kb KB; it doesn't compress, like a scanned page."""
+    rng = random.Random(seed)
+    width = 512
+    height = max(1, kb * 1024 // (width * 3))
+    rows = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1))
+                + chunk(b"IEND", b""))
+
+
+def make_filing(path: str, paragraphs: int, picture_kb: int):
+    from docx import Document
+    from docx.shared import Inches
+
+    make_docx(path, paragraphs)
+    if picture_kb:
+        png = path + ".png"
+        make_png(png, picture_kb)
+        doc = Document(path)
+        doc.add_picture(png, width=Inches(4))
+        doc.save(path)
+        os.remove(png)
+
+
+def make_flags(text: str, n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    flags = [{"issue": "Missing governing law clause", "suggestion": "Add one.", "offsets": None}]
+    for i in range(n - 1):
+        start = rng.randrange(len(text))
+        flags.append({"issue": f"Synthetic issue {i}", "suggestion": "Check this clause.",
+                      "offsets": [start, start + 10]})
+    return flags
+
+
+def reencoded_bytes(path: str, names=None) -> int:
+    with zipfile.ZipFile(path) as zf:
+        return sum(i.file_size for i in zf.infolist() if names is None or i.filename in names)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--paragraphs", type=int, default=20000)
+    ap.add_argument("--flags", type=int, default=50)
+    ap.add_argument("--picture-kb", type=int, default=2048, help="embedded picture size (0 = none)")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "filing.docx")
+        make_filing(path, args.paragraphs, args.picture_kb)
+        line_map = []
+        text, _ = extract_text_with_sections(path, line_map=line_map)
+        flags = make_flags(text, args.flags)
+        print(f"{args.paragraphs} paragraphs, {os.path.getsize(path) / 2**20:.1f} MB .docx, "
+              f"{len(flags)} flags; median of {args.runs} runs")
+
+        rows = []
+        notes_times, comment_times = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            notes_path = append_review_notes(path, flags)
+            notes_times.append(time.perf_counter() - start)
+
+            out = os.path.join(tmp, "filing_commented.docx")
+            start = time.perf_counter()
+            report = add_word_comments(path, flags, out, line_map)
+            comment_times.append(time.perf_counter() - start)
+
+        rows.append(("review notes (python-docx)", notes_times, reencoded_bytes(notes_path),
+                     os.path.getsize(notes_path)))
+        rows.append(("word comments (zip patch)", comment_times, reencoded_bytes(out, set(report["rewritten"])),
+                     os.path.getsize(out)))
+
+        print(f"{'method':<28} {'seconds':>8} {'re-encoded MB':>14} {'written MB':>11}")
+        for name, times, reencoded, written in rows:
+            print(f"{name:<28} {statistics.median(times):>8.3f} {reencoded / 2**20:>14.2f} {written / 2**20:>11.2f}")
+        print(f"zip patch rewrote {len(report['rewritten'])} members, copied {len(report['copied'])} unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Index load benchmark: llama_index JSON docstore versus the compact
+FAISS + SQLite store, for synthetic corpora built by replicating the nodes
+of the bundled ADGM store (1x, 10x, 50x by default).
+
+Each load runs in a fresh interpreter and also answers one retrieval, so
+peak RSS covers everything a Streamlit worker would hold. A mock embedding
+model is used, so no model download is needed.
+
+Usage:
+    python benchmarks/compact_store_bench.py [--scales 1 10 50]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from utils.compact_store import convert_vector_store  # noqa: E402
+from utils.ann_index import resolve_store_dir  # noqa: E402
+from utils.rag_engine import PERSIST_DIR  # noqa: E402
+
+_PROBE_HEADER = r'''
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+embed = MockEmbedding(embed_dim=384)
+Settings.embed_model = embed
+Settings.llm = None
+start = time.perf_counter()
+'''
+
+_PROBE_JSON = r'''
+from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.vector_stores.faiss import FaissVectorStore
+vs = FaissVectorStore.from_persist_dir({store!r})
+ctx = StorageContext.from_defaults(vector_store=vs, persist_dir={store!r})
+retriever = load_index_from_storage(ctx).as_retriever()
+'''
+
+_PROBE_COMPACT = r'''
+from utils.compact_store import CompactRetriever
+retriever = CompactRetriever({store!r}, embed)
+'''
+
+_PROBE_FOOTER = r'''
+load = time.perf_counter() - start
+start = time.perf_counter()
+retriever.retrieve("minimum share capital")
+query = time.perf_counter() - start
+from benchmarks._rss import peak_rss_mb
+print(json.dumps({{"load": load, "query": query, "peak_rss_mb": peak_rss_mb()}}))
+'''
+
+
+def make_scaled_store(src: str, dst: str, scale: int):
+    """Copy the bundled store with every node (and vector) repeated scale times."""
+    import faiss
+
+    with open(os.path.join(src, "docstore.json"), "r", encoding="utf-8") as f:
+        docstore = json.load(f)
+    with open(os.path.join(src, "index_store.json"), "r", encoding="utf-8") as f:
+        index_store = json.load(f)
+    index = faiss.read_index(os.path.join(src, "default__vector_store.json"))
+    vectors = index.reconstruct_n(0, index.ntotal)
+
+    index_id, entry = next(iter(index_store["index_store/data"].items()))
+    index_data = json.loads(entry["__data__"])
+    base_nodes = [index_data["nodes_dict"][str(i)] for i in range(index.ntotal)]
+    data = docstore["docstore/data"]
+
+    new_index = faiss.IndexFlatL2(index.d)
+    nodes_dict, new_data, new_meta = {}, {}, {}
+    for copy in range(scale):
+        new_index.add(vectors)
+        for i, node_id in enumerate(base_nodes):
+            new_id = node_id if copy == 0 else str(uuid.uuid4())
+            node = json.loads(json.dumps(data[node_id]))
+            node["__data__"]["id_"] = new_id
+            new_data[new_id] = node
+            new_meta[new_id] = docstore["docstore/metadata"].get(node_id, {})
+            nodes_dict[str(copy * len(base_nodes) + i)] = new_id
+
+    docstore["docstore/data"] = new_data
+    docstore["docstore/metadata"].update(new_meta)
+    index_data["nodes_dict"] = nodes_dict
+    entry["__data__"] = json.dumps(index_data)
+
+    os.makedirs(dst)
+    for name in ("graph_store.json", "image__vector_store.json"):
+        with open(os.path.join(src, name), "rb") as f_in, open(os.path.join(dst, name), "wb") as f_out:
+            f_out.write(f_in.read())
+    with open(os.path.join(dst, "docstore.json"), "w", encoding="utf-8") as f:
+        json.dump(docstore, f)
+    with open(os.path.join(dst, "index_store.json"), "w", encoding="utf-8") as f:
+        json.dump(index_store, f)
+    faiss.write_index(new_index, os.path.join(dst, "default__vector_store.json"))
+    return len(nodes_dict)
+
+
+def run(body: str, store: str) -> dict:
+    code = (_PROBE_HEADER + body + _PROBE_FOOTER).format(app_dir=APP_DIR, store=store)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _fmt(r: dict) -> str:
+    if "error" in r:
+        return f"error: {r['error']}"
+    return f"load {r['load']:7.3f}s  query {r['query'] * 1000:6.1f} ms  peak RSS {r['peak_rss_mb']:7.1f} MB"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            json_dir = os.path.join(tmp, f"json_{scale}")
+            compact_dir = os.path.join(tmp, f"compact_{scale}")
+            nodes = make_scaled_store(resolve_store_dir(PERSIST_DIR), json_dir, scale)
+            convert_vector_store(json_dir, compact_dir)
+            json_mb = sum(os.path.getsize(os.path.join(json_dir, n)) for n in os.listdir(json_dir)) / 2**20
+            compact_mb = sum(os.path.getsize(os.path.join(compact_dir, n)) for n in os.listdir(compact_dir)) / 2**20
+
+            print(f"{nodes} nodes (json {json_mb:.1f} MB, compact {compact_mb:.1f} MB)")
+            print(f"  json    : {_fmt(run(_PROBE_JSON, json_dir))}")
+            print(f"  compact : {_fmt(run(_PROBE_COMPACT, compact_dir))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Embedding backends and the embedding service: checks that each CPU backend
+(torch-int8, onnx, onnx-int8) reproduces the float32 torch embeddings of
+the ADGM chunks and questions within tolerance, and times them; then times
+RAG questions embedded one at a time, micro-batched from concurrent
+threads, and served from the cache.
+
+The tolerance check exits with status 1 when a backend's lowest cosine to
+the reference, or its nearest-neighbour overlap, falls below the limits.
+Backends whose packages are missing (sentence-transformers, onnxruntime,
+optimum) are skipped. --stub times the service with a fixed-cost stand-in
+model instead, so the batching and cache numbers need no model at all.
+
+Usage:
+    python benchmarks/embedding_bench.py [--backends torch-int8,onnx,onnx-int8] [--texts 200]
+        [--min-cosine 0.98] [--min-overlap 0.8] [--concurrency 8] [--stub]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from utils.ann_index import resolve_store_dir  # noqa: E402
+from utils.embedding_service import (  # noqa: E402
+    EmbeddingCache, EmbeddingService, load_backend, similarity_report,
+)
+from utils.rag_engine import EMBED_MODEL_NAME, PERSIST_DIR  # noqa: E402
+
+QUERIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rag_queries.json")
+
+
+class StubBackend:
+    """Sleeps like a forward pass: a fixed cost per call plus a cost per text."""
+
+    name = "stub"
+
+    def __init__(self, per_call_ms: float = 8.0, per_text_ms: float = 0.4, dim: int = 384):
+        self.per_call = per_call_ms / 1000.0
+        self.per_text = per_text_ms / 1000.0
+        self.dim = dim
+
+    def encode(self, texts: list) -> np.ndarray:
+        time.sleep(self.per_call + self.per_text * len(texts))
+        rng = np.random.default_rng(len(texts))
+        return rng.standard_normal((len(texts), self.dim)).astype(np.float32)
+
+
+def load_texts(limit: int) -> tuple:
+    """(chunk texts from the persisted store, RAG questions)."""
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        questions = [q["question"] for q in json.load(f)["queries"]]
+    with open(os.path.join(resolve_store_dir(PERSIST_DIR), "docstore.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)["docstore/data"]
+    chunks = [node["__data__"]["text"] for node in data.values() if node["__data__"].get("text", "").strip()]
+    return chunks[:limit], questions
+
+
+def encode_all(backend, texts: list, batch_size: int = 32) -> tuple:
+    """(vectors, ms per text) for texts embedded batch_size at a time."""
+    backend.encode(texts[:2])  # first call pays for lazy initialisation
+    start = time.perf_counter()
+    vectors = np.concatenate([backend.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+    return vectors, (time.perf_counter() - start) * 1000 / len(texts)
+
+
+def check_backends(args, texts: list) -> bool:
+    print(f"Tolerance vs {args.reference} ({EMBED_MODEL_NAME}) on {len(texts)} texts: "
+          f"min cosine >= {args.min_cosine}, top-{args.k} overlap >= {args.min_overlap}")
+    try:
+        reference = load_backend(args.reference, EMBED_MODEL_NAME)
+    except Exception as e:
+        print(f"  reference backend unavailable ({type(e).__name__}: {e}); tolerance check skipped")
+        return True
+    ref_vectors, ref_ms = encode_all(reference, texts)
+
+    print(f"{'backend':<12} {'ms/text':>8} {'speedup':>8} {'mean cos':>9} {'min cos':>8} {'overlap':>8}  result")
+    print(f"{args.reference:<12} {ref_ms:>8.2f} {1.0:>7.2f}x {1.0:>9.4f} {1.0:>8.4f} {1.0:>8.2f}  reference")
+    ok = True
+    for name in args.backends:
+        try:
+            backend = load_backend(name, EMBED_MODEL_NAME, onnx_file=args.onnx_file)
+        except Exception as e:
+            print(f"{name:<12} skipped ({type(e).__name__}: {e})")
+            continue
+        vectors, ms = encode_all(backend, texts)
+        report = similarity_report(ref_vectors, vectors, k=args.k)
+        passed = report["min_cosine"] >= args.min_cosine and report["topk_overlap"] >= args.min_overlap
+        ok = ok and passed
+        print(f"{name:<12} {ms:>8.2f} {ref_ms / ms:>7.2f}x {report['mean_cosine']:>9.4f} "
+              f"{report['min_cosine']:>8.4f} {report['topk_overlap']:>8.2f}  {'ok' if passed else 'OUT OF TOLERANCE'}")
+    return ok
+
+
+def time_service(args, questions: list):
+    if args.stub:
+        make_backend = StubBackend
+    else:
+        try:
+            load_backend(args.reference, EMBED_MODEL_NAME)
+        except Exception as e:
+            print(f"\nService timing skipped ({type(e).__name__}: {e}); use --stub")
+            return
+
+        def make_backend():
+            return load_backend(args.reference, EMBED_MODEL_NAME)
+
+    # Distinct texts, so only the "cached" row hits the cache
+    texts = [f"{q} ({i})" for i in range(args.rounds) for q in questions]
+    print(f"\nService: {len(texts)} questions, {args.concurrency} threads, backend "
+          f"{'stub' if args.stub else args.reference}")
+    print(f"{'mode':<24} {'seconds':>8} {'q/s':>8} {'batches':>8} {'mean batch':>11}")
+
+    def run(service, label: str, threads: int):
+        chunks = [texts[i::threads] for i in range(threads)]
+
+        def work(chunk):
+            for text in chunk:
+                service.embed_one(text)
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=work, args=(c,)) for c in chunks]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        stats = service.stats()
+        print(f"{label:<24} {elapsed:>8.3f} {len(texts) / elapsed:>8.1f} {stats['batches']:>8} "
+              f"{stats['mean_batch']:>11.1f}")
+
+    run(EmbeddingService(make_backend(), "bench", max_wait=0), "one at a time", 1)
+    run(EmbeddingService(make_backend(), "bench", max_wait=0), "concurrent, unbatched", args.concurrency)
+    batched = EmbeddingService(make_backend(), "bench", cache=EmbeddingCache(len(texts)),
+                               max_wait=args.max_wait_ms / 1000.0)
+    run(batched, f"micro-batched ({args.max_wait_ms:g} ms)", args.concurrency)
+    batched.batches = batched.encoded = 0
+    run(batched, "cached", args.concurrency)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--backends", default="torch-int8,onnx,onnx-int8", help="comma-separated candidates")
+    ap.add_argument("--reference", default="torch")
+    ap.add_argument("--onnx-file", help="ONNX file in the model repo for the onnx backends")
+    ap.add_argument("--texts", type=int, default=200, help="store chunks to compare on (plus the questions)")
+    ap.add_argument("--min-cosine", type=float, default=0.98)
+    ap.add_argument("--min-overlap", type=float, default=0.8, help="mean top-k nearest-neighbour agreement")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rounds", type=int, default=4, help="passes over the questions in the service timing")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0)
+    ap.add_argument("--stub", action="store_true", help="time the service with a fixed-cost stub model")
+    args = ap.parse_args()
+    args.backends = [b for b in args.backends.split(",") if b]
+
+    chunks, questions = load_texts(args.texts)
+    ok = True if args.stub else check_backends(args, chunks + questions)
+    time_service(args, questions)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
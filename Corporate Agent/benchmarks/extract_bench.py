@@ -0,0 +1,80 @@
+"""
+Text extraction benchmark: streaming OOXML reader versus the python-docx
+document model, on a synthetic filing of the requested size.
+
+Each mode runs in a fresh interpreter so peak RSS is comparable.
+
+Usage:
+    python benchmarks/extract_bench.py [--paragraphs 20000] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+_PROBE = r'''
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+from utils.parser import extract_text_from_docx
+start = time.perf_counter()
+text = extract_text_from_docx({path!r}, mode={mode!r})
+elapsed = time.perf_counter() - start
+from benchmarks._rss import peak_rss_mb
+print(json.dumps({{"seconds": elapsed, "peak_rss_mb": peak_rss_mb(), "chars": len(text)}}))
+'''
+
+
+def make_docx(path: str, paragraphs: int):
+    from docx import Document
+
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "ADGM Company Ltd - Articles of Association"
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            doc.add_paragraph(f"{i // 50 + 1}. SECTION {i // 50 + 1}")
+        doc.add_paragraph(
+            f"{i // 50 + 1}.{i % 50 + 1} The directors may exercise all powers of the Company "
+            "subject to the Companies Regulations 2020 and these Articles.\t(see Schedule 1)"
+        )
+        if i % 500 == 499:
+            table = doc.add_table(rows=5, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = "Shareholder  name"
+    doc.save(path)
+
+
+def run(path: str, mode: str) -> dict:
+    code = _PROBE.format(app_dir=APP_DIR, path=path, mode=mode)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--paragraphs", type=int, default=20000)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.docx")
+        make_docx(path, args.paragraphs)
+        print(f"document: {args.paragraphs} paragraphs, {os.path.getsize(path) / 1024:.0f} KB zipped")
+        print(f"{'mode':<12} {'median s':>9} {'peak RSS MB':>12} {'chars':>10}")
+        for mode in ("python-docx", "stream"):
+            results = [run(path, mode) for _ in range(args.runs)]
+            secs = statistics.median(r["seconds"] for r in results)
+            rss = max(r["peak_rss_mb"] for r in results)
+            print(f"{mode:<12} {secs:>9.3f} {rss:>12.1f} {results[0]['chars']:>10}")
+
+
+if __name__ == "__main__":
+    main()
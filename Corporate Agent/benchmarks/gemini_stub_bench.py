@@ -0,0 +1,117 @@
+"""
+Gemini client check against a local stub server that adds latency and
+rate-limits a share of requests with 429s. Compares the old one-request-
+per-connection serial calls with the pooled client's batch API.
+
+Usage:
+    python benchmarks/gemini_stub_bench.py [--questions 32] [--latency 0.2] [--rate-limit 0.25]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.gemini_client import GeminiClient  # noqa: E402
+
+
+def make_server(latency: float, rate_limit: float, seed: int = 7):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    stats = {"requests": 0, "throttled": 0, "connections": set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                stats["requests"] += 1
+                stats["connections"].add(self.client_address)
+                throttle = rng.random() < rate_limit
+                if throttle:
+                    stats["throttled"] += 1
+
+            if throttle:
+                payload = json.dumps({"error": {"message": "Resource exhausted"}}).encode()
+                self.send_response(429)
+                self.send_header("Retry-After", "0.05")
+            else:
+                time.sleep(latency)
+                prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+                payload = json.dumps({
+                    "candidates": [{"content": {"parts": [{"text": f"echo: {prompt}"}]}}]
+                }).encode()
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            try:
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client gave up (read timeout)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def old_style(url: str, prompt: str) -> str:
+    """What call_gemini_api used to do: bare post, no session, no retry."""
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    response = requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps(payload))
+    if response.status_code == 200:
+        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+    return f"Error {response.status_code}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--questions", type=int, default=32)
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--rate-limit", type=float, default=0.25, help="share of requests answered with 429")
+    args = ap.parse_args()
+    prompts = [f"question {i}" for i in range(args.questions)]
+
+    server, stats = make_server(args.latency, args.rate_limit)
+    url = f"http://127.0.0.1:{server.server_address[1]}/generateContent"
+    start = time.perf_counter()
+    answers = [old_style(url, p) for p in prompts]
+    elapsed = time.perf_counter() - start
+    ok = sum(a.startswith("echo:") for a in answers)
+    print(f"serial, no pooling : {elapsed:6.2f}s  {ok}/{len(prompts)} answered  "
+          f"{stats['requests']} requests, {len(stats['connections'])} connections")
+    server.shutdown()
+
+    server, stats = make_server(args.latency, args.rate_limit)
+    url = f"http://127.0.0.1:{server.server_address[1]}/generateContent"
+    client = GeminiClient(api_key="stub", url=url, max_concurrency=8, backoff_base=0.05)
+    start = time.perf_counter()
+    answers = client.generate_batch(prompts)
+    elapsed = time.perf_counter() - start
+    ok = sum(a.startswith("echo:") for a in answers)
+    in_order = all(a == f"echo: {p}" for a, p in zip(answers, prompts) if a.startswith("echo:"))
+    print(f"pooled batch (x8)  : {elapsed:6.2f}s  {ok}/{len(prompts)} answered  "
+          f"{stats['requests']} requests ({stats['throttled']} throttled), "
+          f"{len(stats['connections'])} connections, order kept: {in_order}")
+
+    client.timeout = (1.0, args.latency / 4)
+    client.max_retries = 1
+    timed_out = client.generate("slow question")
+    print(f"read timeout       : {timed_out[:60]}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Red-flag engine benchmark: compiled single-pass RuleSet versus the old
+one-scan-per-rule approach, for 10, 100 and 1000 synthetic rules.
+
+Usage:
+    python benchmarks/redflags_bench.py [--kb 200] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.redflags import RuleSet  # noqa: E402
+
+_SYLLABLES = ["ad", "gm", "reg", "ul", "at", "ion", "dir", "ect", "or", "sha", "re", "hold",
+              "er", "quo", "rum", "cap", "it", "al", "not", "ice", "term", "in", "vest"]
+
+
+def _word(rng) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_rules(n: int, rng) -> list:
+    rules = []
+    for i in range(n):
+        rules.append({
+            "id": f"rule_{i}",
+            "issue": f"Synthetic issue {i}",
+            "suggestion": "n/a",
+            "any": [f"{_word(rng)} {_word(rng)}" for _ in range(2)],
+            "none": [_word(rng)],
+        })
+    return rules
+
+
+def make_text(kb: int, rng) -> str:
+    out, size = [], 0
+    while size < kb * 1024:
+        line = " ".join(_word(rng) for _ in range(12))
+        out.append(line)
+        size += len(line) + 1
+    return "\n".join(out)
+
+
+def naive_evaluate(rules: list, text: str) -> int:
+    """The pre-RuleSet approach: lowercase once, then scan per term per rule."""
+    t = text.lower()
+    n = 0
+    for rule in rules:
+        if any(term in t for term in rule["any"]) and not any(term in t for term in rule["none"]):
+            n += 1
+    return n
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--kb", type=int, default=200, help="document size in KB")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(42)
+    text = make_text(args.kb, rng)
+
+    print(f"document: {len(text) / 1024:.0f} KB")
+    print(f"{'rules':>6} {'compile ms':>11} {'naive ms':>10} {'compiled ms':>12} {'speedup':>8}")
+    for n in (10, 100, 1000):
+        rules = make_rules(n, rng)
+        start = time.perf_counter()
+        ruleset = RuleSet(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        naive = _time(lambda: naive_evaluate(rules, text), args.repeat)
+        compiled = _time(lambda: ruleset.evaluate(text), args.repeat)
+        print(f"{n:>6} {compile_ms:>11.1f} {naive * 1000:>10.1f} {compiled * 1000:>12.1f} "
+              f"{naive / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
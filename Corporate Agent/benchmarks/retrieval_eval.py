@@ -0,0 +1,133 @@
+"""
+Retrieval quality and latency on the labeled ADGM questions in
+benchmarks/rag_queries.json: dense (FAISS) only, BM25 only, hybrid (RRF)
+and, with --reranker, hybrid + cross-encoder. Also reports the context
+tokens a prompt would carry with and without the RAG_CONTEXT_TOKENS budget.
+
+Uses the real MiniLM embedding model when it is installed; otherwise a mock
+embedding is used and the dense/hybrid quality numbers are meaningless
+(BM25 and latencies still are).
+
+Usage:
+    python benchmarks/retrieval_eval.py [--k 4] [--candidates 20] [--reranker cross-encoder/ms-marco-MiniLM-L-6-v2]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from utils.ann_index import resolve_store_dir  # noqa: E402
+from utils.context_budget import assemble_context  # noqa: E402
+from utils.hybrid_retriever import BM25Index, CrossEncoderReranker, HybridRetriever  # noqa: E402
+from utils.rag_engine import CONTEXT_TOKENS, PERSIST_DIR, get_embed_model  # noqa: E402
+
+QUERIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rag_queries.json")
+
+
+def load_index():
+    from llama_index.core import Settings, StorageContext, load_index_from_storage
+    from llama_index.vector_stores.faiss import FaissVectorStore
+
+    try:
+        embed, mock = get_embed_model(), False
+    except ImportError:
+        from llama_index.core.embeddings import MockEmbedding
+
+        embed, mock = MockEmbedding(embed_dim=384), True
+        Settings.embed_model = embed
+        Settings.llm = None
+
+    store_dir = resolve_store_dir(PERSIST_DIR)
+    vector_store = FaissVectorStore.from_persist_dir(store_dir)
+    ctx = StorageContext.from_defaults(vector_store=vector_store, persist_dir=store_dir)
+    return load_index_from_storage(ctx), embed, mock
+
+
+def score(hits: list, relevant: set, k: int) -> dict:
+    files = [h.node.metadata.get("file_name") for h in hits[:k]]
+    ranks = [i for i, f in enumerate(files, start=1) if f in relevant]
+    return {
+        "hit": 1.0 if ranks else 0.0,
+        "precision": len(ranks) / k,
+        "rr": 1.0 / ranks[0] if ranks else 0.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--k", type=int, default=4, help="chunks per answer")
+    ap.add_argument("--candidates", type=int, default=20, help="per-retriever candidates fused")
+    ap.add_argument("--reranker", help="sentence-transformers cross-encoder model name")
+    ap.add_argument("--queries", default=QUERIES_FILE)
+    args = ap.parse_args()
+
+    from llama_index.core import QueryBundle
+    from llama_index.core.schema import NodeWithScore
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)["queries"]
+
+    index, embed, mock = load_index()
+    node_ids = list(index.index_struct.nodes_dict.values())
+    nodes = {n.node_id: n for n in index.docstore.get_nodes(node_ids)}
+
+    start = time.perf_counter()
+    bm25 = BM25Index((i, n.text) for i, n in nodes.items())
+    print(f"{len(nodes)} nodes, BM25 built in {(time.perf_counter() - start) * 1000:.0f} ms"
+          + ("  [mock embeddings: dense/hybrid quality not meaningful]" if mock else ""))
+
+    def fetch(ids):
+        return {i: nodes[i] for i in ids if i in nodes}
+
+    dense_k = index.as_retriever(similarity_top_k=args.k)
+    dense_pool = index.as_retriever(similarity_top_k=args.candidates)
+
+    class _BM25Only:
+        def retrieve(self, query):
+            hits = bm25.search(query.query_str, args.k)
+            return [NodeWithScore(node=nodes[i], score=s) for i, s in hits]
+
+    modes = {
+        "dense": dense_k,
+        "bm25": _BM25Only(),
+        "hybrid": HybridRetriever(dense_pool, bm25, fetch, similarity_top_k=args.k, candidate_k=args.candidates),
+    }
+    if args.reranker:
+        modes["hybrid+rerank"] = HybridRetriever(
+            dense_pool, bm25, fetch, similarity_top_k=args.k, candidate_k=args.candidates,
+            reranker=CrossEncoderReranker(args.reranker),
+        )
+
+    bundles = [QueryBundle(query_str=q["question"], embedding=embed.get_query_embedding(q["question"]))
+               for q in queries]
+
+    print(f"{len(queries)} questions, k={args.k}, context budget {CONTEXT_TOKENS} tokens")
+    print(f"{'mode':<15} {'hit@k':>6} {'P@k':>6} {'MRR':>6} {'mean ms':>8} {'p95 ms':>8} "
+          f"{'ctx tok':>8} {'budgeted':>9}")
+    for name, retriever in modes.items():
+        retriever.retrieve(bundles[0])  # first call loads lazily built state (re-ranker model)
+        rows, latencies, raw_tokens, budget_tokens = [], [], [], []
+        for q, bundle in zip(queries, bundles):
+            start = time.perf_counter()
+            hits = retriever.retrieve(bundle)
+            latencies.append(time.perf_counter() - start)
+            rows.append(score(hits, set(q["relevant_files"]), args.k))
+            texts = [h.node.get_text() for h in hits]
+            raw_tokens.append(assemble_context(texts, 0)["tokens"])
+            budget_tokens.append(assemble_context(texts, CONTEXT_TOKENS)["tokens"])
+        latencies.sort()
+        print(f"{name:<15} {statistics.mean(r['hit'] for r in rows):>6.2f} "
+              f"{statistics.mean(r['precision'] for r in rows):>6.2f} "
+              f"{statistics.mean(r['rr'] for r in rows):>6.2f} "
+              f"{statistics.mean(latencies) * 1000:>8.2f} "
+              f"{latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000:>8.2f} "
+              f"{statistics.mean(raw_tokens):>8.0f} {statistics.mean(budget_tokens):>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Startup benchmark: import time and peak memory of the document-review-only
+path versus the full RAG path (embedding model + FAISS index loaded).
+
+Each scenario runs in a fresh interpreter so module caches don't leak between
+measurements.
+
+Usage:
+    python benchmarks/startup_bench.py [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = r'''
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+from benchmarks._rss import peak_rss_mb
+print(json.dumps({{"seconds": elapsed, "peak_rss_mb": peak_rss_mb()}}))
+'''
+
+SCENARIOS = {
+    "review_only": (
+        "from utils.parser import extract_text_from_docx\n"
+        "from utils.type_detector import detect_document_type\n"
+        "from utils.redflags import detect_red_flags\n"
+        "from utils.checklist import check_required_docs\n"
+        "from utils.commenter import comment_on_docx\n"
+        "from utils.summarizer import generate_summary_json\n"
+    ),
+    "import_rag_engine": (
+        "from utils.parser import extract_text_from_docx\n"
+        "from utils.redflags import detect_red_flags\n"
+        "import utils.rag_engine\n"
+    ),
+    "full_rag": (
+        "from utils.parser import extract_text_from_docx\n"
+        "from utils.redflags import detect_red_flags\n"
+        "from utils.rag_engine import warm_up_rag\n"
+        "warm_up_rag()\n"
+    ),
+}
+
+
+def run_scenario(body: str) -> dict:
+    code = _PROBE.format(app_dir=APP_DIR, body=body)
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=APP_DIR
+    )
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'scenario':<20} {'median s':>10} {'peak RSS MB':>12}")
+    for name, body in SCENARIOS.items():
+        results = [run_scenario(body) for _ in range(args.runs)]
+        errors = [r["error"] for r in results if "error" in r]
+        if errors:
+            print(f"{name:<20} {'n/a':>10} {'n/a':>12}  ({errors[0]})")
+            continue
+        secs = statistics.median(r["seconds"] for r in results)
+        rss = max(r["peak_rss_mb"] for r in results)
+        print(f"{name:<20} {secs:>10.3f} {rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Time-to-first-token of streamed versus blocking Gemini answers, against a
+local fake server that generates an answer of --chunks pieces, --first-delay
+seconds before the first and --chunk-delay between the rest. It serves both
+generateContent (whole answer at the end) and streamGenerateContent?alt=sse.
+
+Usage:
+    python benchmarks/stream_ttft_bench.py [--chunks 40] [--first-delay 0.4] [--chunk-delay 0.05] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.gemini_client import GeminiClient  # noqa: E402
+
+
+def make_server(chunks: int, first_delay: float, chunk_delay: float):
+    words = [f"word{i} " for i in range(chunks)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, chunked streaming
+
+        def log_message(self, *args):
+            pass
+
+        def _event(self, text: str) -> bytes:
+            return json.dumps({"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}).encode()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if ":streamGenerateContent" not in self.path:
+                time.sleep(first_delay + chunk_delay * (chunks - 1))
+                payload = self._event("".join(words))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(first_delay)
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(chunk_delay)
+                data = b"data: " + self._event(word) + b"\r\n\r\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "".join(words)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--chunks", type=int, default=40)
+    ap.add_argument("--first-delay", type=float, default=0.4)
+    ap.add_argument("--chunk-delay", type=float, default=0.05)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    server, expected = make_server(args.chunks, args.first_delay, args.chunk_delay)
+    url = f"http://127.0.0.1:{server.server_port}/v1beta/models/fake:generateContent"
+    client = GeminiClient(api_key="test", url=url)
+
+    blocking, streamed = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        answer = client.generate("question")
+        total = time.perf_counter() - start
+        assert answer == expected, answer[:80]
+        blocking.append((total, total))  # nothing to show until the end
+
+        start = time.perf_counter()
+        first, pieces = None, []
+        for piece in client.generate_stream("question"):
+            if first is None:
+                first = time.perf_counter() - start
+            pieces.append(piece)
+        total = time.perf_counter() - start
+        assert "".join(pieces) == expected, "".join(pieces)[:80]
+        streamed.append((first, total))
+
+    print(f"{args.chunks} chunks, first after {args.first_delay}s, then every {args.chunk_delay}s; "
+          f"median of {args.runs} runs")
+    print(f"{'mode':<10} {'first token s':>14} {'full answer s':>14}")
+    for name, rows in (("blocking", blocking), ("stream", streamed)):
+        print(f"{name:<10} {statistics.median(r[0] for r in rows):>14.3f} "
+              f"{statistics.median(r[1] for r in rows):>14.3f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
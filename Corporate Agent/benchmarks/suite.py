@@ -0,0 +1,394 @@
+"""
+Benchmark suite: times every utils stage and the end-to-end review on a
+synthetic ADGM corpus (see synth_docs.py), saves the results as a JSON
+baseline and compares a later run against one.
+
+RAG runs fully locally: a hashing embedding stands in for the
+sentence-transformers model, and a local HTTP stub answers the Gemini
+calls, so retrieval, prompt assembly and the pooled client are real code
+but no model or network is needed.
+
+Each case runs once to warm up, then --repeat times; the median is
+reported and compared. Timings are only comparable on the same machine,
+corpus (size, seed, generator version) and settings.
+
+Usage:
+    python benchmarks/suite.py [--size small|medium|large] [--repeat 3] [--cases parser,redflags]
+    python benchmarks/suite.py --size medium --save                      # baselines/medium.json
+    python benchmarks/suite.py --size medium --compare benchmarks/baselines/medium.json [--threshold 0.15]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from benchmarks.synth_docs import CORPUS_SIZES, make_corpus  # noqa: E402
+
+BASELINE_DIR = os.path.join(APP_DIR, "benchmarks", "baselines")
+QUESTIONS_PATH = os.path.join(APP_DIR, "benchmarks", "rag_queries.json")
+
+
+def time_case(fn, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "runs": len(times),
+    }
+
+
+def make_stub_embedding(dim: int):
+    """Deterministic bag-of-words hashing embedding with the store's dimension."""
+    import numpy as np
+    from llama_index.core.embeddings import BaseEmbedding
+
+    token_re = re.compile(r"\w+")
+
+    class HashingEmbedding(BaseEmbedding):
+        dim: int = 384
+
+        def _vector(self, text: str) -> list:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for token in token_re.findall(text.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+            norm = np.linalg.norm(vec)
+            return (vec / norm if norm else vec).tolist()
+
+        def _get_query_embedding(self, query: str) -> list:
+            return self._vector(query)
+
+        def _get_text_embedding(self, text: str) -> list:
+            return self._vector(text)
+
+        async def _aget_query_embedding(self, query: str) -> list:
+            return self._vector(query)
+
+    return HashingEmbedding(dim=dim, model_name="hashing-stub")
+
+
+def install_rag_stubs(llm_latency: float = 0.0):
+    """
+    Point rag_engine at the hashing embedding and the pooled Gemini client at
+    a local stub server.
+
+    Returns:
+        the stub server (shut it down when done)
+    """
+    import faiss
+    from llama_index.core import Settings
+
+    from benchmarks.gemini_stub_bench import make_server
+    from utils import gemini_client, rag_engine
+    from utils.ann_index import resolve_store_dir
+
+    store_dir = resolve_store_dir(rag_engine.PERSIST_DIR)
+    dim = faiss.read_index(os.path.join(store_dir, "default__vector_store.json")).d
+    embed = make_stub_embedding(dim)
+    Settings.llm = None
+    Settings.embed_model = embed
+    rag_engine._embed_model = embed
+
+    server, _ = make_server(llm_latency, rate_limit=0.0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1beta/models/stub:generateContent"
+    gemini_client._default_client = gemini_client.GeminiClient(api_key="stub", url=url)
+    return server
+
+
+def _reset_upload_embeddings():
+    """Empty session_index's shared cache so every run embeds the uploads again."""
+    from utils import session_index
+
+    with session_index._cache_lock:
+        session_index._embedded.clear()
+        session_index._embedded_bytes = 0
+
+
+def _copy_corpus(manifest: dict, scratch: str) -> list:
+    """Copy the filings to scratch (commenting writes *_reviewed.docx next to them)."""
+    packs = []
+    for pack in manifest["packs"]:
+        pack_dir = os.path.join(scratch, os.path.basename(pack["pack"]))
+        os.makedirs(pack_dir, exist_ok=True)
+        paths = []
+        for doc in pack["documents"]:
+            paths.append(shutil.copy(doc["path"], pack_dir))
+        packs.append(paths)
+    return packs
+
+
+def build_cases(manifest: dict, scratch: str, args) -> list:
+    """
+    (name, callable, items) for every case. Inputs each stage needs (text,
+    sections, flags, ...) are computed here once, so a case times only its
+    own module.
+    """
+    from utils.checklist import check_packs, check_required_docs
+    from utils.commenter import comment_on_docx
+    from utils.parser import build_section_index, clean_text, extract_text_from_docx, extract_text_with_sections
+    from utils.pipeline import review_batch
+    from utils.redflags import detect_red_flags
+    from utils.review_cache import content_key
+    from utils.summarizer import SummarySink
+    from utils.type_detector import classify_documents
+
+    packs = _copy_corpus(manifest, scratch)
+    paths = [p for pack in packs for p in pack]
+    names = [os.path.basename(p) for p in paths]
+    blobs = []
+    for p in paths:
+        with open(p, "rb") as f:
+            blobs.append(f.read())
+
+    extracted = []
+    for p in paths:
+        line_map = []
+        text, sections = extract_text_with_sections(p, line_map=line_map)
+        extracted.append((text, sections, line_map))
+    texts = [text for text, _, _ in extracted]
+    types = [ranked[0][0] for ranked in classify_documents(texts, names)]
+    flags = [detect_red_flags(text, t, sections=sections) for (text, sections, _), t in zip(extracted, types)]
+    # what python-docx mode hands clean_text: paragraphs with stray whitespace
+    raw_texts = ["\n\n\n".join("  " + line + "\t " for line in text.split("\n")) for text in texts]
+    docs = [{"type": t, "filename": n, "content": text} for t, n, text in zip(types, names, texts)]
+    pack_docs, i = [], 0
+    for pack in packs:
+        pack_docs.append(docs[i:i + len(pack)])
+        i += len(pack)
+    summaries_dir = os.path.join(scratch, "summaries")
+
+    def summarize():
+        with SummarySink(summaries_dir) as sink:
+            for doc, doc_flags in zip(docs, flags):
+                sink.add(doc["filename"], doc["type"], {"status": "incomplete", "missing_docs": []}, doc_flags)
+
+    n = len(paths)
+    cases = [
+        ("parser.extract_text_from_docx", lambda: [extract_text_from_docx(p) for p in paths], n),
+        ("parser.clean_text", lambda: [clean_text(t) for t in raw_texts], n),
+        ("parser.build_section_index", lambda: [build_section_index(t) for t in texts], n),
+        ("type_detector.classify_documents", lambda: classify_documents(texts, names), n),
+        ("redflags.detect_red_flags",
+         lambda: [detect_red_flags(text, t, sections=sections)
+                  for (text, sections, _), t in zip(extracted, types)], n),
+        ("commenter.comment_on_docx",
+         lambda: [comment_on_docx(p, f, line_map=line_map)
+                  for p, f, (_, _, line_map) in zip(paths, flags, extracted)], n),
+        ("checklist.check_required_docs",
+         lambda: [check_required_docs([d["type"] for d in pd], documents=pd) for pd in pack_docs], len(packs)),
+        ("checklist.check_packs", lambda: check_packs(pack_docs), len(packs)),
+        ("summarizer.SummarySink", summarize, n),
+        ("review_cache.content_key", lambda: [content_key(b, "bench") for b in blobs], n),
+        ("pipeline.review_batch[serial]", lambda: review_batch(paths, workers=1), n),
+        ("pipeline.review_batch[pool]", lambda: review_batch(paths, workers=args.workers), n),
+    ]
+    if not args.no_rag:
+        cases += build_rag_cases(packs, paths, texts, scratch, args)
+    return cases
+
+
+def build_rag_cases(packs: list, paths: list, texts: list, scratch: str, args) -> list:
+    from utils.checklist import check_packs
+    from utils.context_budget import assemble_context
+    from utils.hybrid_retriever import BM25Index
+    from utils.pipeline import review_batch
+    from utils.rag_engine import get_rag_retriever, query_rag_with_timings
+    from utils.review_cache import content_key
+    from utils.session_index import SessionIndex, chunk_text
+    from utils.summarizer import SummarySink
+
+    with open(QUESTIONS_PATH, "r", encoding="utf-8") as f:
+        questions = [q["question"] for q in json.load(f)["queries"]][:args.questions]
+    uploads = [(content_key(t.encode("utf-8")), os.path.basename(p), t) for p, t in zip(paths, texts)]
+    chunks = [(f"{sha[:12]}:{i}", c) for sha, _, t in uploads for i, c in enumerate(chunk_text(t))]
+    get_rag_retriever()  # first load, outside the timings
+
+    def sync_uploads():
+        _reset_upload_embeddings()
+        index = SessionIndex()
+        index.sync(uploads)
+        return index
+
+    index = sync_uploads()
+
+    def ask(session_index):
+        for q in questions:
+            query_rag_with_timings(q, use_cache=False, session_index=session_index)
+
+    def end_to_end():
+        results = review_batch(paths, workers=args.workers)
+        by_pack, i = [], 0
+        for pack in packs:
+            by_pack.append(results[i:i + len(pack)])
+            i += len(pack)
+        checks = check_packs(by_pack)
+        with SummarySink(os.path.join(scratch, "e2e_summaries")) as sink:
+            for pack_results, check in zip(by_pack, checks):
+                for r in pack_results:
+                    sink.add(r["filename"], r["type"], check, r["flags"], timings=r["timings"])
+        ask(sync_uploads())
+
+    return [
+        ("rag_engine.get_rag_retriever[reload]", lambda: get_rag_retriever(force_reload=True), 1),
+        ("hybrid_retriever.BM25Index", lambda: BM25Index(chunks), len(chunks)),
+        ("context_budget.assemble_context", lambda: assemble_context([c for _, c in chunks[:64]], 3000), 1),
+        ("session_index.SessionIndex.sync", sync_uploads, len(uploads)),
+        ("rag_engine.query[ADGM only]", lambda: ask(None), len(questions)),
+        ("rag_engine.query[with uploads]", lambda: ask(index), len(questions)),
+        ("end_to_end", end_to_end, len(paths)),
+    ]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_suite(args) -> dict:
+    manifest = make_corpus(args.corpus_dir, args.size, args.seed)
+    print(f"Corpus {args.size}: {manifest['documents']} documents in {len(manifest['packs'])} packs, "
+          f"{manifest['pages']} pages, {manifest['bytes'] / 2**20:.1f} MB", file=sys.stderr)
+
+    selected = [c.strip() for c in args.cases.split(",") if c.strip()] if args.cases else []
+    results = {}
+    server = None
+    with tempfile.TemporaryDirectory() as scratch:
+        try:
+            if not args.no_rag:
+                try:
+                    server = install_rag_stubs(args.llm_latency)
+                except (ImportError, OSError, RuntimeError) as e:
+                    print(f"RAG cases skipped: {e}", file=sys.stderr)
+                    args.no_rag = True
+            for name, fn, items in build_cases(manifest, scratch, args):
+                if selected and not any(name.startswith(s) for s in selected):
+                    continue
+                result = time_case(fn, args.repeat)
+                result["items"] = items
+                result["items_per_s"] = items / result["median_s"] if result["median_s"] else 0.0
+                results[name] = result
+                print(f"  {name:<40} {result['median_s'] * 1000:10.2f} ms  "
+                      f"({result['items_per_s']:,.1f} items/s)", file=sys.stderr)
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "size": args.size,
+            "seed": args.seed,
+            "generator_version": manifest["generator_version"],
+            "documents": manifest["documents"],
+            "pages": manifest["pages"],
+            "repeat": args.repeat,
+            "workers": args.workers,
+            "rag": not args.no_rag,
+        },
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """
+    Median time per case against the baseline. A case regresses when it is
+    more than threshold (a fraction) slower and by at least min_delta_ms, so
+    sub-millisecond jitter on tiny cases is not reported.
+
+    Returns:
+        list: regressed case names
+    """
+    for key in ("size", "seed", "generator_version", "workers"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            print(f"warning: {key} differs from the baseline "
+                  f"({current['meta'].get(key)!r} vs {baseline['meta'].get(key)!r})")
+    if current["meta"].get("platform") != baseline["meta"].get("platform"):
+        print("warning: the baseline was recorded on another platform; timings may not be comparable")
+
+    print(f"{'case':<40} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    regressed = []
+    for name, result in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>12} {result['median_s'] * 1000:>12.2f} {'new':>8}")
+            continue
+        old, new = base["median_s"], result["median_s"]
+        change = (new - old) / old if old else 0.0
+        mark = ""
+        if change > threshold and (new - old) * 1000 >= min_delta_ms:
+            mark = "  REGRESSION"
+            regressed.append(name)
+        elif change < -threshold and (old - new) * 1000 >= min_delta_ms:
+            mark = "  faster"
+        print(f"{name:<40} {old * 1000:>12.2f} {new * 1000:>12.2f} {change:>+8.1%}{mark}")
+    for name in baseline["cases"]:
+        if name not in current["cases"]:
+            print(f"{name:<40} (not run)")
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--size", choices=sorted(CORPUS_SIZES), default="small")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=None, help="pool size for the pool / end-to-end cases")
+    ap.add_argument("--cases", default="", help="comma-separated case name prefixes to run")
+    ap.add_argument("--no-rag", action="store_true", help="skip the RAG cases")
+    ap.add_argument("--questions", type=int, default=8, help="questions per RAG query case")
+    ap.add_argument("--llm-latency", type=float, default=0.0, help="seconds the Gemini stub waits per answer")
+    ap.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "corporate_agent_bench"),
+                    help="where generated corpora are cached")
+    ap.add_argument("--save", nargs="?", const="", default=None, metavar="PATH",
+                    help="write the results as a baseline (default benchmarks/baselines/<size>.json)")
+    ap.add_argument("--compare", metavar="BASELINE", help="compare against a saved baseline")
+    ap.add_argument("--threshold", type=float, default=0.15, help="slowdown that counts as a regression")
+    ap.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller absolute slowdowns")
+    args = ap.parse_args()
+
+    current = run_suite(args)
+
+    if args.save is not None:
+        path = args.save or os.path.join(BASELINE_DIR, f"{args.size}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {path}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressed = compare(current, baseline, args.threshold, args.min_delta_ms)
+        if regressed:
+            print(f"{len(regressed)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Summary output benchmark: one pretty-printed JSON per document read back
+again (the old app.py flow) versus SummarySink's in-memory dicts plus one
+buffered JSONL run file.
+
+Usage:
+    python benchmarks/summary_sink_bench.py [--docs 5000] [--flags 5]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.summarizer import SummarySink, build_summary, write_summary_file  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--docs", type=int, default=5000)
+    ap.add_argument("--flags", type=int, default=5, help="red flags per document")
+    args = ap.parse_args()
+
+    checklist = {"status": "incomplete", "missing_docs": ["UBO Form", "Register"]}
+    flags = [{"issue": f"Issue {i}", "suggestion": "Fix it.", "quote": "The Company shall ..."}
+             for i in range(args.flags)]
+    names = [f"Document {i}.docx" for i in range(args.docs)]
+
+    print(f"{args.docs} documents, {args.flags} flags each")
+    print(f"{'method':<26} {'seconds':>8} {'files':>7} {'MB':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "per_file")
+        start = time.perf_counter()
+        for name in names:
+            path = write_summary_file(build_summary("Articles of Association", checklist, flags), name, out)
+            with open(path, "r", encoding="utf-8") as f:
+                json.load(f)
+        elapsed = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(out, n)) for n in os.listdir(out))
+        print(f"{'per-file JSON + read back':<26} {elapsed:>8.3f} {len(os.listdir(out)):>7} {size / 2**20:>7.2f}")
+
+        out = os.path.join(tmp, "sink")
+        start = time.perf_counter()
+        with SummarySink(out) as sink:
+            for name in names:
+                sink.add(name, "Articles of Association", checklist, flags, timings={"extract": 0.01})
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(sink.path)
+        print(f"{'SummarySink JSONL':<26} {elapsed:>8.3f} {len(os.listdir(out)):>7} {size / 2**20:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+Synthetic ADGM filings for the benchmarks: Articles and Memoranda of
+Association, board resolutions and UBO declarations, from one page to
+hundreds, with numbered clauses, headers and tables. Output is
+deterministic for a given seed.
+
+A "page" is PARAGRAPHS_PER_PAGE clause paragraphs of roughly 55 words,
+about what a printed page of articles holds.
+
+Usage:
+    python benchmarks/synth_docs.py OUT_DIR [--size medium] [--seed 0]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+
+# Bump when the generated documents change, so cached corpora are rebuilt
+GENERATOR_VERSION = "1"
+
+PARAGRAPHS_PER_PAGE = 8
+
+KINDS = ("aoa", "moa", "board_resolution", "ubo")
+# Filings of the licensing, employment and annual filing processes; make_filing
+# writes them, company-pack corpora (and so the benchmark suite) don't include them
+EXTRA_KINDS = ("licence_application", "business_plan", "lease_agreement", "employment_contract",
+               "offer_letter", "passport_copy", "annual_return")
+
+# Company packs per corpus, and the page range documents are drawn from
+# (log-uniform, so most are short and a few are very long)
+CORPUS_SIZES = {
+    "small": {"packs": 2, "min_pages": 1, "max_pages": 5},
+    "medium": {"packs": 8, "min_pages": 1, "max_pages": 50},
+    "large": {"packs": 16, "min_pages": 1, "max_pages": 500},
+}
+
+COMPANY_WORDS = ["Falcon", "Saadiyat", "Reem", "Maryah", "Gulf", "Pearl", "Horizon", "Dune", "Oryx", "Crescent"]
+COMPANY_SUFFIXES = ["Holdings", "Capital", "Technologies", "Investments", "Trading", "Ventures"]
+PEOPLE = ["Aisha Al Mansoori", "Omar Haddad", "Priya Nair", "James Whitfield", "Fatima Khalil",
+          "Chen Wei", "Yousef Al Marzouqi", "Elena Petrova", "Rahul Mehta", "Sara Lindqvist"]
+NATIONALITIES = ["Emirati", "Jordanian", "Indian", "British", "Egyptian", "Chinese", "Russian", "Swedish"]
+
+AOA_SECTIONS = [
+    ("INTERPRETATION", ["In these Articles, unless the context otherwise requires, words and expressions "
+                        "defined in the Companies Regulations 2020 shall bear the same meaning.",
+                        "The Model Articles shall not apply to the Company except as expressly incorporated."]),
+    ("SHARE CAPITAL", ["The share capital of the Company is divided into ordinary shares with such rights "
+                       "as the directors may determine by ordinary resolution.",
+                       "Subject to the Regulations, any class of shares may be issued on terms that they are "
+                       "to be redeemed at the option of the Company or the holder."]),
+    ("TRANSFER OF SHARES", ["No transfer of shares shall be registered unless the instrument of transfer "
+                            "is lodged at the registered office accompanied by the relevant certificate.",
+                            "The directors may refuse to register the transfer of a share on which the "
+                            "Company has a lien."]),
+    ("APPOINTMENT OF DIRECTORS", ["The number of directors shall not be less than one and any person who is "
+                                  "willing to act may be appointed by ordinary resolution.",
+                                  "A director shall cease to hold office if he becomes prohibited by law from "
+                                  "being a director or resigns by notice in writing."]),
+    ("PROCEEDINGS OF DIRECTORS", ["The quorum for the transaction of the business of the directors shall be two "
+                                  "unless otherwise fixed by the directors.",
+                                  "Questions arising at any meeting shall be decided by a majority of votes and "
+                                  "the chairman shall not have a casting vote."]),
+    ("GENERAL MEETINGS", ["The directors may call a general meeting and shall do so on the requisition of "
+                          "members holding not less than five percent of the paid up share capital.",
+                          "No business shall be transacted at any general meeting unless a quorum is present."]),
+    ("DIVIDENDS", ["The Company may by ordinary resolution declare dividends but no dividend shall exceed "
+                   "the amount recommended by the directors.",
+                   "Dividends shall be paid out of profits available for distribution under the Regulations."]),
+    ("INDEMNITY", ["Every director or other officer of the Company shall be indemnified out of the assets "
+                   "of the Company against any liability incurred in the actual or purported execution of "
+                   "his duties."]),
+    ("TERMINATION OF APPOINTMENTS", ["The appointment of any officer may be subject to termination by "
+                                     "resolution of the directors in accordance with these Articles."]),
+]
+GOVERNING_LAW = ("GOVERNING LAW", ["These Articles shall be governed by the laws of the Abu Dhabi Global "
+                                   "Market and any dispute shall be subject to the jurisdiction of the ADGM "
+                                   "Courts."])
+FILLER = ["Without prejudice to the generality of the foregoing, the directors shall act in good faith "
+          "and in the manner most likely to promote the success of the Company for the benefit of its "
+          "members as a whole, having regard to the long term consequences of any decision.",
+          "Any notice to be given under these Articles shall be in writing and may be served personally, "
+          "by post to the registered address of the member or by electronic means where permitted by the "
+          "Regulations and the member has so agreed.",
+          "Where the Company has only one member, that member shall constitute a quorum and any decision "
+          "taken by the sole member shall be recorded in writing and kept with the minutes of the Company.",
+          "The Registrar of Companies shall be notified of any change of particulars within fourteen days "
+          "and the register of members and directors shall be kept at the registered office in Abu Dhabi."]
+
+# Boilerplate for EXTRA_KINDS; FILLER is articles wording
+GENERAL_FILLER = ["All information in this document is confidential and is provided for the purpose stated "
+                  "above only; it may not be disclosed to third parties without prior written consent.",
+                  "Amounts are stated in United Arab Emirates Dirham unless otherwise indicated, and dates "
+                  "follow the Gregorian calendar.",
+                  "Queries regarding this document may be addressed to the contact person named above during "
+                  "normal business hours, Monday to Friday.",
+                  "Supporting documents referred to in this document are available on request and form part "
+                  "of the submission."]
+
+def company_name(rng) -> str:
+    return f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)} Limited"
+
+
+def _clauses(rng, sections: list, paragraphs: int, filler: list = FILLER) -> list:
+    """(heading or None, text) pairs: numbered sections and sub-clauses filling `paragraphs`."""
+    per_section = max(1, paragraphs // len(sections))
+    out = []
+    for number, (heading, clauses) in enumerate(sections, 1):
+        out.append((f"{number}. {heading}", None))
+        for sub in range(1, per_section + 1):
+            text = clauses[sub - 1] if sub <= len(clauses) else rng.choice(filler)
+            out.append((None, f"{number}.{sub} {text}"))
+    return out
+
+
+def _add_table(doc, header: list, rows: list):
+    table = doc.add_table(rows=1 + len(rows), cols=len(header))
+    for cell, text in zip(table.rows[0].cells, header):
+        cell.text = text
+    for row, values in zip(table.rows[1:], rows):
+        for cell, text in zip(row.cells, values):
+            cell.text = str(text)
+
+
+def _people(rng, n: int) -> list:
+    return rng.sample(PEOPLE, min(n, len(PEOPLE)))
+
+
+def make_filing(path: str, kind: str, pages: int, seed: int = 0, company: str = None):
+    """
+    Write one synthetic filing.
+
+    Args:
+        path (str): Output .docx path
+        kind (str): One of KINDS or EXTRA_KINDS
+        pages (int): Approximate length in pages (see PARAGRAPHS_PER_PAGE)
+        seed (int): Same seed, same document
+        company (str): Company name; drawn from the seed when not given
+    """
+    from docx import Document
+
+    rng = random.Random(f"{kind}:{pages}:{seed}")
+    company = company or company_name(rng)
+    paragraphs = max(1, pages * PARAGRAPHS_PER_PAGE)
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = f"{company} - Abu Dhabi Global Market"
+    doc.sections[0].footer.paragraphs[0].text = "Registered in the Abu Dhabi Global Market"
+
+    if kind == "aoa":
+        doc.add_heading(f"ARTICLES OF ASSOCIATION OF {company.upper()}", level=0)
+        doc.add_paragraph("A private company limited by shares incorporated under the Companies Regulations 2020.")
+        sections = list(AOA_SECTIONS)
+        if rng.random() < 0.7:  # the rest trip the missing governing law rule
+            sections.append(GOVERNING_LAW)
+        for heading, text in _clauses(rng, sections, paragraphs):
+            if heading:
+                doc.add_heading(heading, level=1)
+            else:
+                doc.add_paragraph(text)
+            if heading and "SHARE CAPITAL" in heading:
+                _add_table(doc, ["Class of shares", "Number", "Nominal value (USD)"],
+                           [["Ordinary", rng.randrange(1000, 100000, 1000), "1.00"],
+                            ["Preference", rng.randrange(0, 10000, 500), "1.00"]])
+
+    elif kind == "moa":
+        doc.add_heading(f"MEMORANDUM OF ASSOCIATION OF {company.upper()}", level=0)
+        doc.add_paragraph("Each subscriber to this memorandum of association wishes to form a company under "
+                          "the Companies Regulations 2020 and agrees to become a member of the company and, "
+                          "in the case of a company that is to have a share capital, to take at least one share.")
+        doc.add_paragraph("The liability of the members is limited to the amount, if any, unpaid on their shares.")
+        subscribers = _people(rng, rng.randint(1, 4))
+        _add_table(doc, ["Name of subscriber", "Nationality", "Number of shares taken", "Signature"],
+                   [[name, rng.choice(NATIONALITIES), rng.randrange(100, 10000, 100), ""] for name in subscribers])
+        sections = [("REGISTERED OFFICE", ["The registered office of the Company will be situated in the "
+                                           "Abu Dhabi Global Market."]),
+                    ("OBJECTS", ["The objects of the Company are unrestricted save as provided by the "
+                                 "Regulations."]),
+                    ("LIABILITY", ["The liability of the members is limited."])]
+        if rng.random() < 0.7:
+            sections.append(GOVERNING_LAW)
+        for heading, text in _clauses(rng, sections, max(0, paragraphs - 3)):
+            if heading:
+                doc.add_heading(heading, level=1)
+            else:
+                doc.add_paragraph(text)
+
+    elif kind == "board_resolution":
+        doc.add_heading(f"WRITTEN RESOLUTIONS OF THE BOARD OF DIRECTORS OF {company.upper()}", level=0)
+        directors = _people(rng, rng.randint(2, 5))
+        doc.add_paragraph(f"Directors present: {', '.join(directors)}. The chairman noted that a quorum "
+                          "was present and the meeting of the board was duly convened.")
+        matters = ["the opening of a bank account with an ADGM licensed bank",
+                   "the appointment of a company secretary",
+                   "the allotment of ordinary shares to the subscribers",
+                   "the adoption of the registered office address",
+                   "the filing of the annual return with the Registrar of Companies"]
+        for number in range(1, max(1, paragraphs // 2) + 1):
+            doc.add_paragraph(f"{number}. IT IS RESOLVED THAT the board approves {rng.choice(matters)}.")
+            doc.add_paragraph(f"{number}.1 {rng.choice(FILLER)}")
+        _add_table(doc, ["Director", "Signature", "Date"], [[name, "", "2024-05-01"] for name in directors])
+
+    elif kind == "ubo":
+        doc.add_heading("ULTIMATE BENEFICIAL OWNER (UBO) DECLARATION FORM", level=0)
+        doc.add_paragraph(f"Entity name: {company}. This declaration is made under the Beneficial Ownership "
+                          "and Control Regulations 2022 and lists every beneficial owner of the entity.")
+        owners = _people(rng, rng.randint(1, 6))
+        shares = [rng.randint(5, 60) for _ in owners]
+        _add_table(doc, ["Beneficial owner", "Nationality", "Percentage held", "Nature of control"],
+                   [[name, rng.choice(NATIONALITIES), f"{pct}%", "Direct shareholding"]
+                    for name, pct in zip(owners, shares)])
+        for number in range(1, paragraphs + 1):
+            doc.add_paragraph(f"{number}. {rng.choice(FILLER)}")
+        doc.add_paragraph("I confirm that the information provided is true and accurate. Signature of declarant:")
+
+    elif kind == "licence_application":
+        doc.add_heading("APPLICATION FOR A COMMERCIAL LICENCE", level=0)
+        doc.add_paragraph(f"Applicant entity: {company}. Submitted to the ADGM Registration Authority.")
+        _add_table(doc, ["Field", "Details"],
+                   [["Trade name", company], ["Licence type", rng.choice(["Non-Financial", "Retail", "Tech Start-up"])],
+                    ["Proposed activities", rng.choice(["Management consultancy", "Software development",
+                                                        "General trading"])],
+                    ["Authorised signatory", rng.choice(PEOPLE)]])
+        for number in range(1, paragraphs + 1):
+            doc.add_paragraph(f"{number}. {rng.choice(GENERAL_FILLER)}")
+        doc.add_paragraph("The applicant confirms that the licensed activities will be carried on from the "
+                          "premises stated above.")
+
+    elif kind == "business_plan":
+        doc.add_heading(f"{company.upper()} BUSINESS PLAN", level=0)
+        sections = [("EXECUTIVE SUMMARY", ["The company will serve mid-sized firms in the region from an "
+                                           "office in the Abu Dhabi Global Market."]),
+                    ("MARKET ANALYSIS", ["Our target market is growing steadily and the competitive landscape "
+                                         "is fragmented among small local providers."]),
+                    ("FINANCIAL PROJECTIONS", ["The revenue forecast assumes break-even in the second year of "
+                                               "operations."]),
+                    ("MILESTONES", ["Key milestones include hiring the first ten staff and opening a second "
+                                    "office."])]
+        for heading, text in _clauses(rng, sections, paragraphs, GENERAL_FILLER):
+            if heading:
+                doc.add_heading(heading, level=1)
+            else:
+                doc.add_paragraph(text)
+        _add_table(doc, ["Year", "Revenue (AED)", "Costs (AED)"],
+                   [[year, rng.randrange(1, 50) * 100000, rng.randrange(1, 40) * 100000] for year in (1, 2, 3)])
+
+    elif kind == "lease_agreement":
+        doc.add_heading("TENANCY AGREEMENT", level=0)
+        doc.add_paragraph(f"This agreement is made between Al Maryah Properties LLC (the Landlord) and {company} "
+                          "(the Tenant) for the leased premises described below.")
+        sections = [("PREMISES", ["The Landlord lets the premises on Al Maryah Island to the Tenant for use as "
+                                  "offices."]),
+                    ("RENT", ["The annual rent is payable in four equal instalments in advance, and a security "
+                              "deposit is held by the Landlord."]),
+                    ("TERM", ["The term of the lease is three years from the commencement date."])]
+        for heading, text in _clauses(rng, sections, paragraphs, GENERAL_FILLER):
+            if heading:
+                doc.add_heading(heading, level=1)
+            else:
+                doc.add_paragraph(text)
+
+    elif kind == "employment_contract":
+        employee = rng.choice(PEOPLE)
+        doc.add_heading("CONTRACT OF EMPLOYMENT", level=0)
+        doc.add_paragraph(f"Between {company} (the Employer) and {employee} (the Employee).")
+        sections = [("POSITION", ["The Employee is employed in the job title of Operations Manager."]),
+                    ("REMUNERATION", ["The Employee shall receive a basic salary of AED 25,000 per month."]),
+                    ("LEAVE", ["The Employee is entitled to 30 working days of annual leave per year."]),
+                    ("TERMINATION", ["Either party may end this contract by giving a notice period of one "
+                                     "month; end of service gratuity is payable under the Employment "
+                                     "Regulations."])]
+        for heading, text in _clauses(rng, sections, paragraphs, GENERAL_FILLER):
+            if heading:
+                doc.add_heading(heading, level=1)
+            else:
+                doc.add_paragraph(text)
+
+    elif kind == "offer_letter":
+        candidate = rng.choice(PEOPLE)
+        doc.add_paragraph("2024-04-15")
+        doc.add_paragraph(f"Dear {candidate},")
+        doc.add_paragraph(f"We are pleased to offer you the position of Senior Analyst at {company}. Your "
+                          "proposed start date is 1 June 2024 and your compensation package is set out below.")
+        _add_table(doc, ["Item", "Amount (AED per month)"],
+                   [["Basic salary", rng.randrange(15, 40) * 1000], ["Housing allowance", rng.randrange(3, 10) * 1000]])
+        for _ in range(max(0, paragraphs - 4)):
+            doc.add_paragraph(rng.choice(GENERAL_FILLER))
+        doc.add_paragraph("This offer is subject to the employment contract. Please sign below to confirm "
+                          "your acceptance of this offer.")
+
+    elif kind == "passport_copy":
+        holder = rng.choice(PEOPLE).split()
+        doc.add_paragraph("PASSPORT")
+        _add_table(doc, ["Field", "Value"],
+                   [["Surname", holder[-1].upper()], ["Given names", " ".join(holder[:-1]).upper()],
+                    ["Nationality", rng.choice(NATIONALITIES)], ["Date of birth", "1985-03-12"],
+                    ["Place of birth", "Abu Dhabi"], ["Sex", rng.choice(["M", "F"])],
+                    ["Passport No", f"P{rng.randrange(10**7, 10**8)}"], ["Date of issue", "2019-08-01"],
+                    ["Date of expiry", "2029-07-31"], ["Issuing authority", "Ministry of Interior"]])
+        doc.add_paragraph("Certified true copy of the original.")
+
+    elif kind == "annual_return":
+        doc.add_heading("ANNUAL RETURN", level=0)
+        doc.add_paragraph(f"Company: {company}. Made up to 31 December 2023 and filed with the Registrar of "
+                          "Companies together with the filing fee.")
+        _add_table(doc, ["Particulars of members", "Shares held"],
+                   [[name, rng.randrange(100, 10000, 100)] for name in _people(rng, rng.randint(1, 4))])
+        doc.add_paragraph("Statement of capital: ordinary shares of USD 1 each, fully paid.")
+        for number in range(1, paragraphs + 1):
+            doc.add_paragraph(f"{number}. {rng.choice(GENERAL_FILLER)}")
+
+    else:
+        raise ValueError(f"Unknown kind {kind!r}; expected one of {KINDS + EXTRA_KINDS}")
+
+    doc.save(path)
+
+
+FILENAMES = {
+    "aoa": "Articles of Association.docx",
+    "moa": "Memorandum of Association.docx",
+    "board_resolution": "Board Resolution.docx",
+    "ubo": "UBO Declaration Form.docx",
+    "licence_application": "Licence Application Form.docx",
+    "business_plan": "Business Plan.docx",
+    "lease_agreement": "Lease Agreement.docx",
+    "employment_contract": "Employment Contract.docx",
+    "offer_letter": "Offer Letter.docx",
+    "passport_copy": "Passport Copy.docx",
+    "annual_return": "Annual Return.docx",
+}
+
+# The document type (utils/rules/doc_types.json) each kind should be classified as
+DOC_TYPES = {
+    "aoa": "Articles of Association",
+    "moa": "Memorandum of Association",
+    "board_resolution": "Board Resolution",
+    "ubo": "UBO Form",
+    "licence_application": "Licence Application Form",
+    "business_plan": "Business Plan",
+    "lease_agreement": "Lease Agreement",
+    "employment_contract": "Employment Contract",
+    "offer_letter": "Offer Letter",
+    "passport_copy": "Passport Copy",
+    "annual_return": "Annual Return",
+}
+
+
+def make_corpus(out_dir: str, size: str = "small", seed: int = 0) -> dict:
+    """
+    Build (or reuse) a corpus of company packs under out_dir/<size>-s<seed>-g<version>.
+    Each pack is a directory with one filing per kind; some packs miss a
+    document so checklists have something to report. The largest corpus
+    always has one document of max_pages.
+
+    Returns:
+        dict: the manifest: size, seed, root, packs ([{pack, documents:
+        [{path, kind, pages}]}]), documents, pages and bytes
+    """
+    spec = CORPUS_SIZES[size]
+    root = os.path.join(out_dir, f"{size}-s{seed}-g{GENERATOR_VERSION}")
+    manifest_path = os.path.join(root, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    rng = random.Random(f"corpus:{size}:{seed}")
+    log_min, log_max = math.log(spec["min_pages"]), math.log(spec["max_pages"])
+    packs = []
+    for p in range(spec["packs"]):
+        pack_dir = os.path.join(root, f"pack_{p:03d}")
+        os.makedirs(pack_dir, exist_ok=True)
+        company = company_name(rng)
+        kinds = [k for k in KINDS if p % 3 != 2 or k != "ubo"]  # every third pack lacks its UBO form
+        documents = []
+        for kind in kinds:
+            pages = int(round(math.exp(rng.uniform(log_min, log_max))))
+            if p == 0 and kind == "aoa":
+                pages = spec["max_pages"]
+            path = os.path.join(pack_dir, FILENAMES[kind])
+            make_filing(path, kind, pages, seed=seed * 1000 + p, company=company)
+            documents.append({"path": path, "kind": kind, "pages": pages})
+        packs.append({"pack": pack_dir, "documents": documents})
+
+    docs = [d for pack in packs for d in pack["documents"]]
+    manifest = {
+        "size": size,
+        "seed": seed,
+        "generator_version": GENERATOR_VERSION,
+        "root": root,
+        "packs": packs,
+        "documents": len(docs),
+        "pages": sum(d["pages"] for d in docs),
+        "bytes": sum(os.path.getsize(d["path"]) for d in docs),
+    }
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)  # written last: a manifest means a complete corpus
+    return manifest
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("out_dir")
+    ap.add_argument("--size", choices=sorted(CORPUS_SIZES), default="medium")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    manifest = make_corpus(args.out_dir, args.size, args.seed)
+    print(f"{manifest['documents']} documents, {manifest['pages']} pages, "
+          f"{manifest['bytes'] / 2**20:.1f} MB in {manifest['root']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
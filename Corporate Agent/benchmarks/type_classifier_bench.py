@@ -0,0 +1,113 @@
+"""
+Document-type detection: the original first-match rules versus the
+nearest-centroid classifier (utils/type_detector.py), on held-out filings.
+By default these are benchmarks/synth_docs.py documents, whose wording is
+written independently of the prototype phrases in doc_types.json; pass
+--corpus with a labels file to score real filings instead. Each document
+is classified with its informative and with a generic filename, and with
+and without its title line. Reports accuracy and documents per second,
+classifying one document per call and the whole set in one batch.
+
+Usage:
+    python benchmarks/type_classifier_bench.py [--docs 200] [--max-pages 5] [--seed 0]
+    python benchmarks/type_classifier_bench.py --corpus filings/ --labels labels.json
+        (labels.json: {"<file name>": "<document type>", ...})
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth_docs import DOC_TYPES, FILENAMES, make_filing  # noqa: E402
+from utils.parser import extract_text_from_docx  # noqa: E402
+from utils.type_detector import detect_document_type_rules, get_default_classifier  # noqa: E402
+
+
+def synthetic_documents(n: int, max_pages: int, seed: int, out_dir: str) -> list:
+    """[(text, informative filename, label)] for n generated filings."""
+    rng = random.Random(f"types:{seed}")
+    kinds = list(DOC_TYPES)
+    docs = []
+    for i in range(n):
+        kind = kinds[i % len(kinds)]
+        path = os.path.join(out_dir, f"{i:05d}_{FILENAMES[kind]}")
+        make_filing(path, kind, rng.randint(1, max_pages), seed=seed * 100000 + i)
+        docs.append((extract_text_from_docx(path), FILENAMES[kind], DOC_TYPES[kind]))
+    return docs
+
+
+def labelled_documents(corpus: str, labels_path: str) -> list:
+    """[(text, filename, label)] for the real filings listed in the labels file."""
+    with open(labels_path, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    return [(extract_text_from_docx(os.path.join(corpus, name)), name, label) for name, label in labels.items()]
+
+
+def untitled(text: str) -> str:
+    """The text without its first line, usually the document title."""
+    return text.split("\n", 1)[1] if "\n" in text else text
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--docs", type=int, default=200, help="synthetic filings to generate")
+    ap.add_argument("--max-pages", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--corpus", help="directory of real .docx filings")
+    ap.add_argument("--labels", help="JSON {file name: document type} for --corpus")
+    args = ap.parse_args()
+
+    if args.corpus:
+        if not args.labels:
+            ap.error("--corpus needs --labels")
+        docs = labelled_documents(args.corpus, args.labels)
+        source = f"filings in {args.corpus}"
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            docs = synthetic_documents(args.docs, args.max_pages, args.seed, tmp)
+        source = "synthetic filings (benchmarks/synth_docs.py)"
+
+    labels = [d[2] for d in docs]
+    classifier = get_default_classifier()
+
+    def rules(texts, names):
+        return [detect_document_type_rules(t, f) for t, f in zip(texts, names)]
+
+    def single(texts, names):
+        return [classifier.classify(t, f)[0][0] for t, f in zip(texts, names)]
+
+    def batch(texts, names):
+        return [ranked[0][0] for ranked in classifier.classify_batch(texts, names)]
+
+    variants = {
+        "informative": ([d[0] for d in docs], [d[1] for d in docs]),
+        "generic": ([d[0] for d in docs], [f"upload_{i}.docx" for i in range(len(docs))]),
+        "generic, untitled": ([untitled(d[0]) for d in docs], [f"upload_{i}.docx" for i in range(len(docs))]),
+    }
+
+    print(f"{len(docs)} {source}: " + ", ".join(f"{n} {t}" for t, n in sorted(Counter(labels).items())))
+    print(f"{'method':<20} {'input':<18} {'accuracy':>9} {'docs/s':>10}")
+    errors = Counter()
+    for method, fn in (("rules", rules), ("classifier single", single), ("classifier batch", batch)):
+        for variant, (texts, names) in variants.items():
+            start = time.perf_counter()
+            predicted = fn(texts, names)
+            elapsed = time.perf_counter() - start
+            accuracy = sum(p == y for p, y in zip(predicted, labels)) / len(labels)
+            print(f"{method:<20} {variant:<18} {accuracy:>9.3f} {len(docs) / elapsed:>10.0f}")
+            if method == "classifier batch":
+                errors.update((y, p) for p, y in zip(predicted, labels) if p != y)
+    if errors:
+        print("\nClassifier confusions (expected -> predicted):")
+        for (expected, predicted), n in errors.most_common(10):
+            print(f"  {n:>4}  {expected} -> {predicted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Convert the RAG vector store to the compact layout (native FAISS file plus
+SQLite tables of node texts and BM25 postings). Re-run after ingest_cli.py
+to refresh it, then start the app with RAG_STORE_BACKEND=compact.
+
+Usage:
+    python compact_cli.py [--src utils/vector_store] [--dst utils/vector_store_compact]
+"""
+import argparse
+import json
+
+from utils.ann_index import resolve_store_dir
+from utils.compact_store import convert_vector_store
+from utils.rag_engine import COMPACT_DIR, PERSIST_DIR
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build the compact RAG store from the JSON docstore.")
+    ap.add_argument("--src", default=PERSIST_DIR, help="llama_index persist dir")
+    ap.add_argument("--dst", default=COMPACT_DIR, help="compact store to (re)write")
+    args = ap.parse_args(argv)
+
+    print(json.dumps(convert_vector_store(resolve_store_dir(args.src), args.dst), indent=2))
+
+
+if __name__ == "__main__":
+    main()
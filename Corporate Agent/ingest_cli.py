@@ -0,0 +1,41 @@
+"""
+Incrementally update the ADGM RAG vector store from a folder of sources
+(.pdf, .docx, .txt, .md). Only new or changed documents are chunked and
+embedded; the store is swapped in atomically.
+
+Usage:
+    python ingest_cli.py SOURCE_DIR [--persist-dir utils/vector_store] [--prune] [--dry-run]
+"""
+import argparse
+import json
+
+from utils.index_builder import ingest
+from utils.rag_engine import PERSIST_DIR
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Add new or changed ADGM sources to the RAG index.")
+    ap.add_argument("source_dir", help="folder of regulations / templates to ingest")
+    ap.add_argument("--persist-dir", default=PERSIST_DIR, help="vector store to update")
+    ap.add_argument("--prune", action="store_true",
+                    help="also remove stored documents whose file is not in SOURCE_DIR")
+    ap.add_argument("--batch-size", type=int, default=64, help="texts per embedding call")
+    ap.add_argument("--chunk-size", type=int, default=1024)
+    ap.add_argument("--chunk-overlap", type=int, default=200)
+    ap.add_argument("--dry-run", action="store_true", help="report what would change, write nothing")
+    args = ap.parse_args(argv)
+
+    stats = ingest(
+        args.source_dir,
+        persist_dir=args.persist_dir,
+        prune=args.prune,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
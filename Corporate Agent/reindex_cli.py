@@ -0,0 +1,43 @@
+"""
+Rebuild the RAG vector index as an approximate FAISS index (IVF-Flat, HNSW,
+IVF-PQ, IVF-SQ8) or back to the exact flat scan, reusing the stored vectors.
+Use benchmarks/ann_eval.py first to pick a configuration.
+
+Usage:
+    python reindex_cli.py ivf_flat --nprobe 8
+    python reindex_cli.py hnsw --hnsw-m 32 --ef-search 64
+    python reindex_cli.py "IVF1024,PQ48"      # any FAISS index_factory string
+"""
+import argparse
+import json
+
+from utils.ann_index import INDEX_KINDS
+from utils.index_builder import rebuild_vector_index
+from utils.rag_engine import PERSIST_DIR
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rebuild the RAG vector index with another FAISS index type.")
+    ap.add_argument("kind", help=f"one of {', '.join(INDEX_KINDS)} or a FAISS index_factory string")
+    ap.add_argument("--persist-dir", default=PERSIST_DIR, help="vector store to re-index")
+    ap.add_argument("--nlist", type=int, help="IVF cells (default ~4*sqrt(n))")
+    ap.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node")
+    ap.add_argument("--pq-m", type=int, help="PQ sub-quantizers (default dim/8)")
+    ap.add_argument("--nprobe", type=int, help="IVF cells visited per query, saved with the store")
+    ap.add_argument("--ef-search", type=int, help="HNSW search depth, saved with the store")
+    args = ap.parse_args(argv)
+
+    stats = rebuild_vector_index(
+        args.persist_dir,
+        kind=args.kind,
+        nlist=args.nlist,
+        hnsw_m=args.hnsw_m,
+        pq_m=args.pq_m,
+        nprobe=args.nprobe,
+        ef_search=args.ef_search,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
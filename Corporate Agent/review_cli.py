@@ -0,0 +1,223 @@
+"""
+Headless document review for files or whole directory trees.
+
+Every .docx found is run through parser -> type_detector -> redflags ->
+commenter, files are grouped into company packs (one pack per directory) for
+check_required_docs, and document summaries go to one JSONL run file
+(summaries_<run id>.jsonl, or one JSON per document with
+--per-file-summaries). Results go to a single JSONL stream; re-running with
+--resume skips packs already in it.
+
+--metrics-file writes the run's per-stage histograms and counters in the
+Prometheus text format; METRICS_LOG=1 adds one JSON log line per document on
+stderr. --profile saves a cProfile report of the run (reviewing in one
+process unless --jobs is given, since pool workers are not profiled).
+
+RAG is never loaded, so no GEMINI_API_KEY is needed.
+
+Usage:
+    python review_cli.py ARCHIVE_DIR [more dirs or .docx files] \\
+        [--jobs N] [--output results.jsonl] [--resume] [--process incorporation]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+from utils.checklist import check_required_docs, get_default_registry
+from utils.metrics import get_metrics, profile
+from utils.pipeline import iter_review
+from utils.summarizer import SummarySink
+
+
+def find_docx_files(inputs: list) -> list:
+    """Expand files/directories into a sorted list of .docx paths."""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in files:
+                    found.add(os.path.join(root, name))
+        else:
+            found.add(item)
+
+    return sorted(
+        os.path.abspath(p) for p in found
+        if p.lower().endswith(".docx")
+        and not os.path.basename(p).startswith("~$")  # Word lock files
+        and not p.lower().endswith("_reviewed.docx")  # our own output
+    )
+
+
+def group_into_packs(paths: list) -> "OrderedDict[str, list]":
+    """One company pack per directory, in sorted path order."""
+    packs = OrderedDict()
+    for p in paths:
+        packs.setdefault(os.path.dirname(p), []).append(p)
+    return packs
+
+
+def load_completed_packs(output_path: str) -> set:
+    """
+    Read an existing results stream, keep only the records of packs that were
+    fully written and rewrite the file without any trailing partial pack.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    completed = set()
+    records = []
+    truncated = False
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                truncated = True  # partial last line from an interrupted run
+                break
+            records.append(rec)
+            if rec.get("record") == "pack":
+                completed.add(rec["pack"])
+
+    kept = [r for r in records if r.get("pack") in completed]
+    if truncated or len(kept) != len(records):
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for rec in kept:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, output_path)
+
+    return completed
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _review_pack(pack: str, docs: list, sink: SummarySink, stage_times: dict,
+                 process: str = "incorporation") -> list:
+    """Run checklist + summaries for one pack and build its JSONL records."""
+    start = time.perf_counter()
+    checklist_result = check_required_docs([d["type"] for d in docs], process, documents=docs)
+    stage_times["checklist"].append(time.perf_counter() - start)
+
+    records = []
+    for doc in docs:
+        summary = {}
+        if sink is not None:
+            start = time.perf_counter()
+            summary = sink.add(
+                doc["filename"], doc["type"], checklist_result, doc["flags"],
+                timings=doc["timings"], extra={"pack": pack, "path": doc["path"]},
+            )
+            doc["timings"]["summarize"] = time.perf_counter() - start
+
+        for stage, seconds in doc["timings"].items():
+            stage_times.setdefault(stage, []).append(seconds)
+
+        records.append({
+            "record": "document",
+            "pack": pack,
+            "path": doc["path"],
+            "filename": doc["filename"],
+            "type": doc["type"],
+            "type_scores": doc["type_scores"],
+            "red_flags": doc["flags"],
+            "reviewed_path": doc["updated_path"],
+            "summary_path": summary.get("summary_path"),
+            "content_length": len(doc["content"]),
+            "timings": doc["timings"],
+            "error": doc["error"],
+        })
+
+    records.append({
+        "record": "pack",
+        "pack": pack,
+        "run_id": sink.run_id if sink is not None else None,
+        "documents": len(docs),
+        "status": checklist_result["status"],
+        "missing_docs": checklist_result["missing_docs"],
+        "issues": checklist_result["issues"],
+        "compliance_score": checklist_result["compliance_score"],
+    })
+    return records
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Review ADGM .docx files without the Streamlit UI.")
+    ap.add_argument("inputs", nargs="+", help=".docx files and/or directories to walk")
+    ap.add_argument("--jobs", "-j", "--workers", dest="jobs", type=int, default=None,
+                    help="parallel workers (default: CPU count)")
+    ap.add_argument("--output", "-o", default="review_results.jsonl", help="JSONL result stream")
+    ap.add_argument("--resume", action="store_true", help="skip packs already in --output")
+    ap.add_argument("--summaries-dir", default="outputs",
+                    help="folder for the summary run file ('' to skip summaries)")
+    ap.add_argument("--per-file-summaries", action="store_true",
+                    help="also write one summary JSON per document")
+    ap.add_argument("--parquet", action="store_true", help="also write the run's summaries as Parquet (pyarrow)")
+    ap.add_argument("--process", default="incorporation", choices=get_default_registry().processes(),
+                    help="checklist to verify each pack against")
+    ap.add_argument("--metrics-file", default="", help="write Prometheus text metrics here at the end")
+    ap.add_argument("--profile", metavar="DIR", default="",
+                    help="profile the run into DIR (cProfile, or pyinstrument with PROFILER=pyinstrument)")
+    args = ap.parse_args(argv)
+    if args.profile and args.jobs is None:
+        args.jobs = 1
+
+    packs = group_into_packs(find_docx_files(args.inputs))
+
+    completed = load_completed_packs(args.output) if args.resume else set()
+    pending = OrderedDict((k, v) for k, v in packs.items() if k not in completed)
+    if completed:
+        print(f"[review_cli.py] Resuming: {len(packs) - len(pending)} of {len(packs)} packs already done",
+              file=sys.stderr)
+
+    paths = [p for files in pending.values() for p in files]
+    stage_times = {"checklist": []}
+    n_docs = 0
+    run_start = time.perf_counter()
+
+    sink = None
+    if args.summaries_dir:
+        sink = SummarySink(args.summaries_dir, per_file=args.per_file_summaries, parquet=args.parquet)
+
+    mode = "a" if args.resume else "w"
+    with profile("review_cli", args.profile, enabled=bool(args.profile)), \
+            open(args.output, mode, encoding="utf-8") as out:
+        results = iter_review(paths, workers=args.jobs)
+        for pack, files in pending.items():
+            docs = [next(results) for _ in files]
+            records = _review_pack(pack, docs, sink, stage_times, args.process)
+            if sink is not None:
+                sink.flush()  # summaries on disk before the pack counts as done
+            # one write per pack; load_completed_packs() drops any partial tail
+            out.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+            out.flush()
+            n_docs += len(docs)
+
+    if sink is not None:
+        sink.close()
+        print(f"[review_cli.py] Summaries for run {sink.run_id}: {sink.path}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - run_start
+    rate = n_docs / elapsed if elapsed > 0 else 0.0
+    print(f"[review_cli.py] {n_docs} docs in {len(pending)} packs, {elapsed:.2f}s ({rate:.1f} docs/sec)",
+          file=sys.stderr)
+    for stage, values in stage_times.items():
+        if values:
+            print(f"  {stage:<12} p50 {_percentile(values, 50) * 1000:8.1f} ms"
+                  f"   p95 {_percentile(values, 95) * 1000:8.1f} ms", file=sys.stderr)
+    if args.metrics_file:
+        get_metrics().write_prometheus(args.metrics_file)
+        print(f"[review_cli.py] Metrics written to {args.metrics_file}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import json
+import math
+import os
+
+# Written next to default__vector_store.json when the index is not a flat scan
+INDEX_CONFIG_FILE = "faiss_index.json"
+EXACT_VECTORS_FILE = "exact_vectors.npy"
+
+INDEX_KINDS = ("flat", "ivf_flat", "hnsw", "ivf_pq", "ivf_sq8")
+
+# Updated stores keep each version in versions/<id>/ and name the live one in
+# CURRENT, which is replaced atomically (see index_builder._persist_atomically)
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+
+
+def resolve_store_dir(persist_dir: str) -> str:
+    """
+    The directory holding the live version of a store: the version named in
+    persist_dir/CURRENT, or persist_dir itself for a store never updated.
+    """
+    try:
+        with open(os.path.join(persist_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return persist_dir
+    path = os.path.join(persist_dir, VERSIONS_DIR, name)
+    return path if name and os.path.isdir(path) else persist_dir
+
+
+def index_spec(kind: str, ntotal: int, dim: int, nlist: int = None,
+               hnsw_m: int = 32, pq_m: int = None) -> str:
+    """
+    FAISS index_factory string for one of INDEX_KINDS, sized for ntotal
+    vectors. Anything else is taken to be a factory string already
+    (e.g. "IVF256,PQ32") and returned unchanged.
+
+    Args:
+        nlist: IVF cells; defaults to ~4*sqrt(n), capped so every cell
+            gets the 39 training points FAISS asks for
+        hnsw_m: HNSW neighbours per node
+        pq_m: PQ sub-quantizers (must divide dim); defaults to dim // 8
+    """
+    if kind not in INDEX_KINDS:
+        return kind
+    if kind == "flat":
+        return "Flat"
+    if kind == "hnsw":
+        return f"HNSW{hnsw_m}"
+
+    if nlist is None:
+        nlist = max(1, min(int(4 * math.sqrt(ntotal)), ntotal // 39))
+    if kind == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if kind == "ivf_sq8":
+        return f"IVF{nlist},SQ8"
+
+    pq_m = pq_m or max(1, dim // 8)
+    # 8-bit codes need 256 centroids per sub-quantizer; small corpora get fewer.
+    # "np" skips polysemous training, which only helps Hamming-filtered search
+    # and makes train() orders of magnitude slower.
+    nbits = max(4, min(8, int(math.log2(max(ntotal // 39, 1)))))
+    return f"IVF{nlist},PQ{pq_m}x{nbits}np"
+
+
+def build_index(vectors, spec: str = "Flat"):
+    """Train (if needed) and fill a FAISS L2 index described by a factory string."""
+    import faiss
+
+    index = faiss.index_factory(vectors.shape[1], spec)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def rebuild_for_config(vectors, config: dict):
+    """
+    Rebuild a store's index after its vectors changed. Preset kinds are
+    re-sized for the new vector count (an explicit nlist is kept); a corpus
+    too small to train the index gets a flat one until it grows.
+
+    Returns:
+        tuple: (index, spec actually built)
+    """
+    import faiss
+
+    kind = config.get("kind", config["spec"])
+    spec = index_spec(kind, len(vectors), vectors.shape[1], nlist=config.get("nlist"),
+                      hnsw_m=config.get("hnsw_m", 32), pq_m=config.get("pq_m"))
+    try:
+        return build_index(vectors, spec), spec
+    except RuntimeError:
+        print(f"[ann_index.py] Cannot train {spec} on {len(vectors)} vectors; using Flat")
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        return index, "Flat"
+
+
+def load_index_config(store_dir: str) -> dict:
+    """The index config saved with a store; a plain flat index if there is none."""
+    path = os.path.join(store_dir, INDEX_CONFIG_FILE)
+    if not os.path.exists(path):
+        return {"spec": "Flat"}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_index_config(store_dir: str, config: dict):
+    with open(os.path.join(store_dir, INDEX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def exact_vectors(store_dir: str, index):
+    """
+    Full-precision vectors of a store in FAISS row order. Flat indexes hold
+    them already; approximate ones keep a copy in exact_vectors.npy so
+    deletes and re-indexing never compound quantization error.
+    """
+    import numpy as np
+
+    path = os.path.join(store_dir, EXACT_VECTORS_FILE)
+    if os.path.exists(path):
+        return np.load(path)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def set_search_params(index, nprobe: int = None, ef_search: int = None):
+    """Apply query-time knobs; ones that don't apply to the index type are ignored."""
+    import faiss
+
+    if nprobe:
+        try:
+            faiss.extract_index_ivf(index).nprobe = int(nprobe)
+        except RuntimeError:
+            pass
+    if ef_search:
+        hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+        if hnsw is not None:
+            hnsw.efSearch = int(ef_search)
+
+
+def configure_for_search(index, store_dir: str):
+    """
+    Set nprobe / efSearch on a freshly loaded index from the store's config,
+    overridden by RAG_FAISS_NPROBE / RAG_FAISS_EF_SEARCH when set.
+    """
+    config = load_index_config(store_dir)
+    nprobe = os.getenv("RAG_FAISS_NPROBE") or config.get("nprobe")
+    ef_search = os.getenv("RAG_FAISS_EF_SEARCH") or config.get("ef_search")
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    return index
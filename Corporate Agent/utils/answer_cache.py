@@ -0,0 +1,223 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    q = " ".join((question or "").lower().split())
+    return re.sub(r"[\s?!.]+$", "", q)
+
+
+class AnswerCache:
+    """
+    RAG answer cache with exact and near-duplicate lookup.
+
+    Exact hits are keyed on the normalized question plus the IDs of the
+    retrieved nodes. Near-duplicates are found by cosine similarity of the
+    question embeddings (>= threshold). Entries expire after ttl seconds and
+    the least recently used are evicted beyond max_entries. The whole cache
+    is tied to a vector-store version and cleared when that changes.
+    With path set, entries are also kept in a SQLite file: each new answer
+    is one row written after the lock is released, so saving costs the same
+    however large the cache is and never blocks lookups.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 1000, ttl: float = 7 * 24 * 3600,
+                 threshold: float = 0.95):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.store_version = None
+        self._entries = OrderedDict()  # key -> entry dict
+        self._matrix = None  # cached (keys, normalized embeddings) for similarity search
+        self._lock = threading.Lock()
+        self._last_expire = 0.0
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        if path:
+            self._load()
+
+    @staticmethod
+    def _key(norm_question: str, node_ids) -> str:
+        return norm_question + "\x1f" + ",".join(sorted(node_ids))
+
+    def set_store_version(self, version: str):
+        """Drop every entry if the vector store changed since they were cached."""
+        with self._lock:
+            if self.store_version != version:
+                if self._entries:
+                    print("[RAG] Vector store changed; clearing answer cache")
+                self._entries.clear()
+                self._matrix = None
+                self.store_version = version
+                changed = True
+            else:
+                changed = False
+        if changed and self.path:
+            self._write(lambda conn: (
+                conn.execute("DELETE FROM answers"),
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('store_version', ?)", (version,)),
+            ))
+
+    def lookup(self, question: str, node_ids, embedding=None):
+        """
+        Returns:
+            tuple: (answer, "exact" | "semantic") on a hit, (None, None) otherwise
+        """
+        now = time.time()
+        key = self._key(normalize_question(question), node_ids)
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["created"] > self.ttl:
+                del self._entries[key]
+                self._matrix = None
+                entry = None
+            if entry is not None:
+                self._touch(key, entry, now)
+                self.hits += 1
+                return entry["answer"], "exact"
+
+            if embedding is not None and self._entries:
+                match = self._nearest(embedding)
+                if match is not None and now - self._entries[match]["created"] <= self.ttl:
+                    self._touch(match, self._entries[match], now)
+                    self.semantic_hits += 1
+                    return self._entries[match]["answer"], "semantic"
+
+            self.misses += 1
+            return None, None
+
+    def put(self, question: str, node_ids, answer: str, embedding=None):
+        now = time.time()
+        key = self._key(normalize_question(question), node_ids)
+        entry = {
+            "answer": answer,
+            "embedding": [float(x) for x in embedding] if embedding is not None else None,
+            "created": now,
+            "last_used": now,
+        }
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self._matrix = None
+        if self.path:
+            vector = np.asarray(entry["embedding"], dtype=np.float32).tobytes() if embedding is not None else None
+            self._write(lambda conn: (
+                conn.execute("INSERT OR REPLACE INTO answers (key, answer, embedding, created) VALUES (?, ?, ?, ?)",
+                             (key, answer, vector, now)),
+                conn.executemany("DELETE FROM answers WHERE key = ?", [(k,) for k in evicted]),
+            ))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def _touch(self, key: str, entry: dict, now: float):
+        entry["last_used"] = now
+        self._entries.move_to_end(key)
+
+    def _expire(self, now: float):
+        # a full sweep at most once a minute keeps lookups O(1)
+        if now - self._last_expire < 60:
+            return
+        self._last_expire = now
+        expired = [k for k, e in self._entries.items() if now - e["created"] > self.ttl]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+
+    def _nearest(self, embedding):
+        if self._matrix is None:
+            keys = [k for k, e in self._entries.items() if e["embedding"] is not None]
+            if not keys:
+                return None
+            mat = np.asarray([self._entries[k]["embedding"] for k in keys], dtype=np.float32)
+            mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+            self._matrix = (keys, mat)
+
+        keys, mat = self._matrix
+        q = np.asarray(embedding, dtype=np.float32)
+        q /= np.linalg.norm(q) + 1e-12
+        scores = mat @ q
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold and keys[best] in self._entries:
+            return keys[best]
+        return None
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _load(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Expired rows are dropped here rather than on every lookup
+            conn.execute("DELETE FROM answers WHERE created < ?", (time.time() - self.ttl,))
+            row = conn.execute("SELECT value FROM meta WHERE key = 'store_version'").fetchone()
+            rows = conn.execute(
+                "SELECT key, answer, embedding, created FROM answers ORDER BY created DESC LIMIT ?",
+                (self.max_entries,),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[RAG] Could not load answer cache from {self.path}: {e}")
+            self.path = None
+            return
+        self.store_version = row[0] if row else None
+        for key, answer, vector, created in reversed(rows):
+            self._entries[key] = {
+                "answer": answer,
+                "embedding": np.frombuffer(vector, dtype=np.float32).tolist() if vector is not None else None,
+                "created": created,
+                "last_used": created,
+            }
+
+    def _write(self, statements):
+        """Run statements(conn) in one transaction, outside self._lock."""
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN")
+            try:
+                statements(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"[RAG] Could not persist answer cache: {e}")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    answer TEXT NOT NULL,
+    embedding BLOB,
+    created REAL NOT NULL
+);
+"""
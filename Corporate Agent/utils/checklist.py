@@ -1,108 +1,236 @@
-def check_required_docs(
-    detected_docs: list[str],
-    process: str = "incorporation",
-    checklist: dict = None,
-    documents: list[dict] = None
-) -> dict:
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from utils.metrics import get_metrics
+from utils.redflags import RuleSet
+from utils.term_match import term_key
+
+# Bump when the required documents or matching rules change
+CHECKLIST_VERSION = "4"
+
+# Document aliases and per-process required documents; see load_checklists()
+DEFAULT_CHECKLISTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "checklists.json")
+
+# Compiled caller-supplied checklists kept per registry, and uploaded
+# names (types, filenames) remembered per checklist
+_MAX_CUSTOM_CHECKLISTS = 32
+_MAX_MATCHED_NAMES = 4096
+
+# A detected type at least this confident stands on its own; below it (or
+# typed Unknown) the document's filename is matched against the aliases too
+FILENAME_MATCH_BELOW = float(os.getenv("CHECKLIST_FILENAME_MATCH_BELOW", "0.9"))
+
+# Up to this many required sections, substring tests on the lowercased
+# content beat one combined-regex scan (str.__contains__ runs in C; the
+# regex steps through every position)
+SECTION_SCAN_MIN = 16
+
+
+def _words(text: str) -> tuple:
+    """"Offer_Letter-v2" -> ("offer", "letter", "v2")."""
+    return tuple(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _filename_words(filename: str) -> tuple:
+    return _words(os.path.splitext(os.path.basename(filename))[0])
+
+
+def _type_is_confident(doc: dict, dtype: str) -> bool:
+    """True when doc's detected type should not be second-guessed by its filename."""
+    if not dtype or dtype == "unknown":
+        return False
+    scores = doc.get("type_scores")
+    if not scores:
+        return True  # no confidence to go on (e.g. a caller-set type)
+    name, confidence = scores[0]
+    return name.lower() == dtype and confidence >= FILENAME_MATCH_BELOW
+
+
+def _scanner(terms) -> RuleSet:
+    """One combined regex over terms; .scan(text) returns the terms occurring in text."""
+    return RuleSet([{"id": "terms", "any": sorted(terms)}])
+
+
+class Checklist:
     """
-    Check required documents for a given process with fuzzy matching on types & filenames.
+    One process definition compiled for matching: every alias of every
+    required document goes into a single scanner (alias -> documents table),
+    so each uploaded name is scanned once. Required section headings are
+    found in one pass over each document's content, by a combined scanner
+    when there are more than SECTION_SCAN_MIN of them.
     """
 
-    # Mapping of formal document names to their known variations
-    document_mapping = {
-        "Articles of Association": ["articles of association", "aoa"],
-        "Memorandum of Association": ["memorandum of association", "moa", "mou"],
-        "Board Resolution": ["board resolution templates", "board resolution"],
-        "Shareholder Resolution": ["shareholder resolution templates", "shareholder resolution"],
-        "Incorporation Form": ["incorporation application form", "incorporation form"],
-        "UBO Form": ["ubo declaration form", "ubo form"],
-        "Register": ["register of members and directors", "register"],
-        "Address Notice": ["change of registered address notice", "address notice"]
-    }
-
-    # Default required docs for each process
-    default_checklists = {
-        "incorporation": list(document_mapping.keys())
-    }
-
-    process_type = (process or "incorporation").lower()
-
-    # Use checklist-provided docs if given, else default
-    if checklist and isinstance(checklist, dict):
-        required_docs = checklist.get("required_documents", default_checklists.get(process_type, []))
-    else:
-        required_docs = default_checklists.get(process_type, [])
-
-    # Gather all uploaded doc types (normalized to lowercase)
-    uploaded_from_detected = set([d.lower() for d in (detected_docs or []) if d])
-    uploaded_from_documents = set()
-
-    if documents:
-        for d in documents:
+    def __init__(self, process: str, definition: dict, aliases: dict, validate: bool = False):
+        """
+        Args:
+            process: process name, lowercased
+            definition: required_documents, and optionally
+                allowed_document_types, minimum_content_length and
+                required_sections ({heading: {"reference": ...}})
+            aliases: {document label: [lowercase variations]}; labels without
+                an entry match on their own name
+            validate: check the documents themselves (type, length,
+                sections) even if the definition sets none of those
+        """
+        self.process = process
+        self.required_docs = list(definition.get("required_documents", []))
+
+        self._alias_docs = {}
+        self._alias_words = {}  # aliases as whole words, for filenames
+        for doc in self.required_docs:
+            for variation in aliases.get(doc, [doc]):
+                key = term_key(variation)
+                if key:
+                    self._alias_docs.setdefault(key, []).append(doc)
+                words = _words(variation)
+                if words:
+                    self._alias_words.setdefault(words, set()).add(doc)
+        self._alias_scanner = _scanner(self._alias_docs)
+        self._max_alias_words = max(map(len, self._alias_words), default=0)
+        self._matched = {}  # uploaded name -> docs_in(name)
+
+        self.validate = validate or any(
+            k in definition for k in ("allowed_document_types", "minimum_content_length", "required_sections")
+        )
+        self.allowed = {a.lower() for a in definition.get("allowed_document_types", [])}
+        self._allowed_hint = ", ".join(self.allowed)
+        self.min_len = int(definition.get("minimum_content_length", 100))
+        sections = definition.get("required_sections", {})
+        self.required_sections = sections if isinstance(sections, dict) else {}
+        self._section_keys = {s: term_key(s) for s in self.required_sections if s}
+        self._section_scanner = (
+            _scanner(set(self._section_keys.values())) if len(self._section_keys) > SECTION_SCAN_MIN else None
+        )
+
+    def sections_in(self, content: str) -> set:
+        """Keys of the required section headings occurring in content, in any case."""
+        if self._section_scanner is not None:
+            return set(self._section_scanner.scan(content))
+        lowered = content.lower()
+        return {key for key in self._section_keys.values() if key in lowered}
+
+    def docs_in(self, name: str) -> frozenset:
+        """Required documents that an uploaded type or filename accounts for."""
+        docs = self._matched.get(name)
+        if docs is None:
+            docs = frozenset(doc for alias in self._alias_scanner.scan(name) for doc in self._alias_docs[alias])
+            if len(self._matched) >= _MAX_MATCHED_NAMES:
+                self._matched.clear()
+            self._matched[name] = docs
+        return docs
+
+    def docs_in_filename(self, filename: str) -> frozenset:
+        """
+        Required documents named in a filename. Aliases must match whole
+        words, so "unregistered_draft.docx" is not a Register and
+        "general_release.docx" not a Lease Agreement.
+        """
+        docs = self._matched.get(("filename", filename))
+        if docs is None:
+            words = _filename_words(filename)
+            found = set()
+            for i in range(len(words)):
+                for j in range(i + 1, min(len(words), i + self._max_alias_words) + 1):
+                    found |= self._alias_words.get(words[i:j], set())
+            docs = frozenset(found)
+            if len(self._matched) >= _MAX_MATCHED_NAMES:
+                self._matched.clear()
+            self._matched[("filename", filename)] = docs
+        return docs
+
+    def evaluate(self, detected_docs: list, documents: list = None, process: str = None) -> dict:
+        """
+        Args:
+            detected_docs: detected document types
+            documents: dicts with type, filename and content
+            process: echoed as result["process"] (defaults to this process)
+
+        Returns:
+            dict: the check_required_docs() result
+        """
+
+        # Gather all uploaded doc types (normalized to lowercase)
+        uploaded = {d.lower() for d in (detected_docs or []) if d}
+        types, filenames = set(uploaded), set()
+        for d in documents or []:
             dtype = (d.get("type") or "").lower()
             fname = (d.get("filename") or "").lower()
             if dtype and dtype != "unknown":
-                uploaded_from_documents.add(dtype)
+                uploaded.add(dtype)
+                types.add(dtype)
             elif fname:  # fallback to filename if type is unknown
-                uploaded_from_documents.add(fname)
+                uploaded.add(fname)
+            # A filename also counts when the type is unknown or uncertain:
+            # "offer_letter.docx" is an Offer Letter whatever the classifier
+            # made of its text, but it can't overrule a confident type
+            if fname and not _type_is_confident(d, dtype):
+                filenames.add(fname)
+        uploaded_all = sorted(uploaded)
 
-    uploaded_all = list(uploaded_from_detected.union(uploaded_from_documents))
+        found = set()
+        for name in types:
+            found |= self.docs_in(name)
+        for name in filenames:
+            found |= self.docs_in_filename(name)
 
-    # Helper to check if a required doc is found
-    def doc_found(required_label: str) -> bool:
-        variations = document_mapping.get(required_label, [required_label])
-        variations = [v.lower() for v in variations]
-        return any(
-            any(var in uploaded for var in variations)
-            for uploaded in uploaded_all
-        )
+        missing_documents = [doc for doc in self.required_docs if doc not in found]
+        status_list = [doc if doc not in found else f"{doc} ✓" for doc in self.required_docs]
 
-    # Find missing docs
-    missing_documents = [doc for doc in required_docs if not doc_found(doc)]
+        issues = self._issues(documents) if self.validate and documents else []
 
-    # Create checklist status list
-    status_list = [
-        f"{doc} ✓" if doc not in missing_documents else doc
-        for doc in required_docs
-    ]
+        compliance_score = max(0, 100 - (len(missing_documents) * 20) - (len(issues) * 10))
+        overall_status = "complete" if not missing_documents else "incomplete"
 
-    # Optional issues list
-    issues = []
+        return {
+            "process": process if process is not None else self.process,
+            "status": overall_status,
+            "required_docs": self.required_docs,
+            "uploaded_docs": uploaded_all,
+            "missing_docs": missing_documents,
+            "checklist": status_list,
+            "total_documents": len(uploaded_all),
+            "issues": issues,
+            "process_type": self.process,
+            "compliance_score": compliance_score
+        }
 
-    if checklist and documents:
-        allowed = set([a.lower() for a in checklist.get("allowed_document_types", [])])
-        if allowed:
+    def _issues(self, documents: list) -> list:
+        issues = []
+        if self.allowed:
             for d in documents:
                 dtype = (d.get("type") or "unknown").lower()
-                if dtype not in allowed:
+                if dtype not in self.allowed:
                     issues.append({
                         "document": d.get("filename", "Unknown"),
                         "section": "Document Type",
                         "description": f"Invalid document type: {dtype}",
                         "severity": "high",
-                        "suggestion": f'Upload a valid document type: {", ".join(allowed)}',
+                        "suggestion": f"Upload a valid document type: {self._allowed_hint}",
                         "reference": "ADGM document requirements"
                     })
 
-        min_len = int(checklist.get("minimum_content_length", 100))
         for d in documents:
             content = (d.get("content") or "")
-            if len(content) < min_len:
+            if len(content) < self.min_len:
                 issues.append({
                     "document": d.get("filename", "Unknown"),
                     "section": "Content",
                     "description": f"Document content too short ({len(content)} characters)",
                     "severity": "medium",
-                    "suggestion": f"Ensure document has at least {min_len} characters",
+                    "suggestion": f"Ensure document has at least {self.min_len} characters",
                     "reference": "ADGM content requirements"
                 })
 
-        required_sections = checklist.get("required_sections", {})
-        if isinstance(required_sections, dict) and required_sections:
+        if self._section_keys:
             for d in documents:
-                content_lc = (d.get("content") or "").lower()
-                for section, requirements in required_sections.items():
-                    if section and section.lower() not in content_lc:
+                present = self.sections_in(d.get("content") or "")
+                for section, requirements in self.required_sections.items():
+                    if section and self._section_keys[section] not in present:
                         issues.append({
                             "document": d.get("filename", "Unknown"),
                             "section": section,
@@ -111,19 +239,124 @@ def check_required_docs(
                             "suggestion": f"Add the {section} section as per ADGM requirements",
                             "reference": (requirements or {}).get("reference", "ADGM regulations")
                         })
+        return issues
+
+
+class ChecklistRegistry:
+    """
+    The known processes (incorporation, licensing, ...), each compiled once.
+    Checklists passed in by callers are compiled on first use and kept in a
+    small LRU, keyed by their contents.
+    """
+
+    def __init__(self, data: dict, version: str = ""):
+        self.version = version
+        self.aliases = {doc: [v.lower() for v in variations]
+                        for doc, variations in data.get("documents", {}).items()}
+        self.definitions = {name.lower(): d for name, d in data.get("processes", {}).items()}
+        self._compiled = {name: Checklist(name, d, self.aliases) for name, d in self.definitions.items()}
+        self._custom = OrderedDict()
+        self._last_custom = None  # (process, checklist copy, compiled): skips re-keying repeat calls
+        self._lock = threading.Lock()
+
+    def processes(self) -> list:
+        return list(self.definitions)
+
+    def get(self, process: str = "incorporation", checklist: dict = None) -> Checklist:
+        """
+        The compiled checklist for a process, with a caller's checklist dict
+        (required_documents, allowed_document_types, ...) laid over it.
+        Unknown processes have no required documents.
+        """
+        process_type = (process or "incorporation").lower()
+        if not (checklist and isinstance(checklist, dict)):
+            compiled = self._compiled.get(process_type)
+            if compiled is None:
+                compiled = Checklist(process_type, {}, self.aliases)
+            return compiled
+
+        last = self._last_custom
+        if last is not None and last[0] == process_type and last[1] == checklist:
+            return last[2]
+
+        key = (process_type, json.dumps(checklist, sort_keys=True, default=str))
+        with self._lock:
+            compiled = self._custom.get(key)
+            if compiled is not None:
+                self._custom.move_to_end(key)
+                self._last_custom = (process_type, copy.deepcopy(checklist), compiled)
+                return compiled
+
+        definition = dict(self.definitions.get(process_type, {}))
+        definition.update(checklist)
+        compiled = Checklist(process_type, definition, self.aliases, validate=True)
+        with self._lock:
+            self._custom[key] = compiled
+            while len(self._custom) > _MAX_CUSTOM_CHECKLISTS:
+                self._custom.popitem(last=False)
+            self._last_custom = (process_type, copy.deepcopy(checklist), compiled)
+        return compiled
+
+    def check(self, detected_docs: list, process: str = "incorporation", checklist: dict = None,
+              documents: list = None) -> dict:
+        return self.get(process, checklist).evaluate(detected_docs, documents, process=process)
+
+    def check_batch(self, packs: list, process: str = "incorporation", checklist: dict = None) -> list:
+        """
+        Evaluate many company packs against one process. Each pack is a list
+        of document dicts (type, filename, content); their types double as
+        the detected types, as in review_cli. The checklist is looked up and
+        compiled once for the whole batch.
+
+        Returns:
+            list: one check_required_docs() result per pack, in order
+        """
+        compiled = self.get(process, checklist)
+        return [compiled.evaluate([d.get("type") for d in docs], docs, process=process) for docs in packs]
+
+
+def load_checklists(path: str = DEFAULT_CHECKLISTS_PATH) -> ChecklistRegistry:
+    """
+    Load and compile a checklist file: "documents" maps each document label
+    to its variations, "processes" maps each process to its
+    required_documents (plus any Checklist definition fields).
+
+    Returns:
+        ChecklistRegistry: .version is a short hash of the file contents
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    data = json.loads(raw.decode("utf-8"))
+    version = hashlib.sha256(raw).hexdigest()[:12]
+    return ChecklistRegistry(data, version=version)
+
+
+_default_registry = None
+
+
+def get_default_registry() -> ChecklistRegistry:
+    """The bundled checklists, compiled once per process."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = load_checklists(DEFAULT_CHECKLISTS_PATH)
+    return _default_registry
+
+
+def check_required_docs(
+    detected_docs: list[str],
+    process: str = "incorporation",
+    checklist: dict = None,
+    documents: list[dict] = None
+) -> dict:
+    """
+    Check required documents for a given process with fuzzy matching on types & filenames.
+    """
+    with get_metrics().timer("checklist"):
+        return get_default_registry().check(detected_docs, process, checklist, documents)
+
 
-    compliance_score = max(0, 100 - (len(missing_documents) * 20) - (len(issues) * 10))
-    overall_status = "complete" if not missing_documents else "incomplete"
-
-    return {
-        "process": process,
-        "status": overall_status,
-        "required_docs": required_docs,
-        "uploaded_docs": uploaded_all,
-        "missing_docs": missing_documents,
-        "checklist": status_list,
-        "total_documents": len(uploaded_all),
-        "issues": issues,
-        "process_type": process_type,
-        "compliance_score": compliance_score
-    }
+def check_packs(packs: list, process: str = "incorporation", checklist: dict = None) -> list:
+    """check_required_docs() for many company packs in one call; see ChecklistRegistry.check_batch."""
+    with get_metrics().timer("checklist_batch"):
+        return get_default_registry().check_batch(packs, process, checklist)
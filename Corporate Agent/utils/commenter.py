@@ -1,20 +1,149 @@
+import io
+import os
+import re
+import struct
+import time
+import zipfile
+import zlib
+from bisect import bisect_right
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+
 from docx import Document
 from docx.shared import RGBColor
 
-def comment_on_docx(path: str, flags: list) -> str:
+from utils.parser import clean_paragraphs, iter_docx_paragraphs, open_docx_source, source_name
+
+COMMENT_AUTHOR = os.getenv("REVIEW_COMMENT_AUTHOR", "Corporate Agent")
+COMMENT_INITIALS = os.getenv("REVIEW_COMMENT_INITIALS", "CA")
+
+_W_URI = b"http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_DOCUMENT_PART = "word/document.xml"
+_COMMENTS_PART = "word/comments.xml"
+_CONTENT_TYPES_PART = "[Content_Types].xml"
+_DOCUMENT_RELS_PART = "word/_rels/document.xml.rels"
+_COMMENTS_CONTENT_TYPE = b"application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"
+_COMMENTS_REL_TYPE = b"http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+
+# w:p start tags (not w:pPr / w:pStyle), self-closing or not, and end tags
+_PARAGRAPH_TAG = re.compile(rb"<w:p(?=[\s>/])[^>]*?(/?)>|</w:p>")
+_PPR = re.compile(rb"<w:pPr\b[^>]*?(?:/>|>.*?</w:pPr>)", re.S)
+_COMMENT_ID = re.compile(rb'<w:comment\b[^>]*?\sw:id="(\d+)"')
+_REL_ID = re.compile(rb'\sId="([^"]+)"')
+
+# Zip records written by _PackageWriter (APPNOTE 4.3.7, 4.3.12, 4.3.16)
+_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<4sBBHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<4sHHHHIIH")
+_DATA_DESCRIPTOR_SIG = b"PK\x07\x08"
+_ZIP32_LIMIT = 0xFFFFFFFF
+_COPY_CHUNK = 1 << 20
+
+
+def comment_on_docx(path: str, flags: list, line_map: list = None) -> str:
+    """
+    Attach each red flag to the document as a native Word comment, anchored
+    at the paragraph its quote came from (document-level flags at the first
+    paragraph). Only word/document.xml, the comments part and two small
+    package parts are rewritten; every other zip member is copied with its
+    content and compression method unchanged. Falls back to
+    append_review_notes() if the package can't be patched.
+
+    Args:
+        path (str): Path to the .docx file
+        flags (list): redflags.detect_red_flags() output (offsets are used
+            when present)
+        line_map (list): (text offset, paragraph index) pairs from
+            parser.extract_text_with_sections for the same file; read from
+            the file when not given
+
+    Returns:
+        str: Path to the reviewed document (the original path when there is
+        nothing to add or the file can't be opened)
+    """
+    if not flags:
+        # nothing to add; return original path for consistency
+        return path
+
+    reviewed_path = path.replace(".docx", "_reviewed.docx")
+    try:
+        add_word_comments(path, flags, reviewed_path, line_map)
+        return reviewed_path
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        print(f"[commenter.py] Cannot add comments to {path} ({e}); appending review notes instead")
+        return append_review_notes(path, flags)
+
+
+def comment_docx_bytes(data, flags: list, line_map: list = None) -> bytes:
+    """
+    comment_on_docx for an upload held in memory: nothing is written to or
+    read from disk.
+
+    Args:
+        data: The .docx as bytes, memoryview or a binary file object
+        flags (list): redflags.detect_red_flags() output
+        line_map (list): As for comment_on_docx
+
+    Returns:
+        bytes: The reviewed document (the original bytes when there is
+        nothing to add or the package can't be opened)
+    """
+    if not flags:
+        return _as_bytes(data)
+
+    out = io.BytesIO()
+    try:
+        add_word_comments(data, flags, out, line_map)
+        return out.getvalue()
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        print(f"[commenter.py] Cannot add comments to {source_name(data)} ({e}); appending review notes instead")
+        return review_notes_bytes(data, flags)
+
+
+def _as_bytes(data) -> bytes:
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, (bytearray, memoryview)):
+        return bytes(data)
+    data.seek(0)
+    return data.read()
+
+
+def append_review_notes(path: str, flags: list) -> str:
     """
     Append review notes (red colored text) to the document.
     Returns path to reviewed document.
     """
+    doc = _review_notes_document(path, flags)
+    if doc is None:
+        return path
+
+    reviewed_path = path.replace(".docx", "_reviewed.docx")
+    doc.save(reviewed_path)
+    return reviewed_path
+
+
+def review_notes_bytes(data, flags: list) -> bytes:
+    """append_review_notes for an in-memory .docx; returns the reviewed bytes."""
+    doc = _review_notes_document(data, flags)
+    if doc is None:
+        return _as_bytes(data)
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def _review_notes_document(source, flags: list):
+    """The python-docx Document with a REVIEW NOTES page, or None if there is nothing to do."""
     try:
-        doc = Document(path)
+        doc = Document(open_docx_source(source))
     except Exception:
-        # if python-docx fails to open, just return original path
-        return path
+        # if python-docx fails to open, leave the original alone
+        return None
 
     if not flags:
-        # nothing to add; return original path for consistency
-        return path
+        return None
 
     # Add a heading for review notes
     doc.add_page_break()
@@ -23,17 +152,290 @@ def comment_on_docx(path: str, flags: list) -> str:
     run.bold = True
 
     for i, flag in enumerate(flags, start=1):
-        issue = flag.get("issue") or flag.get("description") or "Issue"
-        suggestion = flag.get("suggestion") or ""
         para = doc.add_paragraph()
-        run = para.add_run(f"{i}. {issue} — Suggestion: {suggestion}")
+        run = para.add_run(f"{i}. {_comment_text(flag)}")
         # make the annotation red to stand out
         try:
             run.font.color.rgb = RGBColor(0xFF, 0x33, 0x33)
         except Exception:
             # if color fails (some environments), ignore
             pass
+    return doc
 
-    reviewed_path = path.replace(".docx", "_reviewed.docx")
-    doc.save(reviewed_path)
-    return reviewed_path
+
+def add_word_comments(path, flags: list, out_path, line_map: list = None) -> dict:
+    """
+    Write a copy of path with one Word comment per flag. path may also be
+    the document's bytes or a binary file, and out_path a seekable binary
+    file such as BytesIO.
+
+    Returns:
+        dict: comments (number added), rewritten (names of the zip members
+        that were rewritten) and copied (members copied unchanged)
+
+    Raises:
+        zipfile.BadZipFile, KeyError: not a readable .docx
+        ValueError: document.xml doesn't use the usual "w" prefix, or the
+            package needs zip64 or is encrypted
+    """
+    if line_map is None or not line_map:
+        line_map = []
+        clean_paragraphs(iter_docx_paragraphs(open_docx_source(path)), line_map)
+
+    with zipfile.ZipFile(open_docx_source(path)) as zin:
+        document = zin.read(_DOCUMENT_PART)
+        if b'xmlns:w="' + _W_URI + b'"' not in document[:4096]:
+            raise ValueError("unexpected WordprocessingML namespace prefix")
+        names = set(zin.namelist())
+        comments = zin.read(_COMMENTS_PART) if _COMMENTS_PART in names else None
+
+        first_id = max((int(i) for i in _COMMENT_ID.findall(comments)), default=-1) + 1 if comments else 0
+        spans = _paragraph_spans(document)
+        anchors = _anchor_paragraphs(flags, line_map, spans)
+
+        patched = {_DOCUMENT_PART: _insert_comment_marks(document, spans, anchors, first_id)}
+        patched[_COMMENTS_PART] = _comments_part(flags, first_id, comments)
+        if comments is None:
+            patched[_CONTENT_TYPES_PART] = _add_content_type(zin.read(_CONTENT_TYPES_PART))
+            patched[_DOCUMENT_RELS_PART] = _add_comments_relationship(zin.read(_DOCUMENT_RELS_PART))
+
+        rewritten, copied = sorted(patched), []
+        with _open_raw(path) as src, _open_out(out_path) as out:
+            writer = _PackageWriter(out)
+            for info in zin.infolist():
+                if info.filename in patched:
+                    writer.write(info.filename, patched.pop(info.filename), info.date_time, info.external_attr)
+                else:
+                    writer.copy(src, info)
+                    copied.append(info.filename)
+            for name, data in patched.items():  # a new comments part
+                writer.write(name, data)
+            writer.close()
+
+    return {"comments": len(flags), "rewritten": rewritten, "copied": copied}
+
+
+def _open_raw(source):
+    """A second handle on the source for _PackageWriter.copy's raw reads."""
+    if isinstance(source, str):
+        return open(source, "rb")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return nullcontext(source)  # zipfile re-seeks before each of its own reads
+
+
+def _open_out(out_path):
+    return open(out_path, "wb") if isinstance(out_path, str) else nullcontext(out_path)
+
+
+def _comment_text(flag: dict) -> str:
+    issue = flag.get("issue") or flag.get("description") or "Issue"
+    suggestion = flag.get("suggestion") or ""
+    return f"{issue} — Suggestion: {suggestion}"
+
+
+def _paragraph_spans(document: bytes) -> list:
+    """
+    (content start, content end) of every w:p, in the order their end tags
+    appear, which is the order parser.iter_docx_paragraphs yields them
+    (nested text-box paragraphs before the paragraph holding them).
+    """
+    spans, open_ends = [], []
+    for m in _PARAGRAPH_TAG.finditer(document):
+        if m.group(0).startswith(b"</"):
+            spans.append((open_ends.pop(), m.start()))
+        elif m.group(1):  # <w:p/>
+            spans.append((m.end(), m.end()))
+        else:
+            open_ends.append(m.end())
+    return spans
+
+
+def _anchor_paragraphs(flags: list, line_map: list, spans: list) -> list:
+    """
+    Body paragraph index per flag: where its offsets fall, else the first
+    text paragraph. Empty paragraphs (<w:p/> has nowhere to put the marks)
+    hand their flags to the closest paragraph before them with content.
+
+    Raises:
+        ValueError: no paragraph can carry a comment
+    """
+    usable = [end > start for start, end in spans]
+    if not any(usable):
+        raise ValueError("document has no paragraphs with content")
+    offsets = [offset for offset, _ in line_map]
+    body = [index for _, index in line_map if index < len(spans) and usable[index]]
+    default = body[0] if body else usable.index(True)
+
+    anchors = []
+    for flag in flags:
+        index = default
+        span = flag.get("offsets")
+        if span and offsets:
+            pos = bisect_right(offsets, span[0]) - 1
+            if pos >= 0 and line_map[pos][1] < len(spans):  # header/footer text can't carry comments
+                while pos >= 0 and not (line_map[pos][1] < len(spans) and usable[line_map[pos][1]]):
+                    pos -= 1
+                if pos >= 0:
+                    index = line_map[pos][1]
+        anchors.append(index)
+    return anchors
+
+
+def _insert_comment_marks(document: bytes, spans: list, anchors: list, first_id: int) -> bytes:
+    """Wrap each anchor paragraph's content in commentRangeStart/End plus a reference run."""
+    inserts = []  # (byte position, order, markup)
+    for n, index in enumerate(anchors):
+        cid = str(first_id + n).encode()
+        start, end = spans[index]
+        ppr = _PPR.match(document, start, end)
+        if ppr:
+            start = ppr.end()  # ranges go after the paragraph properties
+        inserts.append((start, n, b'<w:commentRangeStart w:id="' + cid + b'"/>'))
+        inserts.append((end, n, b'<w:commentRangeEnd w:id="' + cid + b'"/>'
+                                b'<w:r><w:commentReference w:id="' + cid + b'"/></w:r>'))
+
+    inserts.sort(key=lambda item: (item[0], item[1]))
+    out, last = [], 0
+    for pos, _, markup in inserts:
+        out.append(document[last:pos])
+        out.append(markup)
+        last = pos
+    out.append(document[last:])
+    return b"".join(out)
+
+
+def _comments_part(flags: list, first_id: int, existing: bytes = None) -> bytes:
+    date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    author, initials = quoteattr(COMMENT_AUTHOR), quoteattr(COMMENT_INITIALS)
+    entries = "".join(
+        f'<w:comment w:id="{first_id + n}" w:author={author} w:date="{date}" w:initials={initials}>'
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(_comment_text(flag))}</w:t></w:r></w:p></w:comment>'
+        for n, flag in enumerate(flags)
+    ).encode("utf-8")
+
+    if existing is not None:
+        end = existing.rfind(b"</w:comments>")
+        if end == -1:
+            raise ValueError("unreadable comments part")
+        return existing[:end] + entries + existing[end:]
+    return (b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+            b'<w:comments xmlns:w="' + _W_URI + b'">' + entries + b"</w:comments>")
+
+
+def _add_content_type(content_types: bytes) -> bytes:
+    if b'PartName="/word/comments.xml"' in content_types:
+        return content_types
+    end = content_types.rfind(b"</Types>")
+    if end == -1:
+        raise ValueError("unreadable [Content_Types].xml")
+    override = b'<Override PartName="/word/comments.xml" ContentType="' + _COMMENTS_CONTENT_TYPE + b'"/>'
+    return content_types[:end] + override + content_types[end:]
+
+
+def _add_comments_relationship(rels: bytes) -> bytes:
+    if _COMMENTS_REL_TYPE in rels:
+        return rels
+    end = rels.rfind(b"</Relationships>")
+    if end == -1:
+        raise ValueError("unreadable document relationships")
+    used = set(_REL_ID.findall(rels))
+    n = 1
+    while b"rIdComments%d" % n in used:
+        n += 1
+    rel = (b'<Relationship Id="rIdComments%d" Type="' % n + _COMMENTS_REL_TYPE
+           + b'" Target="comments.xml"/>')
+    return rels[:end] + rel + rels[end:]
+
+
+def _dos_time(date_time: tuple) -> tuple:
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11 | minute << 5 | second // 2,
+            max(0, year - 1980) << 9 | month << 5 | day)
+
+
+class _PackageWriter:
+    """
+    Writes the reviewed package: patched parts deflated afresh, every other
+    member's local header and compressed bytes copied from the source as
+    they are, then a central directory built from the source ZipInfo
+    entries. zipfile has no public way to add a member without
+    recompressing it, hence the records are written here. Packages that
+    would need zip64, and encrypted members, raise ValueError so the caller
+    falls back to review notes.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.offset = 0
+        self.central = []
+
+    def _emit(self, data: bytes):
+        self.out.write(data)
+        self.offset += len(data)
+
+    def write(self, name: str, data: bytes, date_time: tuple = None, external_attr: int = 0o600 << 16):
+        """Add name with data, deflated."""
+        packer = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        compressed = packer.compress(data) + packer.flush()
+        raw_name = name.encode("utf-8")
+        flags = 0 if raw_name.isascii() else 0x800  # UTF-8 name
+        dos_time, dos_date = _dos_time(date_time or time.localtime()[:6])
+        crc = zlib.crc32(data)
+        if max(len(data), len(compressed), self.offset) >= _ZIP32_LIMIT:
+            raise ValueError(f"{name} needs zip64")
+        offset = self.offset
+        self._emit(_LOCAL_HEADER.pack(b"PK\x03\x04", 20, flags, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+                                      crc, len(compressed), len(data), len(raw_name), 0))
+        self._emit(raw_name)
+        self._emit(compressed)
+        self.central.append((_CENTRAL_HEADER.pack(
+            b"PK\x01\x02", 20, 3, 20, flags, zipfile.ZIP_DEFLATED, dos_time, dos_date, crc,
+            len(compressed), len(data), len(raw_name), 0, 0, 0, 0, external_attr, offset), raw_name, b"", b""))
+
+    def copy(self, src, info: zipfile.ZipInfo):
+        """Add info's member from src (the source package) without decompressing it."""
+        if info.flag_bits & 0x1:
+            raise ValueError(f"{info.filename} is encrypted")
+        if max(info.file_size, info.compress_size, info.header_offset, self.offset) >= _ZIP32_LIMIT:
+            raise ValueError(f"{info.filename} needs zip64")
+        src.seek(info.header_offset)
+        header = src.read(_LOCAL_HEADER.size)
+        fields = _LOCAL_HEADER.unpack(header)
+        if fields[0] != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"bad local header for {info.filename}")
+        raw_name = src.read(fields[9])  # the name exactly as stored
+        offset = self.offset
+        self._emit(header)
+        self._emit(raw_name)
+        remaining = fields[10] + info.compress_size  # local extra field, then the data
+        while remaining:
+            chunk = src.read(min(remaining, _COPY_CHUNK))
+            if not chunk:
+                raise zipfile.BadZipFile(f"truncated member {info.filename}")
+            self._emit(chunk)
+            remaining -= len(chunk)
+        if info.flag_bits & 0x8:  # CRC and sizes follow the data
+            descriptor = src.read(16)
+            self._emit(descriptor if descriptor[:4] == _DATA_DESCRIPTOR_SIG else descriptor[:12])
+
+        comment = info.comment or b""
+        dos_time, dos_date = _dos_time(info.date_time)
+        self.central.append((_CENTRAL_HEADER.pack(
+            b"PK\x01\x02", info.create_version, info.create_system, info.extract_version, info.flag_bits,
+            info.compress_type, dos_time, dos_date, info.CRC, info.compress_size, info.file_size,
+            len(raw_name), len(info.extra), len(comment), 0, info.internal_attr, info.external_attr,
+            offset), raw_name, info.extra, comment))
+
+    def close(self):
+        """Write the central directory and end record."""
+        if len(self.central) > 0xFFFF:
+            raise ValueError("package needs zip64")
+        start = self.offset
+        for record in self.central:
+            for part in record:
+                self._emit(part)
+        size = self.offset - start
+        if self.offset >= _ZIP32_LIMIT:
+            raise ValueError("package needs zip64")
+        self._emit(_END_RECORD.pack(b"PK\x05\x06", 0, 0, len(self.central), len(self.central), size, start, 0))
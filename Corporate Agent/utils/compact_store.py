@@ -0,0 +1,240 @@
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+
+from utils.ann_index import INDEX_CONFIG_FILE, configure_for_search
+from utils.hybrid_retriever import bm25_idf, tokenize
+
+VECTORS_FILE = "vectors.faiss"
+NODES_FILE = "nodes.sqlite"
+
+
+def convert_vector_store(src_dir: str, dst_dir: str) -> dict:
+    """
+    One-time conversion of a llama_index persist dir (docstore.json,
+    index_store.json, default__vector_store.json) into the compact layout:
+    the FAISS index as a native file plus a SQLite table of node texts keyed
+    by FAISS row, and the BM25 postings for hybrid retrieval (see
+    CompactBM25). Written to a temp dir and swapped in.
+
+    Returns:
+        dict: number of nodes and output sizes in bytes
+    """
+    import faiss
+    import shutil
+
+    with open(os.path.join(src_dir, "docstore.json"), "r", encoding="utf-8") as f:
+        docstore = json.load(f)
+    with open(os.path.join(src_dir, "index_store.json"), "r", encoding="utf-8") as f:
+        index_store = json.load(f)
+    index = faiss.read_index(os.path.join(src_dir, "default__vector_store.json"))
+
+    index_data = json.loads(next(iter(index_store["index_store/data"].values()))["__data__"])
+    nodes_dict = index_data["nodes_dict"]
+    data = docstore.get("docstore/data", {})
+
+    tmp_dir = dst_dir.rstrip("/\\") + f".new-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    faiss.write_index(index, os.path.join(tmp_dir, VECTORS_FILE))
+    config_path = os.path.join(src_dir, INDEX_CONFIG_FILE)
+    if os.path.exists(config_path):
+        shutil.copy2(config_path, tmp_dir)  # keeps nprobe / efSearch for IVF and HNSW
+
+    conn = sqlite3.connect(os.path.join(tmp_dir, NODES_FILE))
+    conn.execute(
+        "CREATE TABLE nodes (pos INTEGER PRIMARY KEY, node_id TEXT NOT NULL, "
+        "ref_doc_id TEXT, text TEXT NOT NULL, metadata TEXT)"
+    )
+    rows = []
+    for pos, node_id in nodes_dict.items():
+        node = data.get(node_id, {}).get("__data__", {})
+        source = (node.get("relationships") or {}).get("1") or {}
+        rows.append((
+            int(pos), node_id, source.get("node_id"),
+            node.get("text", ""), json.dumps(node.get("metadata", {}), ensure_ascii=False),
+        ))
+    conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?)", rows)
+    conn.execute("CREATE UNIQUE INDEX nodes_node_id ON nodes (node_id)")
+    _write_bm25(conn, ((pos, text) for pos, _, _, text, _ in rows))
+    conn.commit()
+    conn.close()
+
+    old_dir = None
+    if os.path.exists(dst_dir):
+        old_dir = dst_dir.rstrip("/\\") + f".old-{os.getpid()}"
+        os.replace(dst_dir, old_dir)
+    os.replace(tmp_dir, dst_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    return {
+        "nodes": len(rows),
+        "vectors_bytes": os.path.getsize(os.path.join(dst_dir, VECTORS_FILE)),
+        "nodes_bytes": os.path.getsize(os.path.join(dst_dir, NODES_FILE)),
+    }
+
+
+def _write_bm25(conn: sqlite3.Connection, docs):
+    """
+    BM25 statistics for (FAISS row, text) pairs: postings clustered by term,
+    each term's idf, document lengths and the average length. Scoring
+    matches hybrid_retriever.BM25Index.
+    """
+    conn.executescript("""
+        CREATE TABLE bm25_postings (term TEXT NOT NULL, pos INTEGER NOT NULL, tf INTEGER NOT NULL,
+                                    PRIMARY KEY (term, pos)) WITHOUT ROWID;
+        CREATE TABLE bm25_terms (term TEXT PRIMARY KEY, idf REAL NOT NULL) WITHOUT ROWID;
+        CREATE TABLE bm25_docs (pos INTEGER PRIMARY KEY, length INTEGER NOT NULL);
+        CREATE TABLE bm25_meta (key TEXT PRIMARY KEY, value REAL NOT NULL);
+    """)
+    df = Counter()
+    total = n = 0
+    for pos, text in docs:
+        counts = Counter(tokenize(text or ""))
+        conn.executemany("INSERT INTO bm25_postings VALUES (?, ?, ?)",
+                         [(term, pos, tf) for term, tf in counts.items()])
+        length = sum(counts.values())
+        conn.execute("INSERT INTO bm25_docs VALUES (?, ?)", (pos, length))
+        df.update(counts.keys())
+        total += length
+        n += 1
+    conn.executemany("INSERT INTO bm25_terms VALUES (?, ?)", [(t, bm25_idf(n, d)) for t, d in df.items()])
+    conn.executemany("INSERT INTO bm25_meta VALUES (?, ?)", [("docs", n), ("avgdl", total / n if n else 0.0)])
+
+
+class CompactRetriever:
+    """
+    Retriever over the compact layout. Only the FAISS index is held in
+    memory (memory-mapped when FAISS supports it for the index type); node
+    texts are read from SQLite for the top-k hits of each query.
+
+    retrieve() takes a question string or a QueryBundle and returns
+    llama_index NodeWithScore objects, like index.as_retriever().retrieve().
+    """
+
+    def __init__(self, store_dir: str, embed_model, similarity_top_k: int = 2):
+        import faiss
+
+        self.store_dir = store_dir
+        self.embed_model = embed_model
+        self.similarity_top_k = similarity_top_k
+        vectors_path = os.path.join(store_dir, VECTORS_FILE)
+        try:
+            self.index = faiss.read_index(vectors_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            self.index = faiss.read_index(vectors_path)
+        configure_for_search(self.index, store_dir)
+        self._db_uri = "file:" + os.path.abspath(os.path.join(store_dir, NODES_FILE)) + "?mode=ro"
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; Streamlit serves sessions on many
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self._db_uri, uri=True)
+        return conn
+
+    def fetch_nodes(self, positions: list) -> dict:
+        """{faiss row: (node_id, text, metadata)} for the given rows."""
+        if not positions:
+            return {}
+        marks = ",".join("?" * len(positions))
+        rows = self._conn().execute(
+            f"SELECT pos, node_id, text, metadata FROM nodes WHERE pos IN ({marks})", positions
+        ).fetchall()
+        return {pos: (node_id, text, json.loads(meta or "{}")) for pos, node_id, text, meta in rows}
+
+    def fetch_by_node_ids(self, node_ids: list) -> dict:
+        """{node_id: TextNode} for the given node IDs (hybrid retrieval's BM25-only hits)."""
+        from llama_index.core.schema import TextNode
+
+        if not node_ids:
+            return {}
+        marks = ",".join("?" * len(node_ids))
+        rows = self._conn().execute(
+            f"SELECT node_id, text, metadata FROM nodes WHERE node_id IN ({marks})", list(node_ids)
+        ).fetchall()
+        return {
+            node_id: TextNode(id_=node_id, text=text, metadata=json.loads(meta or "{}"))
+            for node_id, text, meta in rows
+        }
+
+    def iter_texts(self):
+        """(node_id, text) for every node, in FAISS row order."""
+        yield from self._conn().execute("SELECT node_id, text FROM nodes ORDER BY pos")
+
+    def bm25(self):
+        """The store's persisted BM25 index, or None if it was converted without one."""
+        found = self._conn().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bm25_meta'").fetchone()
+        return CompactBM25(self) if found else None
+
+    def retrieve(self, query) -> list:
+        import numpy as np
+        from llama_index.core.schema import NodeWithScore, TextNode
+
+        embedding = getattr(query, "embedding", None)
+        if embedding is None:
+            text = getattr(query, "query_str", query)
+            embedding = self.embed_model.get_query_embedding(text)
+
+        vec = np.asarray([embedding], dtype="float32")
+        distances, rows = self.index.search(vec, self.similarity_top_k)
+        positions = [int(r) for r in rows[0] if r >= 0]
+        nodes = self.fetch_nodes(positions)
+
+        results = []
+        for pos, dist in zip(rows[0], distances[0]):
+            if int(pos) not in nodes:
+                continue
+            node_id, text, metadata = nodes[int(pos)]
+            node = TextNode(id_=node_id, text=text, metadata=metadata)
+            results.append(NodeWithScore(node=node, score=float(dist)))
+        return results
+
+
+class CompactBM25:
+    """
+    BM25 search over the postings convert_vector_store() wrote, read from
+    SQLite per query: only the query terms' postings are loaded, so hybrid
+    retrieval on the compact store keeps node texts out of memory.
+    Same interface and scores as hybrid_retriever.BM25Index.
+    """
+
+    def __init__(self, store: CompactRetriever, k1: float = 1.5, b: float = 0.75):
+        self.store = store
+        self.k1 = k1
+        self.b = b
+        meta = dict(store._conn().execute("SELECT key, value FROM bm25_meta"))
+        self.n = int(meta.get("docs", 0))
+        self.avgdl = meta.get("avgdl", 0.0)
+
+    def __len__(self):
+        return self.n
+
+    def search(self, query: str, top_k: int = 10) -> list:
+        """[(node_id, score)] best first; documents sharing no term are left out."""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        conn = self.store._conn()
+        k1, b, avgdl = self.k1, self.b, self.avgdl
+        marks = ",".join("?" * len(terms))
+        scores = defaultdict(float)
+        for pos, tf, idf, length in conn.execute(
+                "SELECT p.pos, p.tf, t.idf, d.length FROM bm25_postings p "
+                "JOIN bm25_terms t ON t.term = p.term JOIN bm25_docs d ON d.pos = p.pos "
+                f"WHERE p.term IN ({marks})", terms):
+            norm = k1 * (1 - b + b * length / avgdl) if avgdl else k1
+            scores[pos] += idf * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        if not best:
+            return []
+        marks = ",".join("?" * len(best))
+        node_ids = dict(conn.execute(f"SELECT pos, node_id FROM nodes WHERE pos IN ({marks})",
+                                     [pos for pos, _ in best]))
+        return [(node_ids[pos], score) for pos, score in best if pos in node_ids]
@@ -0,0 +1,83 @@
+import os
+import threading
+
+# Gemini has no local tokenizer; cl100k_base is a close enough proxy for
+# budgeting. tiktoken downloads its BPE file on first use, so offline
+# deployments fall back to ~4 characters per token.
+TOKEN_ENCODING = os.getenv("RAG_TOKEN_ENCODING", "cl100k_base")
+CHARS_PER_TOKEN = 4
+
+_encoding_lock = threading.Lock()
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception as e:
+                _encoding_failed = True
+                print(f"[context_budget.py] tiktoken unavailable ({type(e).__name__}); "
+                      f"estimating {CHARS_PER_TOKEN} chars per token")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def assemble_context(texts: list, max_tokens: int, separator: str = "\n\n",
+                     min_tail_tokens: int = 50) -> dict:
+    """
+    Join retrieved chunks, best first, until the token budget is spent. The
+    first chunk that doesn't fit is cut to the remaining budget unless less
+    than min_tail_tokens would be left of it.
+
+    Args:
+        texts: chunk texts in rank order
+        max_tokens: budget for the whole context (<= 0 means unlimited)
+
+    Returns:
+        dict: context (str), tokens (int), chunks (number used, counting a
+        truncated one) and truncated (bool)
+    """
+    limit = max_tokens if max_tokens > 0 else float("inf")
+    sep_tokens = count_tokens(separator)
+    parts, used, truncated = [], 0, False
+    for text in texts:
+        cost = count_tokens(text) + (sep_tokens if parts else 0)
+        if used + cost <= limit:
+            parts.append(text)
+            used += cost
+            continue
+        remaining = max_tokens - used - (sep_tokens if parts else 0)
+        if remaining >= min_tail_tokens:
+            parts.append(truncate_to_tokens(text, remaining))
+            used += remaining + (sep_tokens if len(parts) > 1 else 0)
+        truncated = True
+        break
+
+    return {"context": separator.join(parts), "tokens": used, "chunks": len(parts), "truncated": truncated}
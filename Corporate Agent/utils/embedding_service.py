@@ -0,0 +1,386 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.metrics import get_metrics
+
+# Backends by name. "torch" is the full-precision HuggingFaceEmbedding the
+# index was built with and the reference the others are checked against
+# (see similarity_report and benchmarks/embedding_bench.py).
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Quantized ONNX export loaded by "onnx-int8"; sentence-transformers model
+# repos ship several (model_qint8_avx512_vnni.onnx, model_qint8_arm64.onnx, ...)
+DEFAULT_ONNX_INT8_FILE = "onnx/model_qint8_avx2.onnx"
+
+
+def text_key(text: str, model_id: str) -> str:
+    """SHA-256 of the text, salted with the model and backend that embed it."""
+    h = hashlib.sha256()
+    h.update(model_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    return mat / (np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12)
+
+
+class HuggingFaceBackend:
+    """The llama_index HuggingFaceEmbedding (PyTorch, float32) used so far."""
+
+    def __init__(self, model_name: str):
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+        self.name = "torch"
+        self.model = HuggingFaceEmbedding(model_name=model_name)
+
+    def encode(self, texts: list) -> np.ndarray:
+        return np.asarray(self.model.get_text_embedding_batch(list(texts)), dtype=np.float32)
+
+
+class SentenceTransformerBackend:
+    """
+    sentence-transformers model on one of its CPU runtimes: PyTorch with
+    dynamically int8-quantized Linear layers ("torch-int8"), or ONNX Runtime
+    with the float32 ("onnx") or an int8-quantized ("onnx-int8") export.
+    The ONNX runtimes need onnxruntime and optimum installed.
+    """
+
+    def __init__(self, model_name: str, backend: str, onnx_file: str = None):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = backend
+        if backend == "torch-int8":
+            import torch
+
+            model = SentenceTransformer(model_name, device="cpu")
+            self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif backend == "onnx":
+            kwargs = {"file_name": onnx_file} if onnx_file else {}
+            self.model = SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=kwargs)
+        elif backend == "onnx-int8":
+            self.model = SentenceTransformer(model_name, device="cpu", backend="onnx",
+                                             model_kwargs={"file_name": onnx_file or DEFAULT_ONNX_INT8_FILE})
+        else:
+            raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+    def encode(self, texts: list) -> np.ndarray:
+        return self.model.encode(list(texts), batch_size=max(1, len(texts)), normalize_embeddings=True,
+                                 convert_to_numpy=True, show_progress_bar=False)
+
+
+def load_backend(backend: str, model_name: str, onnx_file: str = None):
+    """
+    Args:
+        backend (str): One of BACKENDS
+        model_name (str): Hugging Face model ID
+        onnx_file (str): ONNX file inside the model repo, for the onnx backends
+
+    Returns:
+        an object with a name and encode(texts) -> (n, dim) float32 array
+    """
+    if backend == "torch":
+        return HuggingFaceBackend(model_name)
+    return SentenceTransformerBackend(model_name, backend, onnx_file=onnx_file)
+
+
+class EmbeddingCache:
+    """
+    LRU of embedding vectors keyed by text_key(), optionally backed by a
+    SQLite file so vectors survive restarts and re-indexing runs.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: str = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get_many(self, keys: list) -> dict:
+        """{key: vector} for the keys found in memory or on disk."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vec = self._entries.get(key)
+                if vec is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vec
+            self.hits += len(found)
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        from_disk = self._read_disk(missing) if missing else {}
+        with self._lock:
+            for key, vec in from_disk.items():
+                self._put_memory(key, vec)
+            self.disk_hits += len(from_disk)
+            self.misses += len(missing) - len(from_disk)
+        found.update(from_disk)
+        return found
+
+    def put_many(self, items: dict):
+        with self._lock:
+            for key, vec in items.items():
+                self._put_memory(key, vec)
+        if self.path and items:
+            try:
+                self._conn().executemany(
+                    "INSERT OR REPLACE INTO vectors (key, vec) VALUES (?, ?)",
+                    [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()],
+                )
+            except sqlite3.Error as e:
+                print(f"[embedding_service.py] Could not write {len(items)} vectors to {self.path}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _put_memory(self, key: str, vec):
+        self._entries[key] = vec
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, keys: list) -> dict:
+        if not self.path:
+            return {}
+        found = {}
+        try:
+            conn = self._conn()
+            for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                chunk = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, vec FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v in rows)
+        except sqlite3.Error as e:
+            print(f"[embedding_service.py] Could not read vectors from {self.path}: {e}")
+        return found
+
+
+class EmbeddingService:
+    """
+    Embeds texts through a cache and a micro-batcher in front of one backend.
+
+    Cached texts (same text, same model and backend) are not embedded again.
+    The rest are queued; a batcher thread waits up to max_wait seconds after
+    the first request for others to arrive and embeds them all in one
+    forward pass of up to max_batch texts, so concurrent questions from
+    several sessions share a call. Requests of max_batch texts or more skip
+    the queue. Returned vectors are unit-normalised float32.
+    """
+
+    def __init__(self, backend, model_id: str, cache: EmbeddingCache = None, max_batch: int = 64,
+                 max_wait: float = 0.005):
+        self.backend = backend
+        self.model_id = model_id
+        self.cache = cache
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        # One forward pass at a time: concurrent passes only fight over the same cores
+        self._encode_lock = threading.Lock()
+        self.batches = 0
+        self.encoded = 0
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Args:
+            texts (list): Strings to embed
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32, one unit vector per text
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [text_key(t, self.model_id) for t in texts]
+        found = self.cache.get_many(keys) if self.cache is not None else {}
+        if self.cache is not None:
+            metrics = get_metrics()
+            metrics.inc("cache_lookups_total", len(found), cache="embedding", result="hit")
+            metrics.inc("cache_lookups_total", len(keys) - len(found), cache="embedding", result="miss")
+
+        todo = {k: t for k, t in zip(keys, texts) if k not in found}  # duplicates embedded once
+        if todo:
+            vectors = self._encode(list(todo.values()))
+            new = dict(zip(todo, vectors))
+            if self.cache is not None:
+                self.cache.put_many(new)
+            found.update(new)
+        return np.stack([found[k] for k in keys])
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def stats(self) -> dict:
+        stats = {"backend": self.backend.name, "batches": self.batches, "encoded": self.encoded,
+                 "mean_batch": self.encoded / self.batches if self.batches else 0.0}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def _encode(self, texts: list) -> np.ndarray:
+        if len(texts) >= self.max_batch or self.max_wait <= 0:
+            return np.concatenate([self._run(texts[i:i + self.max_batch])
+                                   for i in range(0, len(texts), self.max_batch)])
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _run(self, texts: list) -> np.ndarray:
+        with self._encode_lock:
+            start = time.perf_counter()
+            vectors = _normalize(self.backend.encode(texts))
+            self.batches += 1
+            self.encoded += len(texts)
+        metrics = get_metrics()
+        metrics.observe("embed_batch", time.perf_counter() - start)
+        metrics.inc("embedded_texts_total", len(texts), backend=self.backend.name)
+        return vectors
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._batch_loop, name="embed-batcher", daemon=True)
+                self._thread.start()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+
+            texts = [t for request_texts, _ in batch for t in request_texts]
+            try:
+                vectors = self._run(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_texts, future in batch:
+                future.set_result(vectors[start:start + len(request_texts)])
+                start += len(request_texts)
+
+
+def as_llama_embedding(service: EmbeddingService):
+    """
+    Wrap the service as a llama_index embedding model, so retrievers,
+    Settings.embed_model and index building all go through its cache and
+    batcher.
+    """
+    from llama_index.core.embeddings import BaseEmbedding
+    from pydantic import PrivateAttr
+
+    class ServiceEmbedding(BaseEmbedding):
+        _service: EmbeddingService = PrivateAttr()
+
+        def __init__(self, service: EmbeddingService, **kwargs):
+            super().__init__(**kwargs)
+            self._service = service
+
+        @property
+        def service(self) -> EmbeddingService:
+            return self._service
+
+        def _get_query_embedding(self, query: str) -> list:
+            return self._service.embed_one(query).tolist()
+
+        def _get_text_embedding(self, text: str) -> list:
+            return self._service.embed_one(text).tolist()
+
+        def _get_text_embeddings(self, texts: list) -> list:
+            return self._service.embed(texts).tolist()
+
+        async def _aget_query_embedding(self, query: str) -> list:
+            return self._get_query_embedding(query)
+
+    return ServiceEmbedding(service, model_name=service.model_id,
+                            embed_batch_size=min(2048, max(service.max_batch, 10)))
+
+
+def similarity_report(reference: np.ndarray, candidate: np.ndarray, k: int = 5) -> dict:
+    """
+    How closely a candidate backend reproduces the reference embeddings of
+    the same texts.
+
+    Args:
+        reference (np.ndarray): (n, dim) vectors from the reference backend
+        candidate (np.ndarray): (n, dim) vectors from the candidate
+        k (int): Neighbourhood size for the overlap score
+
+    Returns:
+        dict: mean_cosine and min_cosine between each text's two vectors, and
+        topk_overlap (mean share of each text's k nearest neighbours among
+        the other texts that both backends agree on)
+    """
+    ref, cand = _normalize(reference), _normalize(candidate)
+    cosines = np.sum(ref * cand, axis=1)
+    n = len(ref)
+    k = max(1, min(k, n - 1))
+    overlap = 1.0
+    if n > 1:
+        ref_sim, cand_sim = ref @ ref.T, cand @ cand.T
+        np.fill_diagonal(ref_sim, -np.inf)
+        np.fill_diagonal(cand_sim, -np.inf)
+        ref_top = np.argsort(-ref_sim, axis=1)[:, :k]
+        cand_top = np.argsort(-cand_sim, axis=1)[:, :k]
+        overlap = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]))
+    return {
+        "mean_cosine": float(np.mean(cosines)),
+        "min_cosine": float(np.min(cosines)),
+        "topk_overlap": overlap,
+    }
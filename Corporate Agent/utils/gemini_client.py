@@ -0,0 +1,244 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_URL = os.getenv(
+    "GEMINI_API_URL",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
+)
+
+
+def stream_url_for(url: str) -> str:
+    """Server-sent events variant of a generateContent URL."""
+    return url.replace(":generateContent", ":streamGenerateContent") + "?alt=sse"
+
+
+GEMINI_STREAM_URL = os.getenv("GEMINI_STREAM_URL", stream_url_for(GEMINI_URL))
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Answer text when Gemini returns no candidates (e.g. a safety block)
+NO_CANDIDATES = "No candidates generated by Gemini."
+
+
+class GeminiClient:
+    """
+    Pooled Gemini client: one keep-alive requests.Session shared by all
+    callers, (connect, read) timeouts, jittered exponential backoff on
+    429/5xx and connection failures (not read timeouts), and a cap on
+    in-flight requests that covers streamed bodies until they are read.
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        url: str = GEMINI_URL,
+        stream_url: str = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        max_concurrency: int = 8,
+    ):
+        self.api_key = api_key if api_key is not None else os.getenv("GEMINI_API_KEY")
+        self.url = url
+        self.stream_url = stream_url or (GEMINI_STREAM_URL if url == GEMINI_URL else stream_url_for(url))
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # "full jitter": uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, payload: dict, url: str = None, stream: bool = False) -> requests.Response:
+        """
+        POST payload with retries. Returns the last response (which may still
+        be an error status); raises if every attempt failed to connect, or on
+        a read timeout, which is not retried since Gemini may already be
+        generating the answer.
+
+        Each attempt holds one of the max_concurrency slots. With stream=True
+        the returned response still holds its slot while the caller reads the
+        body: call release() once it is consumed or closed.
+        """
+        headers = {"X-goog-api-key": self.api_key or ""}
+        for attempt in range(self.max_retries + 1):
+            self._slots.acquire()
+            try:
+                response = self.session.post(
+                    url or self.url, headers=headers, json=payload,
+                    timeout=self.timeout, stream=stream,
+                )
+            except requests.ConnectionError:  # includes ConnectTimeout
+                self._slots.release()
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                if not stream:
+                    self._slots.release()
+                return response
+            delay = self._backoff(attempt, response.headers.get("Retry-After"))
+            response.close()
+            self._slots.release()
+            time.sleep(delay)
+
+    def release(self):
+        """Give back the slot of a post(stream=True) response."""
+        self._slots.release()
+
+    def generate(self, prompt: str) -> str:
+        """Answer one prompt. Errors are returned as text, like call_gemini_api always did."""
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        try:
+            response = self.post(payload)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            return f"Error: Gemini request failed ({e.__class__.__name__}: {e})"
+        return parse_generate_response(response)
+
+    def generate_stream(self, prompt: str):
+        """
+        Answer one prompt incrementally from the streamGenerateContent SSE
+        endpoint, yielding text pieces as they arrive. Retries happen before
+        the first byte only. Errors are yielded as text, like generate();
+        a server without the streaming endpoint (404) gets one generate() call.
+        A stream that carries no text (a safety block, metadata-only events)
+        yields NO_CANDIDATES, so there is always at least one piece.
+        """
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        try:
+            response = self.post(payload, url=self.stream_url, stream=True)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            yield f"Error: Gemini request failed ({e.__class__.__name__}: {e})"
+            return
+
+        fallback = False
+        try:  # the slot is held until the body is read or the caller stops iterating
+            with response:
+                if response.status_code == 404:
+                    fallback = True
+                elif response.status_code != 200:
+                    yield parse_generate_response(response)
+                elif "event-stream" not in response.headers.get("Content-Type", ""):
+                    # a proxy that buffers the stream into one JSON array
+                    yield "".join(parse_stream_event(event) for event in _as_list(response.json())) or NO_CANDIDATES
+                else:
+                    yield from _iter_stream_text(response)
+        finally:
+            self.release()
+        if fallback:  # after the release, so generate() can't wait on our own slot
+            yield self.generate(prompt)
+
+    def generate_batch(self, prompts: list) -> list:
+        """Answer several prompts concurrently; answers come back in input order."""
+        if not prompts:
+            return []
+        workers = min(len(prompts), self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self.generate, prompts))
+
+
+def _iter_stream_text(response: requests.Response):
+    """Text pieces of an SSE response; NO_CANDIDATES if it carried none."""
+    yielded = False
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            text = parse_stream_event(json.loads(line[5:].strip()))
+            if text:
+                yielded = True
+                yield text
+    except (requests.RequestException, ValueError) as e:
+        # RequestException covers ChunkedEncodingError from a dropped chunked stream
+        yield f"\n\nError: Gemini stream interrupted ({e.__class__.__name__})"
+        return
+    if not yielded:
+        yield NO_CANDIDATES
+
+
+def parse_generate_response(response: requests.Response) -> str:
+    if response.status_code == 200:
+        resp_json = response.json()
+        candidates = resp_json.get("candidates", [])
+        if candidates:
+            # Assuming the output text is in the 'text' field of the first part
+            parts = candidates[0].get("content", {}).get("parts", [])
+            if parts:
+                return parts[0].get("text", "No text output in the first part.")
+            else:
+                return "No parts found in the first candidate."
+        else:
+            return NO_CANDIDATES
+    else:
+        try:
+            error_details = response.json()
+            return f"Error {response.status_code}: {error_details.get('error', {}).get('message', 'Unknown error')}"
+        except ValueError:
+            return f"Error {response.status_code}: Could not decode error response."
+
+
+def parse_stream_event(event: dict) -> str:
+    """Text of one streamGenerateContent chunk ("" for metadata-only chunks)."""
+    if "error" in event:
+        return f"Error: {event['error'].get('message', 'Unknown error')}"
+    candidates = event.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """
+    Process-wide client. Timeouts and limits can be tuned with
+    GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT, GEMINI_MAX_RETRIES and
+    GEMINI_MAX_CONCURRENCY.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = GeminiClient(
+                connect_timeout=float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5")),
+                read_timeout=float(os.getenv("GEMINI_READ_TIMEOUT", "60")),
+                max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "4")),
+                max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+            )
+        return _default_client
@@ -0,0 +1,169 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Function words only; legal terms like "shall" or "may" are kept
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its of on or "
+    "should that the their there these this to was what when where which who why will with "
+    "you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """Lowercased alphanumeric terms without stopwords ("s.12" -> ["s", "12"])."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def bm25_idf(n: int, df: int) -> float:
+    """BM25 inverse document frequency of a term in df of n documents."""
+    return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an in-memory inverted index: term -> [(doc, tf)]. Only
+    postings are kept, not the texts, so it stays small next to the vectors.
+    """
+
+    def __init__(self, docs, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            docs: iterable of (doc_id, text)
+        """
+        self.k1 = k1
+        self.doc_ids = []
+        self.postings = {}
+        lengths = []
+        for doc_id, text in docs:
+            tokens = tokenize(text or "")
+            pos = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((pos, tf))
+
+        n = len(self.doc_ids)
+        avgdl = sum(lengths) / n if n else 0.0
+        self.idf = {term: bm25_idf(n, len(p)) for term, p in self.postings.items()}
+        # Per-document part of the BM25 denominator, computed once
+        self._norm = [k1 * (1 - b + b * length / avgdl) if avgdl else k1 for length in lengths]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query: str, top_k: int = 10) -> list:
+        """[(doc_id, score)] best first; documents sharing no term are left out."""
+        scores = defaultdict(float)
+        k1 = self.k1
+        norm = self._norm
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for pos, tf in postings:
+                scores[pos] += idf * tf * (k1 + 1) / (tf + norm[pos])
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[pos], score) for pos, score in best]
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Fuse several ranked lists of IDs: score(d) = sum 1 / (k + rank). Ranks
+    only, so BM25 and L2 scores never need to be put on one scale.
+
+    Returns:
+        list: [(id, fused score)] best first
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class CrossEncoderReranker:
+    """
+    Local cross-encoder (sentence-transformers) scoring (question, chunk)
+    pairs. The model is loaded on first use.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", batch_size: int = 16):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    print(f"[hybrid_retriever.py] Loading re-ranker {self.model_name} ...")
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def score(self, query: str, texts: list) -> list:
+        if not texts:
+            return []
+        model = self._get_model()
+        return [float(s) for s in model.predict([(query, t) for t in texts], batch_size=self.batch_size)]
+
+
+class HybridRetriever:
+    """
+    Dense + BM25 retrieval fused with reciprocal rank fusion, optionally
+    re-ranked by a cross-encoder. Drop-in for the llama_index and compact
+    retrievers: retrieve() takes a question or QueryBundle and returns
+    NodeWithScore objects (score = fused or re-ranker score).
+    """
+
+    def __init__(self, dense_retriever, bm25: BM25Index, fetch_nodes, similarity_top_k: int = 4,
+                 candidate_k: int = 20, rrf_k: int = 60, reranker=None):
+        """
+        Args:
+            dense_retriever: returns candidate_k NodeWithScore per query
+            bm25: index over the same node IDs
+            fetch_nodes: callable(list of node IDs) -> {node_id: node} for
+                BM25-only hits
+            reranker: object with score(query, texts), or None
+        """
+        self.dense_retriever = dense_retriever
+        self.bm25 = bm25
+        self.fetch_nodes = fetch_nodes
+        self.similarity_top_k = similarity_top_k
+        self.candidate_k = candidate_k
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+
+    def retrieve(self, query) -> list:
+        from llama_index.core.schema import NodeWithScore
+
+        query_str = getattr(query, "query_str", query)
+        dense = self.dense_retriever.retrieve(query)
+        sparse = self.bm25.search(query_str, self.candidate_k)
+
+        nodes = {hit.node.node_id: hit.node for hit in dense}
+        fused = reciprocal_rank_fusion(
+            [[hit.node.node_id for hit in dense], [node_id for node_id, _ in sparse]], k=self.rrf_k
+        )
+        # Re-rank the whole candidate pool, otherwise just the top k
+        keep = fused if self.reranker is not None else fused[:self.similarity_top_k]
+        missing = [node_id for node_id, _ in keep if node_id not in nodes]
+        if missing:
+            nodes.update(self.fetch_nodes(missing))
+
+        results = [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in keep if node_id in nodes]
+        if self.reranker is not None and results:
+            scores = self.reranker.score(query_str, [r.node.get_content() for r in results])
+            for result, score in zip(results, scores):
+                result.score = score
+            results.sort(key=lambda r: r.score, reverse=True)
+            results = results[:self.similarity_top_k]
+        return results
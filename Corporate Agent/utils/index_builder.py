@@ -0,0 +1,331 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+from utils.ann_index import EXACT_VECTORS_FILE, build_index, exact_vectors, index_spec
+from utils.ann_index import rebuild_for_config
+from utils.ann_index import load_index_config, save_index_config
+from utils.ann_index import CURRENT_FILE, VERSIONS_DIR, resolve_store_dir
+from utils.rag_engine import PERSIST_DIR, get_embed_model
+
+DOCSTORE_FILE = "docstore.json"
+INDEX_STORE_FILE = "index_store.json"
+VECTOR_FILE = "default__vector_store.json"
+
+SOURCE_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+
+# Same exclusions the original ingestion used, plus file_path (machine specific)
+EXCLUDED_METADATA_KEYS = [
+    "file_name", "file_path", "file_type", "file_size",
+    "creation_date", "last_modified_date", "last_accessed_date",
+]
+
+
+def read_sources(source_dir: str) -> list:
+    """
+    Read every supported file under source_dir into documents: one per PDF
+    page (like the original SimpleDirectoryReader ingestion), one per other file.
+
+    Returns:
+        list: dicts with key (file_name, page_label), text, metadata, doc_hash
+    """
+    docs = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(SOURCE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            for page_label, text in _read_file(path):
+                text = (text or "").strip()
+                if not text:
+                    continue
+                metadata = {"file_name": name, "file_path": os.path.abspath(path)}
+                if page_label:
+                    metadata["page_label"] = page_label
+                docs.append({
+                    "key": (name, page_label or ""),
+                    "text": text,
+                    "metadata": metadata,
+                    "doc_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                })
+    return docs
+
+
+def _read_file(path: str):
+    lower = path.lower()
+    if lower.endswith(".pdf"):
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+        for i, page in enumerate(reader.pages, start=1):
+            yield str(i), page.extract_text()
+    elif lower.endswith(".docx"):
+        from utils.parser import extract_text_from_docx
+
+        yield "", extract_text_from_docx(path)
+    else:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield "", f.read()
+
+
+def _load_store(persist_dir: str):
+    import faiss
+
+    with open(os.path.join(persist_dir, DOCSTORE_FILE), "r", encoding="utf-8") as f:
+        docstore = json.load(f)
+    with open(os.path.join(persist_dir, INDEX_STORE_FILE), "r", encoding="utf-8") as f:
+        index_store = json.load(f)
+    index = faiss.read_index(os.path.join(persist_dir, VECTOR_FILE))
+    return docstore, index_store, index
+
+
+def _chunk_nodes(doc: dict, doc_id: str, chunk_size: int, chunk_overlap: int) -> list:
+    from llama_index.core.node_parser import SentenceSplitter
+    from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+
+    splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    source = RelatedNodeInfo(node_id=doc_id, metadata=doc["metadata"], hash=doc["doc_hash"])
+    return [
+        TextNode(
+            text=chunk,
+            metadata=dict(doc["metadata"]),
+            excluded_embed_metadata_keys=list(EXCLUDED_METADATA_KEYS),
+            excluded_llm_metadata_keys=list(EXCLUDED_METADATA_KEYS),
+            relationships={NodeRelationship.SOURCE: source},
+        )
+        for chunk in splitter.split_text(doc["text"])
+    ]
+
+
+def _embed_nodes(nodes: list, batch_size: int):
+    import numpy as np
+    from llama_index.core.schema import MetadataMode
+
+    model = get_embed_model()
+    texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(model.get_text_embedding_batch(texts[i:i + batch_size]))
+    return np.asarray(vectors, dtype="float32").reshape(len(texts), -1)
+
+
+def ingest(source_dir: str, persist_dir: str = PERSIST_DIR, prune: bool = False,
+           batch_size: int = 64, chunk_size: int = 1024, chunk_overlap: int = 200,
+           dry_run: bool = False) -> dict:
+    """
+    Bring the persisted RAG index up to date with source_dir, embedding only
+    new or changed documents.
+
+    A document is identified by (file_name, page_label) and compared to the
+    stored doc_hash. Pages that disappeared from a file present in source_dir
+    are removed; documents whose file is absent are removed only with prune
+    (so ingesting a folder of new regulations never drops the rest).
+    Everything is written to a sibling directory first and swapped in.
+
+    Returns:
+        dict: counts of added/changed/removed/unchanged documents, embedded
+        nodes and timings
+    """
+    import faiss
+    import numpy as np
+    from llama_index.core.storage.docstore.utils import doc_to_json
+
+    start = time.perf_counter()
+    store_dir = resolve_store_dir(persist_dir)
+    docstore, index_store, index = _load_store(store_dir)
+    metadata = docstore.setdefault("docstore/metadata", {})
+    data = docstore.setdefault("docstore/data", {})
+    ref_docs = docstore.setdefault("docstore/ref_doc_info", {})
+
+    stored = {}
+    for doc_id, info in ref_docs.items():
+        meta = info.get("metadata", {})
+        stored[(meta.get("file_name", ""), str(meta.get("page_label", "")))] = doc_id
+
+    sources = read_sources(source_dir)
+    source_keys = {d["key"] for d in sources}
+    source_files = {d["key"][0] for d in sources}
+
+    to_embed = []  # (doc, doc_id)
+    removed_doc_ids = []
+    stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+    for doc in sources:
+        doc_id = stored.get(doc["key"])
+        if doc_id is None:
+            to_embed.append((doc, str(uuid.uuid4())))
+            stats["added"] += 1
+        elif metadata.get(doc_id, {}).get("doc_hash") != doc["doc_hash"]:
+            to_embed.append((doc, doc_id))
+            removed_doc_ids.append(doc_id)  # old nodes go, new ones come in
+            stats["changed"] += 1
+        else:
+            stats["unchanged"] += 1
+
+    for key, doc_id in stored.items():
+        if key not in source_keys and (prune or key[0] in source_files):
+            removed_doc_ids.append(doc_id)
+            stats["removed"] += 1
+
+    stats["read_time"] = time.perf_counter() - start
+    if dry_run or (not to_embed and not removed_doc_ids):
+        stats["embedded_nodes"] = 0
+        return stats
+
+    # Chunk and embed only what changed
+    start = time.perf_counter()
+    new_nodes = []
+    for doc, doc_id in to_embed:
+        new_nodes.extend(_chunk_nodes(doc, doc_id, chunk_size, chunk_overlap))
+    vectors = _embed_nodes(new_nodes, batch_size) if new_nodes else None
+    stats["embedded_nodes"] = len(new_nodes)
+    stats["embed_time"] = time.perf_counter() - start
+
+    # Vector index: append when nothing is deleted; otherwise copy the kept
+    # vectors out of the store (no re-embedding) and rebuild with the same
+    # index spec. Approximate indexes also carry their exact vectors along.
+    start = time.perf_counter()
+    index_id, index_entry = next(iter(index_store["index_store/data"].items()))
+    index_data = json.loads(index_entry["__data__"])
+    nodes_dict = index_data["nodes_dict"]
+    config = load_index_config(store_dir)
+    spec = config["spec"]
+    approximate = config.get("kind", spec) not in ("flat", "Flat")
+    exact = exact_vectors(store_dir, index) if approximate else None
+
+    removed_node_ids = set()
+    for doc_id in removed_doc_ids:
+        removed_node_ids.update(ref_docs.get(doc_id, {}).get("node_ids", []))
+
+    if removed_node_ids:
+        ordered = [nodes_dict[str(i)] for i in range(index.ntotal)]
+        keep = [i for i, node_id in enumerate(ordered) if node_id not in removed_node_ids]
+        all_vectors = exact if exact is not None else index.reconstruct_n(0, index.ntotal)
+        kept_vectors = all_vectors[keep]
+        if exact is None:
+            index = faiss.IndexFlatL2(index.d)
+            index.add(kept_vectors)
+        else:
+            index, config["spec"] = rebuild_for_config(kept_vectors, config)
+            exact = kept_vectors
+        nodes_dict = {str(pos): ordered[i] for pos, i in enumerate(keep)}
+
+        for node_id in removed_node_ids:
+            data.pop(node_id, None)
+            metadata.pop(node_id, None)
+        for doc_id in set(removed_doc_ids):
+            ref_docs.pop(doc_id, None)
+            metadata.pop(doc_id, None)
+
+    if new_nodes:
+        base = index.ntotal
+        index.add(vectors)
+        if exact is not None:
+            exact = np.concatenate([exact, vectors])
+        for offset, node in enumerate(new_nodes):
+            nodes_dict[str(base + offset)] = node.node_id
+            data[node.node_id] = doc_to_json(node)
+            doc_id = node.ref_doc_id
+            metadata[node.node_id] = {"doc_hash": node.hash, "ref_doc_id": doc_id}
+            info = ref_docs.setdefault(doc_id, {"node_ids": [], "metadata": node.metadata})
+            info["node_ids"].append(node.node_id)
+        for doc, doc_id in to_embed:
+            metadata[doc_id] = {"doc_hash": doc["doc_hash"]}
+
+    index_data["nodes_dict"] = nodes_dict
+    index_entry["__data__"] = json.dumps(index_data)
+    stats["update_time"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _persist_atomically(persist_dir, docstore, index_store, index, exact,
+                        config if exact is not None else None)
+    stats["persist_time"] = time.perf_counter() - start
+    stats["total_vectors"] = index.ntotal
+    return stats
+
+
+def rebuild_vector_index(persist_dir: str = PERSIST_DIR, kind: str = "flat",
+                         nlist: int = None, hnsw_m: int = 32, pq_m: int = None,
+                         nprobe: int = None, ef_search: int = None) -> dict:
+    """
+    Re-index the stored vectors as another FAISS index type (see
+    utils.ann_index.INDEX_KINDS, or any index_factory string) without
+    re-embedding. FAISS row order, and so the node mapping, is unchanged.
+    nprobe / efSearch are saved with the store and applied on every load.
+
+    Returns:
+        dict: spec, vector count, build time and index size in bytes
+    """
+    import faiss
+
+    store_dir = resolve_store_dir(persist_dir)
+    docstore, index_store, index = _load_store(store_dir)
+    vectors = exact_vectors(store_dir, index)
+    spec = index_spec(kind, len(vectors), vectors.shape[1], nlist=nlist, hnsw_m=hnsw_m, pq_m=pq_m)
+
+    start = time.perf_counter()
+    new_index = build_index(vectors, spec)
+    build_time = time.perf_counter() - start
+
+    config = {"kind": kind, "spec": spec}
+    for key, value in (("nlist", nlist), ("hnsw_m", hnsw_m), ("pq_m", pq_m),
+                       ("nprobe", nprobe), ("ef_search", ef_search)):
+        if value:
+            config[key] = value
+    _persist_atomically(persist_dir, docstore, index_store, new_index,
+                        None if spec == "Flat" else vectors, config)
+    return {
+        "spec": spec,
+        "total_vectors": new_index.ntotal,
+        "build_time": build_time,
+        "index_bytes": int(faiss.serialize_index(new_index).size),
+    }
+
+
+def _persist_atomically(persist_dir: str, docstore: dict, index_store: dict, index,
+                        exact=None, config: dict = None):
+    """
+    Write the new store as persist_dir/versions/<id>/, then point
+    persist_dir/CURRENT at it with one os.replace, so readers see either
+    the old version or the new one and never a missing store. The previous
+    version is kept for readers still loading it; older ones are removed.
+    exact (full-precision vectors) is only kept for approximate indexes;
+    config replaces the saved index config when given.
+    """
+    import faiss
+    import numpy as np
+
+    current_dir = resolve_store_dir(persist_dir)
+    versions_dir = os.path.join(persist_dir, VERSIONS_DIR)
+    version = f"{time.strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    new_dir = os.path.join(versions_dir, version)
+
+    # keeps graph/image stores as they are
+    shutil.copytree(current_dir, new_dir, ignore=shutil.ignore_patterns(VERSIONS_DIR, CURRENT_FILE))
+    with open(os.path.join(new_dir, DOCSTORE_FILE), "w", encoding="utf-8") as f:
+        json.dump(docstore, f)
+    with open(os.path.join(new_dir, INDEX_STORE_FILE), "w", encoding="utf-8") as f:
+        json.dump(index_store, f)
+    faiss.write_index(index, os.path.join(new_dir, VECTOR_FILE))
+    exact_path = os.path.join(new_dir, EXACT_VECTORS_FILE)
+    if exact is not None:
+        np.save(exact_path, np.ascontiguousarray(exact, dtype="float32"))
+    elif os.path.exists(exact_path):
+        os.remove(exact_path)
+    if config is not None:
+        save_index_config(new_dir, config)
+
+    pointer = os.path.join(persist_dir, CURRENT_FILE)
+    tmp_pointer = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer)
+
+    keep = {version, os.path.basename(current_dir)}
+    for name in os.listdir(versions_dir):
+        if name not in keep:
+            shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
@@ -0,0 +1,396 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.metrics import get_metrics
+from utils.pipeline import cache_version, review_uploads
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, created);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data BLOB,
+    result TEXT,
+    reviewed BLOB,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    lease_until REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_items_queue ON job_items (status, idx, created);
+"""
+
+# Items are "queued", then "running", then "done" (reviewed, possibly with
+# the review's own error message) or "error" (the worker itself failed)
+FINISHED = ("done", "error")
+
+
+def upload_key(files: list, version: str = None) -> str:
+    """
+    Same uploads (names and bytes, in order) under the same review version,
+    same key. version defaults to pipeline.cache_version(), so a change to
+    the pipeline, red-flag rules or document types queues a fresh job
+    instead of reusing one reviewed under the old rules.
+    """
+    h = hashlib.sha256()
+    h.update((version if version is not None else cache_version()).encode("utf-8"))
+    h.update(b"\0")
+    for filename, data in files:
+        h.update(filename.encode("utf-8"))
+        h.update(b"\0")
+        h.update(hashlib.sha256(bytes(data)).digest())
+    return h.hexdigest()
+
+
+class JobStore:
+    """
+    SQLite table of review jobs, one row per uploaded document. Several
+    worker threads, and several app processes pointed at the same file,
+    can claim items from it at once: a claim is a short BEGIN IMMEDIATE
+    transaction and holds a lease, so items of a crashed worker are picked
+    up again once the lease runs out.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def submit(self, files: list, key: str = None) -> str:
+        """
+        Queue one job for (filename, bytes) pairs. With a key, an existing
+        job for the same key is returned instead of queueing the work again
+        (Streamlit re-runs the app script on every interaction).
+
+        Returns:
+            str: the job ID
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if key:
+                # a job whose worker failed is not reused, so submitting again retries
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND NOT EXISTS "
+                    "(SELECT 1 FROM job_items WHERE job_id = jobs.id AND status = 'error') "
+                    "ORDER BY created DESC LIMIT 1", (key,)).fetchone()
+                if row:
+                    conn.execute("COMMIT")
+                    return row[0]
+            job_id = uuid.uuid4().hex
+            conn.execute("INSERT INTO jobs (id, key, status, total, created) VALUES (?, ?, ?, ?, ?)",
+                         (job_id, key, "queued" if files else "done", len(files), now))
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, filename, status, data, created) VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, i, filename, "queued", bytes(data), now) for i, (filename, data) in enumerate(files)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim(self, lease_seconds: float) -> dict:
+        """
+        Take the next queued item (or one whose lease ran out). Items are
+        taken by position, then age, so concurrent jobs share the workers:
+        every job's first document comes before anyone's second.
+
+        Returns:
+            dict: job_id, idx, filename, data and created, or None when idle
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT job_id, idx, filename, data, created FROM job_items "
+                "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY idx, created LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE job_items SET status = 'running', started = ?, lease_until = ? "
+                             "WHERE job_id = ? AND idx = ?", (now, now + lease_seconds, row[0], row[1]))
+                conn.execute("UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (row[0],))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return {"job_id": row[0], "idx": row[1], "filename": row[2], "data": row[3], "created": row[4]}
+
+    def complete(self, job_id: str, idx: int, result: dict = None, error: str = None):
+        """Store an item's review result (or the worker's error) and close the job when it was the last."""
+        reviewed, payload = None, None
+        if result is not None:
+            reviewed = result.get("reviewed_bytes")
+            payload = json.dumps({k: v for k, v in result.items() if k != "reviewed_bytes"}, ensure_ascii=False)
+            error = error or result.get("error")
+        status = "error" if result is None else "done"
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, reviewed = ?, error = ?, finished = ?, data = NULL "
+                "WHERE job_id = ? AND idx = ?",
+                (status, payload, reviewed, error, now, job_id, idx),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'done', finished = ? WHERE id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM job_items WHERE job_id = ? AND status NOT IN ('done', 'error'))",
+                (now, job_id, job_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def status(self, job_id: str) -> dict:
+        """
+        Returns:
+            dict: id, status ("queued", "running" or "done"), total, finished
+            (items done or failed), errors and items (idx, filename, status,
+            error, seconds), or None for an unknown job
+        """
+        conn = self._conn()
+        job = conn.execute("SELECT status, total, created, finished FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        items = [
+            {"idx": idx, "filename": filename, "status": status, "error": error,
+             "seconds": (finished - started) if finished and started else None}
+            for idx, filename, status, error, started, finished in conn.execute(
+                "SELECT idx, filename, status, error, started, finished FROM job_items "
+                "WHERE job_id = ? ORDER BY idx", (job_id,))
+        ]
+        return {
+            "id": job_id,
+            "status": job[0],
+            "total": job[1],
+            "finished": sum(1 for item in items if item["status"] in FINISHED),
+            "errors": sum(1 for item in items if item["error"]),
+            "items": items,
+            "created": job[2],
+            "finished_at": job[3],
+        }
+
+    def results(self, job_id: str) -> list:
+        """
+        review_uploads()-style dicts in upload order (None for items not
+        finished yet). A worker failure becomes a result with only
+        filename and error set.
+        """
+        results = []
+        for filename, status, result, reviewed, error in self._conn().execute(
+                "SELECT filename, status, result, reviewed, error FROM job_items WHERE job_id = ? ORDER BY idx",
+                (job_id,)):
+            if status not in FINISHED:
+                results.append(None)
+            elif result is None:
+                results.append(_failed_result(filename, error))
+            else:
+                entry = json.loads(result)
+                entry["reviewed_bytes"] = reviewed
+                results.append(entry)
+        return results
+
+    def purge(self, max_age_seconds: float) -> int:
+        """Delete jobs that finished more than max_age_seconds ago; returns how many."""
+        cutoff = time.time() - max_age_seconds
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status = 'done' AND finished < ?", (cutoff,))]
+            conn.executemany("DELETE FROM job_items WHERE job_id = ?", [(i,) for i in ids])
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(ids)
+
+
+def _failed_result(filename: str, error: str) -> dict:
+    return {
+        "filename": filename, "path": None, "type": "Unknown", "type_scores": [], "flags": [],
+        "updated_path": None, "content": "", "sections": [], "error": error, "timings": {},
+        "cache_key": None, "sha256": None, "reviewed_bytes": None, "cached": False,
+    }
+
+
+class JobQueue:
+    """
+    Background review workers over a JobStore. Worker threads claim one
+    document at a time and review it with review_uploads(), in a shared
+    process pool by default, so the Streamlit script thread only submits
+    and polls. All sessions of a process share the workers.
+    """
+
+    def __init__(self, store: JobStore, workers: int = None, executor: str = "process",
+                 lease_seconds: float = 600.0,
+                 retention_seconds: float = 24 * 3600, poll_interval: float = 0.5):
+        """
+        Args:
+            store: where jobs live
+            workers: worker threads (and pool processes); defaults to the CPU count
+            executor: "process" reviews in a process pool, "thread" in the worker threads
+            lease_seconds: how long a claimed item may run before another worker retries it
+            retention_seconds: finished jobs are purged after this long
+            poll_interval: idle workers check the store this often (other
+                processes may have queued work)
+        """
+        self.store = store
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.executor = executor
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_purge = 0.0
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"review-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[job_queue.py] {self.workers} review workers ({self.executor}) on {self.store.path}")
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def submit(self, files: list, key: str = None) -> str:
+        """
+        Queue (filename, bytes) pairs; key defaults to upload_key(files),
+        which is salted with the current cache_version(). Returns the job ID.
+        """
+        job_id = self.store.submit(files, key or upload_key(files))
+        self._wake.set()
+        return job_id
+
+    def status(self, job_id: str) -> dict:
+        return self.store.status(job_id)
+
+    def results(self, job_id: str) -> list:
+        return self.store.results(job_id)
+
+    def _get_pool(self):
+        if self.executor != "process":
+            return None
+        with self._pool_lock:
+            # a killed worker breaks the pool for good; start a new one
+            if self._pool is None or getattr(self._pool, "_broken", False):
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                item = self.store.claim(self.lease_seconds)
+            except sqlite3.Error as e:
+                print(f"[job_queue.py] Cannot claim work ({e}); retrying")
+                item = None
+            if item is None:
+                self._maybe_purge()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(item)
+
+    def _run(self, item: dict):
+        metrics = get_metrics()
+        metrics.observe("job_wait", max(0.0, time.time() - item["created"]))
+        try:
+            # Reviewed in memory: the item's bytes go straight to the pool worker
+            result = review_uploads([(item["filename"], item["data"])], workers=1, pool=self._get_pool())[0]
+            self.store.complete(item["job_id"], item["idx"], result=result)
+            metrics.inc("job_items_total", status="error" if result["error"] else "done")
+        except Exception as e:
+            print(f"[job_queue.py] Job {item['job_id'][:8]} item {item['idx']} failed: {e}")
+            self.store.complete(item["job_id"], item["idx"], error=f"Failed to review {item['filename']}: {e}")
+            metrics.inc("job_items_total", status="failed")
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge < 600:
+            return
+        self._last_purge = now
+        try:
+            purged = self.store.purge(self.retention_seconds)
+            if purged:
+                print(f"[job_queue.py] Purged {purged} finished jobs")
+        except sqlite3.Error as e:
+            print(f"[job_queue.py] Purge failed: {e}")
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Process-wide queue with its workers started, shared by all Streamlit
+    sessions. Configured by JOB_DB_PATH, JOB_WORKERS, JOB_EXECUTOR,
+    JOB_LEASE_SECONDS and JOB_RETENTION_HOURS.
+    """
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            workers = os.getenv("JOB_WORKERS")
+            _default_queue = JobQueue(
+                JobStore(os.getenv("JOB_DB_PATH", os.path.join("outputs", "jobs.sqlite3"))),
+                workers=int(workers) if workers else None,
+                executor=os.getenv("JOB_EXECUTOR", "process"),
+                lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "600")),
+                retention_seconds=float(os.getenv("JOB_RETENTION_HOURS", "24")) * 3600,
+            )
+            _default_queue.start()
+        return _default_queue
@@ -0,0 +1,284 @@
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = "corporate_agent"
+
+# Histogram bucket bounds in seconds, from a cached lookup to a slow LLM call
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Recent observations kept per stage for the diagnostics panel's p50/p95
+RECENT_SAMPLES = 1024
+
+# METRICS_LOG=1 prints one JSON line per event to stderr
+METRICS_LOG = os.getenv("METRICS_LOG", "0") == "1"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "recent")
+
+    def __init__(self, n_buckets: int):
+        self.buckets = [0] * (n_buckets + 1)  # last one is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+
+class Metrics:
+    """
+    Process-wide counters and per-stage latency histograms.
+
+    Recording is a lock and a few dict updates, cheap enough to leave on in
+    production. Stage names are the pipeline's timing keys (extract,
+    detect_type, red_flags, comment, checklist, summarize) and the RAG steps
+    (rag_load, embed, retrieve, llm). Counters carry labels such as
+    {"cache": "review", "result": "hit"}.
+
+    Review workers run in other processes, so their stages are recorded by
+    the parent from each result's "timings" (see pipeline.iter_review), not
+    inside the worker.
+    """
+
+    def __init__(self, buckets: tuple = STAGE_BUCKETS, log: bool = METRICS_LOG):
+        self.bucket_bounds = tuple(buckets)
+        self.log_enabled = log
+        self.started = time.time()
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration for a stage."""
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = _Histogram(len(self.bucket_bounds))
+            hist.buckets[bisect_left(self.bucket_bounds, seconds)] += 1
+            hist.count += 1
+            hist.total += seconds
+            hist.recent.append(seconds)
+
+    def observe_timings(self, timings: dict):
+        """observe() every {stage: seconds} entry, e.g. a review result's timings."""
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """with metrics.timer("checklist"): ... records the block's duration."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter; labels become Prometheus labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def log(self, event: str, **fields):
+        """One structured JSON line on stderr, if METRICS_LOG is on."""
+        if not self.log_enabled:
+            return
+        record = {"ts": round(time.time(), 3), "event": event}
+        record.update(fields)
+        print(json.dumps(record, ensure_ascii=False, default=str), file=sys.stderr, flush=True)
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: stages ({stage: count, total_seconds, mean_ms, p50_ms,
+            p95_ms, max_ms}, percentiles over the last RECENT_SAMPLES),
+            counters (list of {name, labels, value}) and uptime_seconds
+        """
+        with self._lock:
+            stages = {name: (h.count, h.total, sorted(h.recent)) for name, h in self._stages.items()}
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+
+        def pct(ordered, p):
+            return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1000
+
+        return {
+            "stages": {
+                name: {
+                    "count": count,
+                    "total_seconds": round(total, 4),
+                    "mean_ms": round(total / count * 1000, 2) if count else 0.0,
+                    "p50_ms": round(pct(recent, 50), 2) if recent else 0.0,
+                    "p95_ms": round(pct(recent, 95), 2) if recent else 0.0,
+                    "max_ms": round(recent[-1] * 1000, 2) if recent else 0.0,
+                }
+                for name, (count, total, recent) in sorted(stages.items())
+            },
+            "counters": counters,
+            "uptime_seconds": round(time.time() - self.started, 1),
+        }
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            stages = [(name, list(h.buckets), h.count, h.total) for name, h in sorted(self._stages.items())]
+            counters = sorted(self._counters.items())
+
+        hist_name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {hist_name} Time spent per review / RAG stage.",
+            f"# TYPE {hist_name} histogram",
+        ]
+        for stage, buckets, count, total in stages:
+            cumulative = 0
+            for bound, n in zip(self.bucket_bounds + (float("inf"),), buckets):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{hist_name}_bucket{{stage="{_escape(stage)}",le="{le}"}} {cumulative}')
+            lines.append(f'{hist_name}_sum{{stage="{_escape(stage)}"}} {total!r}')
+            lines.append(f'{hist_name}_count{{stage="{_escape(stage)}"}} {count}')
+
+        last = None
+        for (name, labels), value in counters:
+            full = f"{METRIC_PREFIX}_{name}"
+            if name != last:
+                lines.append(f"# TYPE {full} counter")
+                last = name
+            label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+            lines.append(f"{full}{{{label_text}}} {_number(value)}" if label_text else f"{full} {_number(value)}")
+
+        lines.append(f"# TYPE {METRIC_PREFIX}_uptime_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_uptime_seconds {time.time() - self.started:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> str:
+        """
+        Write render_prometheus() to path atomically, e.g. for node_exporter's
+        textfile collector (which wants a .prom file).
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+_default_metrics = Metrics()
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """The process-wide Metrics every stage records into."""
+    return _default_metrics
+
+
+def serve_prometheus(port: int, host: str = "0.0.0.0"):
+    """
+    Serve get_metrics() at http://host:port/metrics from a daemon thread,
+    once per process (Streamlit re-runs the app script on every interaction).
+
+    Returns:
+        ThreadingHTTPServer: the running server
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = get_metrics().render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # scrapes every few seconds would flood the console
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[metrics.py] Prometheus metrics on http://{host}:{port}/metrics")
+        return _server
+
+
+@contextmanager
+def profile(name: str, out_dir: str = "profiles", enabled: bool = True, profiler: str = None):
+    """
+    Profile the block and save the report under out_dir.
+
+    Uses pyinstrument (an HTML report) when profiler="pyinstrument", or
+    PROFILER=pyinstrument, and it is installed; cProfile (a .prof file for
+    snakeviz / pstats) otherwise. Only the calling process is profiled:
+    review workers in a process pool are not, so profile with one worker.
+
+    Yields:
+        dict: {"path": ...} filled in with the report path when the block exits
+        (path stays None when disabled)
+    """
+    report = {"path": None}
+    if not enabled:
+        yield report
+        return
+
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    profiler = profiler or os.getenv("PROFILER", "cprofile")
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[metrics.py] pyinstrument is not installed; using cProfile")
+        else:
+            prof = Profiler()
+            prof.start()
+            try:
+                yield report
+            finally:
+                prof.stop()
+                report["path"] = os.path.join(out_dir, f"{name}_{stamp}_{os.getpid()}.html")
+                with open(report["path"], "w", encoding="utf-8") as f:
+                    f.write(prof.output_html())
+                print(f"[metrics.py] Profile saved to {report['path']}")
+            return
+
+    import cProfile
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield report
+    finally:
+        prof.disable()
+        report["path"] = os.path.join(out_dir, f"{name}_{stamp}_{os.getpid()}.prof")
+        prof.dump_stats(report["path"])
+        print(f"[metrics.py] Profile saved to {report['path']}")
@@ -1,15 +1,66 @@
 from docx import Document
+import io
 import re
-from typing import List
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List
 
-def extract_text_from_docx(file_path: str) -> str:
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = _W_NS + "p"
+_W_T = _W_NS + "t"
+_W_TAB = _W_NS + "tab"
+_W_BR = _W_NS + "br"
+_W_CR = _W_NS + "cr"
+_W_BODY = _W_NS + "body"
+_HEADER_FOOTER_PART = re.compile(r"^word/(header|footer)\d*\.xml$")
+
+# tabs -> space and runs of spaces/tabs/nbsp -> one space, as clean_text does
+_WS_RUN = re.compile(r"[ \t\u00A0]{2,}|\t")
+
+
+def open_docx_source(source):
+    """
+    What zipfile and python-docx can open: a path or binary file is passed
+    through (files are rewound), bytes-like uploads are wrapped in BytesIO.
+    BytesIO shares a bytes object's buffer, so nothing is copied for bytes.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def source_name(source) -> str:
+    """A path, a file's name, or a placeholder for in-memory uploads, for log messages."""
+    if isinstance(source, str):
+        return source
+    return getattr(source, "name", None) or "<in-memory .docx>"
+
+
+def extract_text_from_docx(file_path, mode: str = "stream", line_map: list = None) -> str:
     """Args:
-        file_path (str): Path to the .docx file
+        file_path: Path to the .docx file, or its contents as bytes,
+            memoryview or a binary file object (nothing touches the disk)
+        mode (str): "stream" (default) reads the OOXML parts directly and
+            includes tables, headers and footers; "python-docx" builds the full
+            Document model and reads body paragraphs only. "stream" falls back
+            to "python-docx" if the package can't be read directly.
+        line_map (list): If given, filled with (text offset, paragraph index)
+            per line, see clean_paragraphs. Stays empty for "python-docx".
 
     Returns:
         str: Cleaned text content"""
+    if mode == "stream":
+        try:
+            return clean_paragraphs(iter_docx_paragraphs(open_docx_source(file_path)), line_map)
+        except (zipfile.BadZipFile, KeyError, ET.ParseError, OSError) as e:
+            if line_map is not None:
+                del line_map[:]
+            print(f"[parser.py] Streaming read failed for {source_name(file_path)} ({e}); using python-docx")
+
     try:
-        doc = Document(file_path)
+        doc = Document(open_docx_source(file_path))
 
         paragraphs: List[str] = []
         for p in doc.paragraphs:
@@ -26,10 +77,107 @@ def extract_text_from_docx(file_path: str) -> str:
         return clean_text(raw_text)
 
     except Exception as e:
-        print(f"[parser.py] Error reading {file_path}: {e}")
+        print(f"[parser.py] Error reading {source_name(file_path)}: {e}")
         return ""
 
 
+def iter_docx_paragraphs(file_path: str, include_headers: bool = True) -> Iterator[str]:
+    """
+    Yield paragraph texts straight from the .docx zip without building a
+    document model: body paragraphs and table cells in document order, then
+    header and footer paragraphs (each distinct text once).
+
+    Args:
+        file_path (str): Path to the .docx file (or a binary file object)
+        include_headers (bool): Also read word/header*.xml and word/footer*.xml
+
+    Yields:
+        str: Raw paragraph text (tabs and line breaks kept as \\t / \\n)
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        parts = ["word/document.xml"]
+        if include_headers:
+            parts += sorted(n for n in zf.namelist() if _HEADER_FOOTER_PART.match(n))
+
+        seen_extra = set()
+        for part in parts:
+            with zf.open(part) as fh:
+                for text in _iter_part_paragraphs(fh):
+                    if part != "word/document.xml":
+                        # first/even/default headers often repeat the same text
+                        if text in seen_extra:
+                            continue
+                        seen_extra.add(text)
+                    yield text
+
+
+def _iter_part_paragraphs(fh) -> Iterator[str]:
+    """iterparse one WordprocessingML part, yielding each w:p's text."""
+    stack: List[List[str]] = []  # text pieces of open (possibly nested) paragraphs
+    parent = None
+    for event, elem in ET.iterparse(fh, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _W_P:
+                stack.append([])
+            elif tag == _W_BODY or parent is None:
+                parent = elem  # children of body (or the hdr/ftr root) get freed
+            continue
+
+        if tag == _W_P:
+            pieces = stack.pop()
+            yield "".join(pieces)
+        elif stack:
+            if tag == _W_T:
+                stack[-1].append(elem.text or "")
+            elif tag == _W_TAB:
+                stack[-1].append("\t")
+            elif tag in (_W_BR, _W_CR):
+                stack[-1].append("\n")
+
+        if not stack and parent is not None and elem is not parent and len(parent):
+            # a top-level block finished; drop it so memory stays flat
+            parent.clear()
+
+
+def clean_paragraphs(paragraphs, line_map: list = None) -> str:
+    """
+    Single-pass equivalent of _ensure_section_line_breaks + clean_text over
+    an iterable of raw paragraph texts.
+
+    Args:
+        paragraphs: raw paragraph texts, as from iter_docx_paragraphs
+        line_map (list): If given, one (offset, paragraph index) is appended
+            per non-blank output line: where the line starts in the returned
+            text and which input paragraph it came from
+    """
+    out: List[str] = []
+    pos = 0  # length of "\n".join(out) + "\n", i.e. where the next line starts
+    for index, para in enumerate(paragraphs):
+        para = para.strip()
+        if not para:
+            continue
+        for line in para.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+            line = _WS_RUN.sub(" ", line).strip()
+            if not line:
+                # keep at most one blank line in a row
+                if out and out[-1]:
+                    out.append("")
+                    pos += 1
+                continue
+            if _section_header_level(line) and out and out[-1]:
+                out.append("")  # blank line before section headers
+                pos += 1
+            if line_map is not None:
+                line_map.append((pos, index))
+            out.append(line)
+            pos += len(line) + 1
+
+    while out and not out[-1]:
+        out.pop()
+    return "\n".join(out)
+
+
 def clean_text(text: str) -> str:
     """
     Args:
@@ -57,11 +205,36 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
+_SECTION_PATTERN = re.compile(r'^\d+\.\s+[A-Z]')
+_NUMBERED_ONLY = re.compile(r'^\d+\.$')
+# "2.3 Quorum", "4.1.2 (a) The Board", "2.1 ADGM Filings": the title is a
+# capitalised word, "(" or an acronym followed by one, so amounts such as
+# "2.5 per cent of the shares" or "12.50 AED fee" stay body text
+_SUBCLAUSE_PATTERN = re.compile(r'^(\d+(?:\.\d+)+)\.?\s+(?:\(|[A-Z](?:[a-z]|\s|$)|[A-Z]+(?:\s+[A-Z(]|$))')
+
+
+def _section_header_level(line: str) -> int:
+    """
+    Heading level of a stripped line, 0 if it is not a section header.
+    Numbered titles ("1. Objects", "2.3 Quorum") use their numbering depth,
+    ALL-CAPS lines are level 1 and colon-terminated lines level 2.
+    """
+    if not line:
+        return 0
+    sub = _SUBCLAUSE_PATTERN.match(line)
+    if sub:
+        return sub.group(1).count(".") + 1
+    if _SECTION_PATTERN.match(line) or _NUMBERED_ONLY.match(line):
+        return 1
+    if line.isupper() and len(line) > 1 and any(c.isalpha() for c in line):
+        return 1
+    if line.endswith(":"):
+        return 2
+    return 0
+
+
 def _ensure_section_line_breaks(text: str) -> str:
 
-    section_pattern = re.compile(r'^\d+\.\s+[A-Z]') 
-    numbered_only = re.compile(r'^\d+\.$')  
-    
     lines = text.split('\n')
     out_lines = []
     
@@ -70,12 +243,8 @@ def _ensure_section_line_breaks(text: str) -> str:
         if not l:
             out_lines.append(line)
             continue
-            
-        is_upper = (l.isupper() and len(l) > 1 and any(c.isalpha() for c in l))
-        ends_colon = l.endswith(":")
-        is_numbered_title = bool(section_pattern.match(l)) or bool(numbered_only.match(l))
 
-        if is_upper or ends_colon or is_numbered_title:
+        if _section_header_level(l):
             # Ensure it is separated clearly; add line breaks before section headers
             if i > 0 and out_lines and out_lines[-1].strip():
                 out_lines.append("")  # Add blank line before section
@@ -84,3 +253,46 @@ def _ensure_section_line_breaks(text: str) -> str:
             out_lines.append(line)
 
     return "\n".join(out_lines)
+
+
+def build_section_index(text: str) -> List[dict]:
+    """
+    Light section/clause index over already-cleaned text, in one pass.
+
+    Args:
+        text (str): Text as returned by extract_text_from_docx
+
+    Returns:
+        List[dict]: One entry per section with heading, level, start and end
+        character offsets into text. Sections are flat and contiguous: each
+        ends where the next heading starts. Text before the first heading is
+        a level-0 section with an empty heading.
+    """
+    sections: List[dict] = []
+    offset = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        level = _section_header_level(stripped)
+        if level:
+            if not sections and offset > 0:
+                sections.append({"heading": "", "level": 0, "start": 0})
+            sections.append({"heading": stripped, "level": level, "start": offset})
+        offset += len(line) + 1
+
+    if not sections and text:
+        sections.append({"heading": "", "level": 0, "start": 0})
+
+    for current, following in zip(sections, sections[1:] + [None]):
+        current["end"] = following["start"] if following else len(text)
+    return sections
+
+
+def extract_text_with_sections(file_path, line_map: list = None) -> tuple:
+    """
+    Extract cleaned text and its section index in one call: (text, sections).
+    file_path may also be the document's bytes, as for extract_text_from_docx.
+    Pass a list as line_map to also get each line's source paragraph (see
+    clean_paragraphs), e.g. for commenter.comment_on_docx.
+    """
+    text = extract_text_from_docx(file_path, line_map=line_map)
+    return text, build_section_index(text)
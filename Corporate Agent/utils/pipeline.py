@@ -0,0 +1,265 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+
+from utils.parser import extract_text_with_sections
+from utils.type_detector import classify_documents, get_default_classifier
+from utils.redflags import detect_red_flags, get_default_rules
+from utils.commenter import comment_docx_bytes, comment_on_docx
+from utils.metrics import get_metrics
+from utils.review_cache import content_key, get_review_cache
+
+# Bump when a stage's output changes so cached reviews are not reused
+PIPELINE_VERSION = "4"
+
+# Reviews in flight per pool worker: enough to keep the pool busy while
+# results are yielded in input order, without submitting every file up front
+WINDOW_PER_WORKER = 4
+
+
+def review_document(path: str, data: bytes = None) -> dict:
+    """
+    Run the per-document stages (extract -> detect type -> red flags -> comment)
+    on one .docx file. Never raises: failures are reported in the "error" field.
+
+    Args:
+        path (str): Path to the .docx file, or just its name when data is given
+        data (bytes): The document's contents; it is then reviewed in
+            memory, nothing is read from or written to disk, path and
+            updated_path are None and reviewed_bytes holds the result
+
+    Returns:
+        dict: filename, path, type, type_scores (top [type, confidence]
+        pairs), flags, updated_path, reviewed_bytes (in-memory reviews),
+        content, sections, error, timings (seconds per stage), bytes (file
+        size) and paragraphs (non-blank paragraphs read)
+    """
+    in_memory = data is not None
+    result = {
+        "filename": os.path.basename(path),
+        "path": None if in_memory else path,
+        "type": "Unknown",
+        "type_scores": [],
+        "flags": [],
+        "updated_path": None if in_memory else path,
+        "reviewed_bytes": data,
+        "content": "",
+        "sections": [],
+        "error": None,
+        "timings": {},
+        "bytes": 0,
+        "paragraphs": 0,
+    }
+    timings = result["timings"]
+    try:
+        start = time.perf_counter()
+        result["bytes"] = len(data) if in_memory else os.path.getsize(path)
+        line_map = []  # lets the commenter anchor flags without re-reading the file
+        text, sections = extract_text_with_sections(data if in_memory else path, line_map=line_map)
+        timings["extract"] = time.perf_counter() - start
+        result["paragraphs"] = len({index for _, index in line_map})
+        result["content"] = text or ""
+        result["sections"] = sections
+
+        start = time.perf_counter()
+        ranked = classify_documents([text or ""], [result["filename"]])[0]
+        result["type"] = ranked[0][0]
+        result["type_scores"] = [[name, round(conf, 4)] for name, conf in ranked[:3]]
+        timings["detect_type"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result["flags"] = detect_red_flags(text, result["type"], sections=sections) or []
+        timings["red_flags"] = time.perf_counter() - start
+    except Exception as e:
+        result["error"] = f"Failed to review {result['filename']}: {e}"
+        return result
+
+    try:
+        start = time.perf_counter()
+        if in_memory:
+            result["reviewed_bytes"] = comment_docx_bytes(data, result["flags"], line_map=line_map)
+        else:
+            result["updated_path"] = comment_on_docx(path, result["flags"], line_map=line_map)
+        timings["comment"] = time.perf_counter() - start
+    except Exception as e:
+        result["error"] = f"Failed to add comments to {result['filename']}: {e}"
+
+    return result
+
+
+def record_review(result: dict, metrics=None):
+    """Add one review_document() result to the metrics and the structured log."""
+    metrics = metrics or get_metrics()
+    metrics.observe_timings(result["timings"])
+    metrics.inc("documents_total", status="error" if result["error"] else "ok")
+    metrics.inc("document_bytes_total", result.get("bytes", 0))
+    metrics.inc("paragraphs_total", result.get("paragraphs", 0))
+    metrics.inc("red_flags_total", len(result["flags"]))
+    metrics.log("review", filename=result["filename"], type=result["type"], bytes=result.get("bytes", 0),
+                paragraphs=result.get("paragraphs", 0), flags=len(result["flags"]),
+                timings={k: round(v, 5) for k, v in result["timings"].items()}, error=result["error"])
+
+
+def iter_review(paths: list, workers: int = None, executor: str = "process", pool=None, data: list = None):
+    """
+    Generator form of review_batch: yields review_document() results in input
+    order as soon as each one (and everything before it) is finished. At most
+    WINDOW_PER_WORKER reviews per worker are in flight, so memory stays flat
+    however many paths there are. Each result is recorded with
+    record_review() here, in the calling process.
+    """
+    for result in _iter_review(paths, workers, executor, pool, data):
+        record_review(result)
+        yield result
+
+
+def _iter_review(paths: list, workers: int = None, executor: str = "process", pool=None, data: list = None):
+    paths = list(paths)
+    if not paths:
+        return
+    data = list(data) if data is not None else [None] * len(paths)
+
+    if pool is None:
+        if workers is None:
+            workers = min(len(paths), os.cpu_count() or 1)
+        workers = max(1, min(workers, len(paths)))
+
+        if workers == 1:
+            for p, d in zip(paths, data):
+                yield review_document(p, d)
+            return
+
+    pool_cls = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    window = WINDOW_PER_WORKER * (workers or os.cpu_count() or 1)
+    items = zip(paths, data)
+    submitted, futures = deque(), deque()  # (path, data) not yet yielded, and their futures
+    try:
+        # a caller's long-lived pool is used as is and left open
+        with nullcontext(pool) if pool is not None else pool_cls(max_workers=workers) as pool:
+            for item in items:
+                submitted.append(item)
+                futures.append(pool.submit(review_document, *item))
+                if len(futures) >= window:
+                    yield futures.popleft().result()
+                    submitted.popleft()
+            while futures:
+                yield futures.popleft().result()
+                submitted.popleft()
+    except BrokenProcessPool as e:
+        # e.g. a worker was killed; finish the remaining files serially
+        print(f"[pipeline.py] Process pool failed ({e}); reviewing serially")
+        for p, d in list(submitted) + list(items):
+            yield review_document(p, d)
+
+
+def review_batch(paths: list, workers: int = None, executor: str = "process", pool=None,
+                 data: list = None) -> list:
+    """
+    Review many .docx files concurrently.
+
+    Args:
+        paths (list): Paths to .docx files
+        workers (int): Pool size; defaults to min(len(paths), CPU count).
+            1 runs serially in the calling process.
+        executor (str): "process" (default, parsing is CPU bound) or "thread"
+        pool (Executor): A long-lived pool to run in instead of a new one
+            (workers and executor are then ignored)
+        data (list): The documents' bytes, one per path, to review them in
+            memory (paths then only name them), see review_document
+
+    Returns:
+        list: One review_document() result per path, in input order
+    """
+    return list(iter_review(paths, workers=workers, executor=executor, pool=pool, data=data))
+
+
+def cache_version() -> str:
+    """Version salt for the review cache: pipeline + red-flag rules + document types."""
+    return (f"pipeline={PIPELINE_VERSION};rules={get_default_rules().version};"
+            f"types={get_default_classifier().version}")
+
+
+def review_uploads(files: list, temp_dir: str = None, workers: int = None, cache=None, pool=None) -> list:
+    """
+    Review uploaded files, reusing cached results for content seen before.
+
+    Cache misses are reviewed in memory (see review_document's data) unless
+    temp_dir is given, in which case they are written to a fresh directory
+    under it, reviewed from disk and the directory is removed afterwards.
+
+    Args:
+        files (list): (filename, bytes) pairs
+        temp_dir (str): Review cache misses from files under this directory
+            instead of in memory
+        workers (int): Pool size for the misses, see review_batch
+        cache (ReviewCache): Defaults to the process-wide cache
+        pool (Executor): Long-lived pool for the misses, see review_batch
+
+    Returns:
+        list: review_document()-style dicts in input order, plus cache_key
+        (the review cache key), sha256 (of the uploaded bytes),
+        reviewed_bytes (the original bytes when nothing was annotated) and
+        cached (bool)
+    """
+    cache = cache or get_review_cache()
+    version = cache_version()
+
+    results = [None] * len(files)
+    misses = []
+    for i, (filename, data) in enumerate(files):
+        data = bytes(data)
+        # The filename is evidence for the document type, so it is part of the key
+        key = content_key(data, f"{version};filename={filename}")
+        entry = cache.get(key)
+        get_metrics().inc("cache_lookups_total", cache="review", result="miss" if entry is None else "hit")
+        if entry is not None:
+            results[i] = dict(entry, filename=filename, cached=True)
+        else:
+            misses.append((i, filename, data, key))
+
+    if misses:
+        if temp_dir is None:
+            reviewed = review_batch([filename for _, filename, _, _ in misses], workers=workers, pool=pool,
+                                    data=[data for _, _, data, _ in misses])
+        else:
+            reviewed = _review_from_disk(misses, temp_dir, workers, pool)
+
+        for (i, filename, data, key), result in zip(misses, reviewed):
+            result.update(cache_key=key, sha256=hashlib.sha256(data).hexdigest(),
+                          reviewed_bytes=result.get("reviewed_bytes") or data, cached=False)
+            if not result["error"]:
+                cache.put(key, {k: v for k, v in result.items() if k != "cached"})
+            results[i] = result
+
+    return results
+
+
+def _review_from_disk(misses: list, temp_dir: str, workers: int, pool) -> list:
+    os.makedirs(temp_dir, exist_ok=True)
+    # A directory per call, so concurrent sessions uploading the same filename don't collide
+    batch_dir = tempfile.mkdtemp(prefix="review-", dir=temp_dir)
+    try:
+        paths = []
+        for n, (_, filename, data, _) in enumerate(misses):
+            # Packs often share filenames; a subdirectory each keeps the basename for type detection
+            os.makedirs(os.path.join(batch_dir, str(n)))
+            path = os.path.join(batch_dir, str(n), os.path.basename(filename))
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+
+        results = review_batch(paths, workers=workers, pool=pool)
+        for result in results:
+            if result["updated_path"] and result["updated_path"] != result["path"]:
+                with open(result["updated_path"], "rb") as f:
+                    result["reviewed_bytes"] = f.read()
+            result.update(path=None, updated_path=None)  # about to be deleted
+        return results
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
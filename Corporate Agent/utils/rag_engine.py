@@ -1,27 +1,117 @@
 import os
-import requests
-import json
-from llama_index.core import StorageContext, load_index_from_storage, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.vector_stores.faiss import FaissVectorStore
+import hashlib
+import time
+import threading
 from dotenv import load_dotenv
 
-load_dotenv()
+from utils.gemini_client import NO_CANDIDATES, get_gemini_client
+from utils.metrics import get_metrics
+
+# llama_index, FAISS, torch and transformers are imported lazily in
+# get_embed_model() / load_rag_index() so that importing this module is cheap
 
-# Disable llama_index internal LLM (avoid OpenAI fallback error)
-Settings.llm = None
+load_dotenv()
 
-# Path to persisted FAISS store
-PERSIST_DIR = r"Corporate Agent/utils/vector_store"
+# Path to persisted FAISS store (resolved relative to this file so any cwd works)
+PERSIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_store")
 EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-# Gemini API key and model info
-API_KEY = os.getenv("GEMINI_API_KEY")
+# Embedding runtime (see utils/embedding_service.py): "torch" (default, the
+# float32 model the index was built with), "torch-int8", "onnx" or
+# "onnx-int8". Check a backend against torch with benchmarks/embedding_bench.py
+# before switching: the stored vectors stay as torch built them.
+EMBED_BACKEND = os.getenv("RAG_EMBED_BACKEND", "torch")
+
+# "llama_index" loads the JSON docstore above; "compact" reads the FAISS file
+# plus a SQLite node table built by compact_cli.py (see utils/compact_store.py)
+STORE_BACKEND = os.getenv("RAG_STORE_BACKEND", "llama_index")
+COMPACT_DIR = os.getenv("RAG_COMPACT_DIR", PERSIST_DIR + "_compact")
+
+# "hybrid" fuses FAISS with a BM25 index over the same nodes (see
+# utils/hybrid_retriever.py); "dense" is FAISS only
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL", "hybrid")
+TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+CANDIDATE_K = int(os.getenv("RAG_CANDIDATE_K", "20"))
+# Optional local cross-encoder, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+RERANKER_MODEL = os.getenv("RAG_RERANKER_MODEL", "")
+# Token budget for the retrieved context in each Gemini prompt (0 = no limit)
+CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "3000"))
+
+# Embedding service and its llama_index wrapper, built on first use
+_embed_lock = threading.Lock()
+_embed_model = None
+_embed_service = None
+_prewarm_thread = None
+
+# Answer cache for repeated questions, built on first use
+_answer_cache = None
+
+# Process-wide index/retriever cache, shared by all Streamlit sessions
+_index_lock = threading.Lock()
+_index_cache = {
+    "index": None,
+    "retriever": None,
+    "signature": None,
+    "load_time": 0.0,
+}
+
+
+def get_embedding_service():
+    """
+    Return the shared EmbeddingService, loading the RAG_EMBED_BACKEND model on
+    the first call only. Cache size and file come from RAG_EMBED_CACHE_SIZE
+    and RAG_EMBED_CACHE_PATH (empty for memory only); micro-batching from
+    RAG_EMBED_MAX_BATCH and RAG_EMBED_MAX_WAIT_MS (0 turns it off).
+    """
+    global _embed_service
+    if _embed_service is not None:
+        return _embed_service
+
+    with _embed_lock:
+        if _embed_service is None:
+            from utils.embedding_service import EmbeddingCache, EmbeddingService, load_backend
 
+            print(f"[RAG] Loading embedding model {EMBED_MODEL_NAME} ({EMBED_BACKEND}) ...")
+            backend = load_backend(EMBED_BACKEND, EMBED_MODEL_NAME, onnx_file=os.getenv("RAG_EMBED_ONNX_FILE") or None)
+            cache_path = os.getenv("RAG_EMBED_CACHE_PATH", os.path.join("outputs", "embedding_cache.sqlite"))
+            _embed_service = EmbeddingService(
+                backend,
+                model_id=f"{EMBED_MODEL_NAME}|{backend.name}",
+                cache=EmbeddingCache(int(os.getenv("RAG_EMBED_CACHE_SIZE", "10000")), path=cache_path or None),
+                max_batch=int(os.getenv("RAG_EMBED_MAX_BATCH", "64")),
+                max_wait=float(os.getenv("RAG_EMBED_MAX_WAIT_MS", "5")) / 1000.0,
+            )
+    return _embed_service
 
-# Configure embeddings
-embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
-Settings.embed_model = embed_model
+
+def embedding_stats():
+    """The embedding service's batch and cache stats, or None before it is loaded."""
+    return _embed_service.stats() if _embed_service is not None else None
+
+
+def get_embed_model():
+    """
+    Return the shared embedding model for llama_index: the embedding service
+    (cache + micro-batching) behind llama_index's embedding interface. Builds
+    it, and imports the llama_index stack, on the first call only.
+    """
+    global _embed_model
+    if _embed_model is not None:
+        return _embed_model
+
+    service = get_embedding_service()
+    with _embed_lock:
+        if _embed_model is None:
+            from llama_index.core import Settings
+            from utils.embedding_service import as_llama_embedding
+
+            # Disable llama_index internal LLM (avoid OpenAI fallback error)
+            Settings.llm = None
+
+            model = as_llama_embedding(service)
+            Settings.embed_model = model
+            _embed_model = model
+    return _embed_model
 
 
 def load_rag_index():
@@ -29,67 +119,337 @@ def load_rag_index():
     if not os.path.exists(PERSIST_DIR):
         raise FileNotFoundError(f"No persisted index found at {PERSIST_DIR}")
 
-    print(f"[RAG] Loading FAISS index from {PERSIST_DIR} ...")
-    vector_store = FaissVectorStore.from_persist_dir(PERSIST_DIR)
-    storage_context = StorageContext.from_defaults(vector_store=vector_store, persist_dir=PERSIST_DIR)
+    get_embed_model()
+    import faiss
+    from llama_index.core import StorageContext, load_index_from_storage
+    from llama_index.vector_stores.faiss import FaissVectorStore
+    from utils.ann_index import configure_for_search, resolve_store_dir
+
+    store_dir = resolve_store_dir(PERSIST_DIR)
+    print(f"[RAG] Loading FAISS index from {store_dir} ...")
+    # Read the index ourselves so IVF/HNSW stores get their nprobe/efSearch
+    faiss_index = faiss.read_index(os.path.join(store_dir, "default__vector_store.json"))
+    vector_store = FaissVectorStore(faiss_index=configure_for_search(faiss_index, store_dir))
+    storage_context = StorageContext.from_defaults(vector_store=vector_store, persist_dir=store_dir)
     return load_index_from_storage(storage_context)
 
 
-def call_gemini_api(prompt: str) -> str:
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-    headers = {
-        'Content-Type': 'application/json',
-        'X-goog-api-key': API_KEY  # Use the API_KEY variable
-    }
-    payload = {
-        "contents": [
-            {
-                "parts": [
-                    {
-                        "text": prompt  # Use the prompt parameter
-                    }
-                ]
-            }
-        ]
-    }
+def _store_signature(persist_dir: str) -> tuple:
+    """Cheap fingerprint of the persisted store's live version: (name, size, mtime) per file."""
+    from utils.ann_index import resolve_store_dir
 
-    response = requests.post(url, headers=headers, data=json.dumps(payload)) # Use json.dumps to send payload as JSON
-    if response.status_code == 200:
-        resp_json = response.json()
-        candidates = resp_json.get("candidates", [])
-        if candidates:
-            # Assuming the output text is in the 'text' field of the first part
-            parts = candidates[0].get("content", {}).get("parts", [])
-            if parts:
-                return parts[0].get("text", "No text output in the first part.")
-            else:
-                return "No parts found in the first candidate."
-        else:
-            return "No candidates generated by Gemini."
-    else:
-        try:
-            error_details = response.json()
-            return f"Error {response.status_code}: {error_details.get('error', {}).get('message', 'Unknown error')}"
-        except json.JSONDecodeError:
-            return f"Error {response.status_code}: Could not decode error response."
+    store_dir = resolve_store_dir(persist_dir)
+    if not os.path.isdir(store_dir):
+        return ()
+    entries = [store_dir]
+    for name in sorted(os.listdir(store_dir)):
+        st = os.stat(os.path.join(store_dir, name))
+        entries.append((name, st.st_size, st.st_mtime_ns))
+    return tuple(entries)
 
 
-def query_rag(question: str) -> str:
-    """Retrieve context from FAISS and generate answer from Gemini."""
+def _make_hybrid(dense_retriever, texts, fetch_nodes, bm25=None):
+    """
+    Wrap a dense retriever with BM25 and RRF: bm25 if given, else a
+    BM25Index built over (node_id, text) pairs.
+    """
+    from utils.hybrid_retriever import BM25Index, CrossEncoderReranker, HybridRetriever
+
+    if bm25 is None:
+        start = time.perf_counter()
+        bm25 = BM25Index(texts)
+        print(f"[RAG] BM25 index over {len(bm25)} nodes built in {time.perf_counter() - start:.2f}s")
+    reranker = CrossEncoderReranker(RERANKER_MODEL) if RERANKER_MODEL else None
+    return HybridRetriever(dense_retriever, bm25, fetch_nodes, similarity_top_k=TOP_K,
+                           candidate_k=CANDIDATE_K, reranker=reranker)
+
+
+def _load_retriever():
+    """Build (index, retriever) for the configured STORE_BACKEND and RETRIEVAL_MODE."""
+    hybrid = RETRIEVAL_MODE == "hybrid"
+    if STORE_BACKEND == "compact":
+        from utils.compact_store import CompactRetriever
+
+        if not os.path.exists(COMPACT_DIR):
+            raise FileNotFoundError(f"No compact store found at {COMPACT_DIR}; run compact_cli.py")
+        print(f"[RAG] Opening compact store at {COMPACT_DIR} ...")
+        store = CompactRetriever(COMPACT_DIR, get_embed_model(),
+                                 similarity_top_k=CANDIDATE_K if hybrid else TOP_K)
+        if not hybrid:
+            return None, store
+        bm25 = store.bm25()
+        if bm25 is None:
+            print("[RAG] Compact store has no BM25 tables; building BM25 in memory "
+                  "(re-run compact_cli.py to persist it)")
+        return None, _make_hybrid(store, store.iter_texts(), store.fetch_by_node_ids, bm25=bm25)
+
     index = load_rag_index()
+    if not hybrid:
+        return index, index.as_retriever(similarity_top_k=TOP_K)
+    nodes = {n.node_id: n for n in index.docstore.get_nodes(list(index.index_struct.nodes_dict.values()))}
+    return index, _make_hybrid(
+        index.as_retriever(similarity_top_k=CANDIDATE_K),
+        ((node_id, node.text) for node_id, node in nodes.items()),
+        lambda node_ids: {i: nodes[i] for i in node_ids if i in nodes},
+    )
 
-    # Retrieve relevant docs (no LLM generation)
-    retriever = index.as_retriever()
-    retrieved_docs = retriever.retrieve(question)
 
-    # Combine retrieved docs text
-    context = "\n\n".join([doc.get_text() for doc in retrieved_docs])
+def get_rag_retriever(force_reload: bool = False):
+    """
+    Return the cached retriever, loading the index only on first use or when
+    the files of the active store have changed since the last load.
+
+    Returns:
+        tuple: (retriever, load_time) where load_time is 0.0 on a cache hit
+    """
+    signature = _store_signature(COMPACT_DIR if STORE_BACKEND == "compact" else PERSIST_DIR)
+    with _index_lock:
+        cached = _index_cache["retriever"]
+        if cached is not None and not force_reload and _index_cache["signature"] == signature:
+            return cached, 0.0
+
+        start = time.perf_counter()
+        index, retriever = _load_retriever()
+        load_time = time.perf_counter() - start
+
+        _index_cache.update({
+            "index": index,
+            "retriever": retriever,
+            "signature": signature,
+            "load_time": load_time,
+        })
+        print(f"[RAG] Index loaded in {load_time:.2f}s")
+        return retriever, load_time
+
+
+def warm_up_rag() -> float:
+    """Load the index into the process cache ahead of the first query."""
+    _, load_time = get_rag_retriever()
+    return load_time
+
+
+def prewarm_rag_async() -> threading.Thread:
+    """
+    Load the embedding model and index on a daemon thread so the first
+    query_rag call doesn't pay for it. Failures are logged, not raised.
+    Only one pre-warm thread is started per process.
+    """
+    global _prewarm_thread
+    if _prewarm_thread is not None:
+        return _prewarm_thread
+
+    def _run():
+        try:
+            warm_up_rag()
+        except Exception as e:
+            print(f"[RAG] Background pre-warm failed: {e}")
+
+    _prewarm_thread = threading.Thread(target=_run, name="rag-prewarm", daemon=True)
+    _prewarm_thread.start()
+    return _prewarm_thread
+
 
-    prompt = (
-        f"Use the following context to answer the question.\n\nContext:\n{context}\n\n"
+def call_gemini_api(prompt: str) -> str:
+    """Answer one prompt through the shared, pooled Gemini client."""
+    return get_gemini_client().generate(prompt)
+
+
+def call_gemini_stream(prompt: str):
+    """Yield the answer to one prompt in pieces as Gemini streams them."""
+    return get_gemini_client().generate_stream(prompt)
+
+
+def call_gemini_batch(prompts: list) -> list:
+    """Answer several prompts concurrently (bounded by GEMINI_MAX_CONCURRENCY)."""
+    return get_gemini_client().generate_batch(prompts)
+
+
+def _assemble_prompt(question: str, retrieved_docs) -> dict:
+    """Prompt plus context stats (tokens, chunks, truncated), context capped at CONTEXT_TOKENS."""
+    from utils.context_budget import assemble_context
+
+    # Combine retrieved docs text, best first, within the token budget;
+    # chunks from the user's uploads are labelled so Gemini can tell them apart
+    texts = [
+        f"[Uploaded document: {doc.node.metadata.get('file_name')}]\n{doc.get_text()}"
+        if doc.node.metadata.get("source") == "upload" else doc.get_text()
+        for doc in retrieved_docs
+    ]
+    assembled = assemble_context(texts, CONTEXT_TOKENS)
+    assembled["prompt"] = (
+        f"Use the following context to answer the question.\n\nContext:\n{assembled.pop('context')}\n\n"
         f"Question:\n{question}\nAnswer:"
     )
+    return assembled
+
+
+def _build_prompt(question: str, retrieved_docs) -> str:
+    return _assemble_prompt(question, retrieved_docs)["prompt"]
+
+
+def get_answer_cache():
+    """
+    Shared AnswerCache. RAG_ANSWER_CACHE_PATH sets the persistence file
+    ("" keeps it in memory only), RAG_CACHE_SIMILARITY the near-duplicate
+    threshold and RAG_CACHE_TTL the entry lifetime in seconds.
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        from utils.answer_cache import AnswerCache
+
+        _answer_cache = AnswerCache(
+            path=os.getenv("RAG_ANSWER_CACHE_PATH", os.path.join("outputs", "rag_answer_cache.sqlite")) or None,
+            threshold=float(os.getenv("RAG_CACHE_SIMILARITY", "0.95")),
+            ttl=float(os.getenv("RAG_CACHE_TTL", str(7 * 24 * 3600))),
+        )
+    return _answer_cache
+
+
+def _merge_session_hits(store_hits: list, session_hits: list) -> list:
+    """Interleave ADGM and upload chunks by reciprocal rank fusion, TOP_K overall."""
+    from utils.hybrid_retriever import reciprocal_rank_fusion
+
+    by_id = {hit.node.node_id: hit for hit in store_hits + session_hits}
+    fused = reciprocal_rank_fusion([
+        [hit.node.node_id for hit in store_hits],
+        [hit.node.node_id for hit in session_hits],
+    ])
+    return [by_id[node_id] for node_id, _ in fused[:TOP_K]]
+
+
+def _record_query(result: dict):
+    """Stage timings, cache outcome and context size of one answered question."""
+    metrics = get_metrics()
+    if result["load_time"]:
+        metrics.observe("rag_load", result["load_time"])
+    metrics.observe("embed", result["embed_time"])
+    metrics.observe("retrieve", result["retrieve_time"])
+    if not result["cache"]:
+        metrics.observe("llm", result["llm_time"])
+    metrics.observe("rag_total", result["total_time"])
+    metrics.inc("cache_lookups_total", cache="answer", result=result["cache"] or "miss")
+    metrics.inc("rag_context_tokens_total", result["context_tokens"])
+    failed = (result["answer"] or "").lstrip().startswith("Error")
+    metrics.inc("rag_queries_total", status="error" if failed else "ok")
+    metrics.log("rag_query", cache=result["cache"], context_tokens=result["context_tokens"],
+                upload_chunks=result["upload_chunks"], error=failed,
+                **{k: round(result[k] or 0.0, 5) for k in ("load_time", "embed_time", "retrieve_time",
+                                                            "llm_time", "first_token_time", "total_time")})
+
+
+def query_rag_with_timings(question: str, use_cache: bool = True, session_index=None,
+                           stream: bool = False) -> dict:
+    """
+    Same as query_rag, but also reports where the time went. With a
+    session_index (utils.session_index.SessionIndex) the user's uploads are
+    searched too and merged with the ADGM results; such answers bypass the
+    shared answer cache, since they depend on one session's documents.
+
+    With stream=True the Gemini call is not made here: result["stream"] is a
+    generator of answer pieces, and answer, llm_time, first_token_time and
+    total_time are filled in once it has been consumed. Cache hits come back
+    complete with stream None.
+
+    Returns:
+        dict: answer, cache ("exact", "semantic" or None), load_time (0.0 when
+        the cached index was reused), embed_time, retrieve_time, llm_time,
+        first_token_time (since the call started) and total_time, all in
+        seconds, context_tokens sent to Gemini (0 on a cache hit),
+        upload_chunks (context chunks from the uploads) and stream
+    """
+    from llama_index.core import QueryBundle
+
+    total_start = time.perf_counter()
+    retriever, load_time = get_rag_retriever()
+
+    # Embed once; the same vector serves retrieval and the semantic cache
+    start = time.perf_counter()
+    embedding = get_embed_model().get_query_embedding(question)
+    embed_time = time.perf_counter() - start
+
+    # Retrieve relevant docs (no LLM generation)
+    start = time.perf_counter()
+    retrieved_docs = retriever.retrieve(QueryBundle(query_str=question, embedding=embedding))
+    session_hits = session_index.retrieve(embedding, TOP_K) if session_index is not None else []
+    if session_hits:
+        retrieved_docs = _merge_session_hits(retrieved_docs, session_hits)
+    retrieve_time = time.perf_counter() - start
+    node_ids = [doc.node.node_id for doc in retrieved_docs]
+
+    result = {
+        "answer": None,
+        "cache": None,
+        "load_time": load_time,
+        "embed_time": embed_time,
+        "retrieve_time": retrieve_time,
+        "llm_time": 0.0,
+        "first_token_time": None,
+        "context_tokens": 0,
+        "upload_chunks": sum(1 for doc in retrieved_docs if doc.node.metadata.get("source") == "upload"),
+        "stream": None,
+    }
+
+    cache = get_answer_cache() if use_cache and not session_hits else None
+    if cache is not None:
+        cache.set_store_version(hashlib.sha256(repr(_index_cache["signature"]).encode()).hexdigest())
+        answer, hit = cache.lookup(question, node_ids, embedding)
+        if hit:
+            elapsed = time.perf_counter() - total_start
+            result.update(answer=answer, cache=hit, first_token_time=elapsed, total_time=elapsed)
+            _record_query(result)
+            return result
+
+    assembled = _assemble_prompt(question, retrieved_docs)
+    result["context_tokens"] = assembled["tokens"]
+
+    if stream:
+        result["stream"] = _stream_answer(result, assembled["prompt"], question, node_ids,
+                                          embedding, cache, total_start)
+        return result
 
     # Call Gemini LLM to generate answer
-    answer = call_gemini_api(prompt)
-    return answer
+    start = time.perf_counter()
+    answer = call_gemini_api(assembled["prompt"])
+    result["llm_time"] = time.perf_counter() - start
+
+    # don't cache failures ("Error 429: ...", timeouts) or blocked answers
+    if cache is not None and not answer.startswith("Error") and answer != NO_CANDIDATES:
+        cache.put(question, node_ids, answer, embedding)
+
+    elapsed = time.perf_counter() - total_start
+    result.update(answer=answer, first_token_time=elapsed, total_time=elapsed)
+    _record_query(result)
+    return result
+
+
+def _stream_answer(result: dict, prompt: str, question: str, node_ids: list, embedding, cache,
+                   total_start: float):
+    """Generator behind query_rag_with_timings(stream=True); completes result when drained."""
+    start = time.perf_counter()
+    pieces, failed = [], False
+    for piece in call_gemini_stream(prompt):
+        if not pieces:
+            result["first_token_time"] = time.perf_counter() - total_start
+        # errors arrive as text, at the start or after a dropped stream
+        failed = failed or piece.lstrip().startswith("Error")
+        pieces.append(piece)
+        yield piece
+
+    answer = "".join(pieces)
+    result["llm_time"] = time.perf_counter() - start
+    if cache is not None and answer and not failed and answer != NO_CANDIDATES:
+        cache.put(question, node_ids, answer, embedding)
+    result.update(answer=answer, total_time=time.perf_counter() - total_start)
+    _record_query(result)
+
+
+def query_rag(question: str) -> str:
+    """Retrieve context from FAISS and generate answer from Gemini."""
+    return query_rag_with_timings(question)["answer"]
+
+
+def query_rag_batch(questions: list) -> list:
+    """Answer several questions: retrieval runs in turn, the Gemini calls concurrently."""
+    retriever, _ = get_rag_retriever()
+    prompts = [_build_prompt(q, retriever.retrieve(q)) for q in questions]
+    return call_gemini_batch(prompts)
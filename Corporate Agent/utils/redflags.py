@@ -1,42 +1,261 @@
+import hashlib
+import json
+import os
 import re
+from bisect import bisect_right
 
-def detect_red_flags(text: str, doc_type: str = "Unknown") -> list:
+from utils.parser import build_section_index
+from utils.term_match import term_key, trie_regex
+
+# Declarative rule set; see load_rules() for the rule fields
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "redflags.json")
+
+_QUOTE_CHARS = 200
+
+
+class RuleSet:
     """
-    Basic heuristics to detect simple 'red flags' in a document.
-    Returns list of dicts with issue/suggestion.
+    Red-flag rules compiled into one combined regex, so a document is scanned
+    once no matter how many rules there are.
+
+    Each rule is a dict with:
+        id, issue, suggestion
+        any        -- trigger terms; at least one must occur (omit = always active)
+        all        -- terms that must all co-occur
+        none       -- negative terms; any occurrence suppresses the flag
+        doc_types  -- only evaluate for these document types (omit = all types)
+        max_length -- only flag documents of at most this many characters
+        scope      -- "document" (default), "section" (a top-level section with
+                      its sub-clauses) or "clause" (each heading on its own).
+                      Scoped rules are checked per section and produce one
+                      flag per offending section.
+    Terms are case-insensitive literal phrases; whitespace inside a phrase
+    matches any run of whitespace.
     """
-    flags = []
-    if not text:
+
+    def __init__(self, rules: list, version: str = ""):
+        self.rules = []
+        self.version = version
+        terms = set()
+
+        for rule in rules:
+            compiled = dict(rule)
+            for field in ("any", "all", "none"):
+                compiled[field] = [term_key(t) for t in rule.get(field, []) if t.strip()]
+                terms.update(compiled[field])
+            compiled["doc_types"] = {d.lower() for d in rule.get("doc_types", [])}
+            compiled["scope"] = rule.get("scope", "document")
+            self.rules.append(compiled)
+        self.needs_sections = any(r["scope"] != "document" for r in self.rules)
+
+        # For every term, the shorter terms that are prefixes of it: the scan
+        # reports the longest term at each position, these are implied by it.
+        self._implied = {
+            t: [t[:i] for i in range(1, len(t)) if t[:i] in terms] for t in terms
+        }
+
+        if terms:
+            # The lookahead makes matches zero-width so overlapping terms
+            # (e.g. "beneficial owner" inside "ultimate beneficial owner") are found.
+            regex = f"(?=({trie_regex(terms)}))"
+            self._pattern = re.compile(regex)
+            self._pattern_ic = re.compile(regex, re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def _occurrences(self, text: str) -> list:
+        """Single pass over text: every (start, end, term) match, in text order."""
+        if self._pattern is None:
+            return []
+
+        # Matching the lowercased text is much faster than re.IGNORECASE, but
+        # only keeps offsets valid when lowercasing doesn't change the length.
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = self._pattern.finditer(lowered)
+        else:
+            matches = self._pattern_ic.finditer(text)
+
+        occurrences = []
+        keys = {}
+        for m in matches:
+            raw = m.group(1)
+            key = keys.get(raw)
+            if key is None:
+                key = keys[raw] = term_key(raw)
+            start, end = m.start(1), m.end(1)
+            occurrences.append((start, end, key))
+            for term in self._implied.get(key, ()):
+                occurrences.append((start, start + len(term), term))
+        return occurrences
+
+    def scan(self, text: str) -> dict:
+        """Single pass over text: {term: (start, end) of its first occurrence}."""
+        return _first_hits(self._occurrences(text))
+
+    def evaluate(self, text: str, doc_type: str = "Unknown", sections: list = None) -> list:
+        """
+        Return flag dicts (issue, suggestion, rule, section, quote, offsets) for
+        text. sections is parser.build_section_index(text); it is built here
+        when a scoped rule needs it and none is passed.
+        """
+        occurrences = self._occurrences(text)
+        hits = _first_hits(occurrences)
+        doc_type_lc = (doc_type or "Unknown").lower()
+        flags = []
+        section_hits = {}
+
+        for rule in self.rules:
+            if rule["doc_types"] and doc_type_lc not in rule["doc_types"]:
+                continue
+            if "max_length" in rule and len(text) > rule["max_length"]:
+                continue
+
+            if rule["scope"] == "document":
+                trigger = _match_rule(rule, hits)
+                if trigger is not False:
+                    flags.append(_make_flag(rule, text, trigger))
+                continue
+
+            # Trigger terms absent from the whole document: no section can match
+            if rule["any"] and not any(t in hits for t in rule["any"]):
+                continue
+
+            if rule["scope"] not in section_hits:
+                if sections is None:
+                    sections = build_section_index(text)
+                section_hits[rule["scope"]] = _hits_by_section(
+                    occurrences, _scope_spans(sections, rule["scope"], len(text))
+                )
+
+            for span, local in section_hits[rule["scope"]]:
+                # A section without matches can only satisfy an absence-only rule
+                if not local and rule["any"]:
+                    continue
+                trigger = _match_rule(rule, local)
+                if trigger is not False:
+                    flags.append(_make_flag(rule, text, trigger, span["heading"]))
+
         return flags
 
-    t = text.lower()
-
-    # example heuristics
-    if "indemnity" in t and "limit" not in t:
-        flags.append({
-            "issue": "Uncapped indemnity clause",
-            "suggestion": "Consider adding a monetary cap to indemnity clauses where appropriate."
-        })
-
-    # check for governing law presence
-    if "governing law" not in t and "governed by" not in t:
-        flags.append({
-            "issue": "Missing governing law clause",
-            "suggestion": "Add a governing law clause specifying the applicable jurisdiction."
-        })
-
-    # check for termination notice period
-    if "termination" in t and not re.search(r'notice\s+period', t):
-        flags.append({
-            "issue": "Termination clause without clear notice period",
-            "suggestion": "Specify notice period and termination conditions."
-        })
-
-    # short doc
-    if len(t) < 200:
-        flags.append({
-            "issue": "Very short document",
-            "suggestion": "Document content seems short; verify completeness."
-        })
-
-    return flags
+
+def _first_hits(occurrences: list) -> dict:
+    hits = {}
+    for start, end, term in occurrences:
+        if term not in hits:
+            hits[term] = (start, end)
+    return hits
+
+
+def _match_rule(rule: dict, hits: dict):
+    """
+    Check a rule against {term: span} hits. Returns False when it doesn't fire,
+    otherwise the span of the triggering match (None for absence-only rules).
+    """
+    if any(t in hits for t in rule["none"]):
+        return False
+    if not all(t in hits for t in rule["all"]):
+        return False
+    if rule["any"]:
+        present = [hits[t] for t in rule["any"] if t in hits]
+        if not present:
+            return False
+        return min(present)
+    if rule["all"]:
+        return min(hits[t] for t in rule["all"])
+    return None
+
+
+def _scope_spans(sections: list, scope: str, text_len: int) -> list:
+    """Section spans for a rule scope: every heading, or top-level sections only."""
+    if not sections:
+        return [{"heading": "", "start": 0, "end": text_len}]
+    if scope == "clause":
+        return sections
+
+    spans = []
+    for sec in sections:
+        if not spans or sec["level"] <= 1:
+            spans.append({"heading": sec["heading"], "start": sec["start"], "end": sec["end"]})
+        else:
+            spans[-1]["end"] = sec["end"]
+    return spans
+
+
+def _hits_by_section(occurrences: list, spans: list) -> list:
+    """[(span, {term: first span in that section})] for every span, in order."""
+    starts = [s["start"] for s in spans]
+    grouped = {}
+    for start, end, term in occurrences:
+        idx = max(0, bisect_right(starts, start) - 1)
+        local = grouped.setdefault(idx, {})
+        if term not in local:
+            local[term] = (start, end)
+    return [(span, grouped.get(i, {})) for i, span in enumerate(spans)]
+
+
+def _make_flag(rule: dict, text: str, span, section: str = None) -> dict:
+    flag = {
+        "issue": rule.get("issue"),
+        "suggestion": rule.get("suggestion"),
+        "rule": rule.get("id"),
+        "section": section,
+        "quote": None,
+        "offsets": None,
+    }
+    if span is not None:
+        # quote the line containing the match, clipped around it
+        line_start = text.rfind("\n", 0, span[0]) + 1
+        line_end = text.find("\n", span[1])
+        line_end = len(text) if line_end == -1 else line_end
+        start = max(line_start, span[0] - _QUOTE_CHARS // 2)
+        end = min(line_end, max(span[1], start + _QUOTE_CHARS))
+        flag["quote"] = text[start:end].strip()
+        flag["offsets"] = [span[0], span[1]]
+    return flag
+
+
+def load_rules(path: str = DEFAULT_RULES_PATH) -> RuleSet:
+    """
+    Load and compile a rule file (.json, or .yaml/.yml when PyYAML is installed).
+
+    Returns:
+        RuleSet: compiled rules; .version is a short hash of the file contents
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    if path.lower().endswith((".yaml", ".yml")):
+        import yaml  # optional dependency, only needed for YAML rule files
+        data = yaml.safe_load(raw)
+    else:
+        data = json.loads(raw.decode("utf-8"))
+
+    rules = data.get("rules", []) if isinstance(data, dict) else data
+    version = hashlib.sha256(raw).hexdigest()[:12]
+    return RuleSet(rules, version=version)
+
+
+_default_rules = None
+
+
+def get_default_rules() -> RuleSet:
+    """The bundled rule set, compiled once per process."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = load_rules(DEFAULT_RULES_PATH)
+    return _default_rules
+
+
+def detect_red_flags(text: str, doc_type: str = "Unknown", rules: RuleSet = None, sections: list = None) -> list:
+    """
+    Detect 'red flags' in a document with a single scan over the text.
+    Returns list of dicts with issue/suggestion, plus the rule id, the section
+    heading for section-scoped rules and the quote/offsets of the matching
+    text where there is one. Pass sections (parser.build_section_index) to
+    reuse an index that was already built.
+    """
+    if not text:
+        return []
+
+    return (rules or get_default_rules()).evaluate(text, doc_type, sections)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def content_key(data: bytes, version: str = "") -> str:
+    """SHA-256 of the uploaded bytes, salted with the rules/pipeline version."""
+    h = hashlib.sha256()
+    h.update(version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+class ReviewCache:
+    """
+    LRU cache of per-document review results keyed by content_key().
+
+    Entries are dicts (text, type, flags, sections, reviewed_bytes, ...).
+    With disk_dir set, entries are also written through to disk so they
+    survive evictions and restarts; a memory miss then checks the disk store.
+    """
+
+    def __init__(self, max_entries: int = 256, disk_dir: str = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._put_memory(key, entry)
+            return entry
+
+    def put(self, key: str, entry: dict):
+        with self._lock:
+            self._put_memory(key, entry)
+        self._write_disk(key, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _put_memory(self, key: str, entry: dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_paths(self, key: str) -> tuple:
+        base = os.path.join(self.disk_dir, key)
+        return base + ".json", base + ".docx"
+
+    def _read_disk(self, key: str):
+        if not self.disk_dir:
+            return None
+        meta_path, docx_path = self._disk_paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.pop("has_reviewed_bytes", False):
+                with open(docx_path, "rb") as f:
+                    entry["reviewed_bytes"] = f.read()
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, entry: dict):
+        if not self.disk_dir:
+            return
+        meta_path, docx_path = self._disk_paths(key)
+        meta = {k: v for k, v in entry.items() if k != "reviewed_bytes"}
+        reviewed = entry.get("reviewed_bytes")
+        meta["has_reviewed_bytes"] = reviewed is not None
+        try:
+            # docx first, metadata last: a readable .json implies a complete entry
+            if reviewed is not None:
+                _atomic_write(docx_path, reviewed)
+            _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            print(f"[review_cache.py] Could not spill {key[:12]} to disk: {e}")
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_review_cache() -> ReviewCache:
+    """
+    Process-wide cache shared by all Streamlit sessions. Size and disk store
+    come from REVIEW_CACHE_SIZE and REVIEW_CACHE_DIR.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ReviewCache(
+                max_entries=int(os.getenv("REVIEW_CACHE_SIZE", "256")),
+                disk_dir=os.getenv("REVIEW_CACHE_DIR") or None,
+            )
+        return _default_cache
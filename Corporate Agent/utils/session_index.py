@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from utils.metrics import get_metrics
+from utils.rag_engine import get_embed_model
+
+# Uploaded contracts are short; smaller chunks than the ADGM store keep
+# answers pointed at the right clause
+UPLOAD_CHUNK_SIZE = int(os.getenv("RAG_UPLOAD_CHUNK_SIZE", "512"))
+UPLOAD_CHUNK_OVERLAP = int(os.getenv("RAG_UPLOAD_CHUNK_OVERLAP", "64"))
+EMBED_BATCH_SIZE = 64
+
+# Per-session cap on chunk texts + vectors, and the process-wide cache of
+# embedded uploads (by content hash) shared by all sessions
+SESSION_MAX_BYTES = int(float(os.getenv("RAG_SESSION_MAX_MB", "64")) * 2**20)
+UPLOAD_CACHE_MAX_BYTES = int(float(os.getenv("RAG_UPLOAD_CACHE_MB", "256")) * 2**20)
+
+_cache_lock = threading.Lock()
+_embedded = OrderedDict()  # sha256 -> (chunks, vectors)
+_embedded_bytes = 0
+
+# Live SessionIndex objects; entries vanish when Streamlit drops a session
+_sessions = weakref.WeakSet()
+
+
+def chunk_text(text: str) -> list:
+    from llama_index.core.node_parser import SentenceSplitter
+
+    splitter = SentenceSplitter(chunk_size=UPLOAD_CHUNK_SIZE, chunk_overlap=UPLOAD_CHUNK_OVERLAP)
+    return [chunk for chunk in splitter.split_text(text or "") if chunk.strip()]
+
+
+def embed_texts(texts: list):
+    """Unit-normalised float32 matrix, embedded EMBED_BATCH_SIZE texts per call."""
+    import numpy as np
+
+    model = get_embed_model()
+    vectors = []
+    for i in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(model.get_text_embedding_batch(texts[i:i + EMBED_BATCH_SIZE]))
+    mat = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+    mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+    return mat
+
+
+def _entry_bytes(chunks: list, vectors) -> int:
+    return vectors.nbytes + sum(len(c) for c in chunks)
+
+
+def _cache_get(sha256: str):
+    with _cache_lock:
+        entry = _embedded.get(sha256)
+        if entry is not None:
+            _embedded.move_to_end(sha256)
+        return entry
+
+
+def _cache_put(sha256: str, chunks: list, vectors):
+    global _embedded_bytes
+    size = _entry_bytes(chunks, vectors)
+    if size > UPLOAD_CACHE_MAX_BYTES:
+        return
+    with _cache_lock:
+        if sha256 in _embedded:
+            return
+        _embedded[sha256] = (chunks, vectors)
+        _embedded_bytes += size
+        while _embedded_bytes > UPLOAD_CACHE_MAX_BYTES:
+            _, (old_chunks, old_vectors) = _embedded.popitem(last=False)
+            _embedded_bytes -= _entry_bytes(old_chunks, old_vectors)
+
+
+def embed_documents(documents: list) -> dict:
+    """
+    Chunk and embed uploads not embedded before, all of them in one batched
+    pass; known content hashes come from the shared cache.
+
+    Args:
+        documents: (sha256, text) pairs
+
+    Returns:
+        dict: {sha256: (chunks, vectors)} plus "_stats" (cached, embedded
+        chunks, embed_time)
+    """
+    result, pending = {}, []
+    for sha256, text in documents:
+        cached = _cache_get(sha256)
+        if cached is not None:
+            result[sha256] = cached
+        else:
+            pending.append((sha256, chunk_text(text)))
+
+    start = time.perf_counter()
+    texts = [chunk for _, chunks in pending for chunk in chunks]
+    vectors = embed_texts(texts) if texts else None
+    offset = 0
+    for sha256, chunks in pending:
+        # copy, so evicting one upload frees its rows, not a view of the batch
+        doc_vectors = vectors[offset:offset + len(chunks)].copy() if chunks else None
+        offset += len(chunks)
+        if chunks:
+            _cache_put(sha256, chunks, doc_vectors)
+            result[sha256] = (chunks, doc_vectors)
+
+    result["_stats"] = {
+        "cached": len(documents) - len(pending),
+        "embedded_chunks": len(texts),
+        "embed_time": time.perf_counter() - start if texts else 0.0,
+    }
+    metrics = get_metrics()
+    metrics.inc("cache_lookups_total", result["_stats"]["cached"], cache="upload_embeddings", result="hit")
+    metrics.inc("cache_lookups_total", len(pending), cache="upload_embeddings", result="miss")
+    if texts:
+        metrics.observe("embed_uploads", result["_stats"]["embed_time"])
+        metrics.inc("embedded_chunks_total", len(texts))
+    return result
+
+
+class SessionIndex:
+    """
+    In-memory vector index over one Streamlit session's uploads. Keep it in
+    st.session_state so it is dropped with the session; sync() it with the
+    current uploads before querying. Bounded by max_bytes: the oldest
+    uploads are evicted first, and a single oversized upload keeps only its
+    leading chunks.
+    """
+
+    def __init__(self, max_bytes: int = SESSION_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._docs = OrderedDict()  # sha256 -> {"name", "chunks", "vectors", "bytes"}
+        self._matrix = None  # (node ids, names, texts, vectors) across docs
+        self._dropped = set()  # evicted by the cap; not re-added while still uploaded
+        self._lock = threading.Lock()
+        self.evicted = 0
+        _sessions.add(self)
+
+    def __len__(self):
+        return sum(len(d["chunks"]) for d in self._docs.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(d["bytes"] for d in self._docs.values())
+
+    def sync(self, documents: list) -> dict:
+        """
+        Make the index hold exactly these uploads, embedding only new ones.
+
+        Args:
+            documents: (sha256, filename, text) for every current upload
+
+        Returns:
+            dict: added, removed, cached, embedded_chunks, embed_time, chunks,
+            bytes and evicted
+        """
+        wanted = {sha256: (name, text) for sha256, name, text in documents if text}
+        with self._lock:
+            removed = [sha256 for sha256 in self._docs if sha256 not in wanted]
+            for sha256 in removed:
+                del self._docs[sha256]
+            self._dropped &= set(wanted)
+
+            new = [
+                (sha256, text) for sha256, (_, text) in wanted.items()
+                if sha256 not in self._docs and sha256 not in self._dropped
+            ]
+            embedded = embed_documents(new)
+            stats = embedded.pop("_stats")
+            for sha256, (chunks, vectors) in embedded.items():
+                self._add(sha256, wanted[sha256][0], chunks, vectors)
+
+            if new or removed:
+                self._matrix = None
+            added = sum(1 for sha256 in embedded if sha256 in self._docs)
+            stats.update(added=added, removed=len(removed), chunks=len(self),
+                         bytes=self.nbytes, evicted=self.evicted)
+            return stats
+
+    def _add(self, sha256: str, name: str, chunks: list, vectors):
+        total = len(chunks)
+        size = _entry_bytes(chunks, vectors)
+        while chunks and size > self.max_bytes:
+            chunks, vectors = chunks[:-1], vectors[:-1]
+            size = _entry_bytes(chunks, vectors)
+        if not chunks:
+            self._dropped.add(sha256)
+            self.evicted += 1
+            print(f"[session_index.py] {name} does not fit the session cap; not indexed")
+            return
+        if len(chunks) < total:
+            print(f"[session_index.py] {name} exceeds the session cap; indexing its first {len(chunks)} chunks")
+
+        while self._docs and self.nbytes + size > self.max_bytes:
+            old_sha, old = self._docs.popitem(last=False)
+            self._dropped.add(old_sha)
+            self.evicted += 1
+            print(f"[session_index.py] Session cap reached; dropped {old['name']} from the Q&A index")
+        self._docs[sha256] = {"name": name, "chunks": chunks, "vectors": vectors, "bytes": size}
+
+    def _build_matrix(self):
+        import numpy as np
+
+        ids, names, texts, mats = [], [], [], []
+        for sha256, doc in self._docs.items():
+            for i, chunk in enumerate(doc["chunks"]):
+                ids.append(f"upload-{sha256[:16]}-{i}")
+                names.append(doc["name"])
+                texts.append(chunk)
+            mats.append(doc["vectors"])
+        return ids, names, texts, np.concatenate(mats) if mats else None
+
+    def retrieve(self, embedding, top_k: int = 4) -> list:
+        """
+        Top-k upload chunks by cosine similarity to a query embedding.
+
+        Returns:
+            list: llama_index NodeWithScore, metadata source="upload"
+        """
+        import numpy as np
+        from llama_index.core.schema import NodeWithScore, TextNode
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = self._build_matrix()
+            ids, names, texts, mat = self._matrix
+        if mat is None:
+            return []
+
+        q = np.asarray(embedding, dtype=np.float32)
+        q /= np.linalg.norm(q) + 1e-12
+        scores = mat @ q
+        k = min(top_k, len(ids))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            NodeWithScore(
+                node=TextNode(id_=ids[i], text=texts[i], metadata={"file_name": names[i], "source": "upload"}),
+                score=float(scores[i]),
+            )
+            for i in best
+        ]
+
+
+def session_stats() -> dict:
+    """Memory held by live session indexes and the shared upload cache."""
+    sessions = list(_sessions)
+    with _cache_lock:
+        cached_docs, cached_bytes = len(_embedded), _embedded_bytes
+    return {
+        "sessions": len(sessions),
+        "session_bytes": sum(s.nbytes for s in sessions),
+        "cached_docs": cached_docs,
+        "cached_bytes": cached_bytes,
+    }
@@ -1,7 +1,47 @@
 import json
 import os
+import threading
+import time
+import uuid
 from datetime import datetime
 
+from utils.metrics import get_metrics
+
+
+def build_summary(doc_type, checklist_result, red_flags) -> dict:
+    """
+    The structured review summary of one document, in memory.
+
+    Args:
+        doc_type (str): Detected document type
+        checklist_result (dict): Output from checklist.py
+        red_flags (list): Output from redflags.py
+
+    Returns:
+        dict: document_type, checklist_status, missing_documents,
+        num_red_flags and red_flags (issue, suggestion, quote)
+    """
+    return {
+        "document_type": doc_type,
+        "checklist_status": checklist_result.get("status", "unknown"),
+        "missing_documents": checklist_result.get("missing_docs", []),
+        "num_red_flags": len(red_flags),
+        "red_flags": [
+            {
+                "issue": flag.get("issue"),
+                "suggestion": flag.get("suggestion"),
+                "quote": flag.get("quote")
+            }
+            for flag in red_flags
+        ]
+    }
+
+
+def summary_bytes(summary: dict) -> bytes:
+    """A summary as pretty-printed UTF-8 JSON, e.g. for a download button; no file is written."""
+    return json.dumps(summary, ensure_ascii=False, indent=4).encode("utf-8")
+
+
 def generate_summary_json(filename, doc_type, checklist_result, red_flags, save_path="outputs", content="")-> str:
     """
     Generates a structured summary JSON of the review result.
@@ -16,31 +56,184 @@ def generate_summary_json(filename, doc_type, checklist_result, red_flags, save_
     Returns:
         str: Path to the saved summary JSON file
     """
+    summary = build_summary(doc_type, checklist_result, red_flags)
+    output_file = write_summary_file(summary, filename, save_path)
+    print(f"[summarizer.py] Summary saved to {output_file}")
+    return output_file
 
-    summary = {
-        "document_type": doc_type,
-        "checklist_status": checklist_result.get("status", "unknown"),
-        "missing_documents": checklist_result.get("missing_docs", []),
-        "num_red_flags": len(red_flags),
-        "red_flags": []
-    }
 
-    for flag in red_flags:
-        summary["red_flags"].append({
-            "issue": flag.get("issue"),
-            "suggestion": flag.get("suggestion"),
-            "quote": flag.get("quote")
-        })
+def summary_filename(filename: str) -> str:
+    safe_name = filename.lower().replace(' ', '_').replace('.docx', '')
+    return f"{safe_name}_review_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
 
+
+def write_summary_file(summary: dict, filename: str, save_path: str = "outputs") -> str:
+    """
+    Write one summary as its own pretty-printed JSON file. Two summaries of
+    the same document within a second get _2, _3, ... instead of
+    overwriting each other.
+    """
     # Ensure output directory exists
     os.makedirs(save_path, exist_ok=True)
 
-    safe_name = filename.lower().replace(' ', '_').replace('.docx', '')
-    output_filename = f"{safe_name}_review_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    output_file = os.path.join(save_path, output_filename)
+    base, ext = os.path.splitext(os.path.join(save_path, summary_filename(filename)))
+    output_file, n = base + ext, 1
+    while True:
+        try:
+            with open(output_file, "x") as f:
+                json.dump(summary, f, indent=4)
+            return output_file
+        except FileExistsError:
+            n += 1
+            output_file = f"{base}_{n}{ext}"
 
-    with open(output_file, "w") as f:
-        json.dump(summary, f, indent=4)
 
-    print(f"[summarizer.py] Summary saved to {output_file}")
-    return output_file
+def new_run_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+class SummarySink:
+    """
+    Collects the summaries of one review run. add() returns each summary as
+    a dict; the sink also appends them to a single JSONL run file
+    (summaries_<run_id>.jsonl), buffered and written a batch of whole lines
+    at a time, so an interrupted run leaves at most one torn last line (see
+    read_run). close() appends a "run" record with per-stage timings and,
+    if asked, converts the run file to Parquet (needs pyarrow). The old
+    one-JSON-file-per-document output is still available with per_file.
+    """
+
+    def __init__(self, save_path: str = "outputs", run_id: str = None, jsonl: bool = True,
+                 per_file: bool = False, parquet: bool = False, buffer_size: int = 256):
+        """
+        Args:
+            save_path: folder for the run file (and per-file summaries)
+            run_id: defaults to a timestamp plus a random suffix
+            jsonl: write the JSONL run file (False keeps summaries in memory only)
+            per_file: also write generate_summary_json-style files
+            parquet: on close(), also write summaries_<run_id>.parquet
+            buffer_size: records held before they are appended to the file
+        """
+        if parquet:
+            import pyarrow  # noqa: F401  optional dependency, only needed for Parquet output
+
+        self.run_id = run_id or new_run_id()
+        self.save_path = save_path
+        self.per_file = per_file
+        self.parquet = parquet and jsonl
+        self.buffer_size = max(1, buffer_size)
+        self.path = os.path.join(save_path, f"summaries_{self.run_id}.jsonl") if jsonl else None
+        self.documents = 0
+        self.stage_times = {}
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._closed = False
+        if self.path or per_file:
+            os.makedirs(save_path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, filename, doc_type, checklist_result, red_flags, timings: dict = None,
+            extra: dict = None) -> dict:
+        """
+        Build a document's summary and queue it for the run file.
+
+        Args:
+            timings: per-stage seconds for this document, stored with it and
+                added to the run totals
+            extra: more fields for the JSONL record (pack, path, ...)
+
+        Returns:
+            dict: the build_summary() dict, plus summary_path when per_file
+        """
+        start = time.perf_counter()
+        summary = build_summary(doc_type, checklist_result, red_flags)
+        if self.per_file:
+            summary["summary_path"] = write_summary_file(summary, filename, self.save_path)
+        timings = dict(timings or {})
+        timings["summarize"] = time.perf_counter() - start
+        get_metrics().observe("summarize", timings["summarize"])
+
+        record = {"record": "summary", "run_id": self.run_id, "filename": filename}
+        record.update(extra or {})
+        record.update(summary)
+        record["timings"] = timings
+
+        with self._lock:
+            self.documents += 1
+            for stage, seconds in timings.items():
+                self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+            if self.path:
+                self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+                if len(self._buffer) >= self.buffer_size:
+                    self._flush_locked()
+        return summary
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = "".join(self._buffer).encode("utf-8")
+        self._buffer = []
+        # one write of whole lines per batch
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def close(self) -> dict:
+        """
+        Flush, append the run record and write Parquet if enabled.
+
+        Returns:
+            dict: the run record (run_id, documents, stage_seconds, wall_seconds)
+        """
+        with self._lock:
+            run = {
+                "record": "run",
+                "run_id": self.run_id,
+                "documents": self.documents,
+                "stage_seconds": dict(self.stage_times),
+                "wall_seconds": time.perf_counter() - self._started,
+            }
+            if self._closed:
+                return run
+            self._closed = True
+            if self.path:
+                self._buffer.append(json.dumps(run, ensure_ascii=False) + "\n")
+                self._flush_locked()
+        if self.parquet:
+            self._write_parquet()
+        return run
+
+    def _write_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = [r for r in read_run(self.path) if r.get("record") == "summary"]
+        for row in rows:
+            # nested lists of mixed dicts: keep them as JSON text columns
+            for key in ("red_flags", "missing_documents", "timings"):
+                row[key] = json.dumps(row.get(key), ensure_ascii=False)
+        target = self.path[:-len(".jsonl")] + ".parquet"
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        pq.write_table(pa.Table.from_pylist(rows), tmp_path)
+        os.replace(tmp_path, target)
+
+
+def read_run(path: str) -> list:
+    """Records of a JSONL run file; a torn last line from an interrupted run is skipped."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
@@ -0,0 +1,38 @@
+import re
+
+# Literal-phrase matching shared by redflags, type_detector and checklist
+
+
+def term_key(term: str) -> str:
+    """Canonical form of a term / matched text: lowercase, single spaces."""
+    return " ".join(term.lower().split())
+
+
+def trie_regex(terms) -> str:
+    """
+    Build a prefix-factored alternation for terms, e.g. {"limit", "limited"}
+    -> "limit(?:ed)?". The regex engine then follows one branch per character
+    instead of trying every term at every position. Optional suffixes are
+    greedy, so the longest term at a position wins.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end-of-term marker
+
+    def build(node) -> str:
+        terminal = "" in node
+        branches = []
+        for ch in sorted(k for k in node if k):
+            piece = r"\s+" if ch == " " else re.escape(ch)
+            branches.append(piece + build(node[ch]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
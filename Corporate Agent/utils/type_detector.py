@@ -1,8 +1,28 @@
+import hashlib
+import json
+import os
 import re
+from collections import Counter
 
-def detect_document_type(text: str, filename: str = "") -> str:
+from utils.term_match import term_key, trie_regex
+
+# Per-type prototype phrases and filename keywords; see DocTypeClassifier
+DEFAULT_TYPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "doc_types.json")
+
+# Only the head of a document is scored: titles and recitals say what it is,
+# and long annexes would only dilute the profile
+HEAD_CHARS = int(float(os.getenv("DOC_TYPE_HEAD_KB", "16")) * 1024)
+
+UNKNOWN = "Unknown"
+
+_FILENAME_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def detect_document_type_rules(text: str, filename: str = "") -> str:
     """
     Detects the type of legal document based on its text content or filename.
+    The original first-match rules, kept as the baseline for
+    benchmarks/type_classifier_bench.py.
 
     Args:
         text (str): Extracted text from the document
@@ -31,7 +51,7 @@ def detect_document_type(text: str, filename: str = "") -> str:
         return "Balance Sheet"
     elif "accounts" in filename:
         return "Annual Accounts"
-    
+
     # Fallback: Text-based rules
     if "articles of association" in text:
         return "Articles of Association"
@@ -47,5 +67,191 @@ def detect_document_type(text: str, filename: str = "") -> str:
         return "Balance Sheet"
     elif "statement of financial position" in text:
         return "Annual Accounts"
-    
+
     return "Unknown"
+
+
+class DocTypeClassifier:
+    """
+    Nearest-centroid classifier over weighted phrase features. Every type is
+    a centroid of its prototype phrases (weight x IDF across types), so one
+    matrix product scores a whole batch of documents against all types;
+    filename keywords add a fixed bonus. Confidences are a softmax over the
+    type scores plus an "Unknown" class scored at min_score, so a document
+    matching nothing well comes out Unknown.
+
+    Each entry of types is a dict with:
+        type      -- the document type name
+        phrases   -- {phrase: weight}; whole words, case-insensitive, any
+                     whitespace between words
+        filename  -- keywords matched against filename tokens
+    """
+
+    def __init__(self, types: list, version: str = "", head_chars: int = HEAD_CHARS,
+                 filename_weight: float = 0.5, min_score: float = 0.15, temperature: float = 0.05):
+        import numpy as np
+
+        self.version = version
+        self.head_chars = head_chars
+        self.filename_weight = filename_weight
+        self.min_score = min_score
+        self.temperature = temperature
+        self.types = [t["type"] for t in types]
+        self.labels = self.types + [UNKNOWN]
+
+        weights = []
+        for t in types:
+            phrases = {}
+            for phrase, weight in t.get("phrases", {}).items():
+                key = term_key(phrase)
+                if key:
+                    phrases[key] = phrases.get(key, 0.0) + float(weight)
+            weights.append(phrases)
+        self.vocab = sorted({key for phrases in weights for key in phrases})
+        index = {key: i for i, key in enumerate(self.vocab)}
+
+        # One scan per document, as in redflags.RuleSet: the zero-width
+        # lookahead finds overlapping phrases, the longest at each position,
+        # and the whole-word prefixes it implies are counted with it
+        self._pattern = re.compile(rf"\b(?=({trie_regex(self.vocab)})\b)") if self.vocab else None
+        self._implied = {
+            key: [index[key]] + [index[key[:i]] for i in range(1, len(key)) if key[i] == " " and key[:i] in index]
+            for key in self.vocab
+        }
+
+        # Phrases shared by several types (e.g. "quorum") discriminate less
+        n_types = len(types)
+        df = Counter(key for phrases in weights for key in phrases)
+        idf = {key: np.log(1.0 + n_types / df[key]) for key in df}
+        centroids = np.zeros((n_types, len(self.vocab)), dtype=np.float32)
+        for row, phrases in enumerate(weights):
+            for key, weight in phrases.items():
+                centroids[row, index[key]] = weight * idf[key]
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+        self.centroids = centroids
+
+        self.filename_vocab = sorted({k.lower() for t in types for k in t.get("filename", [])})
+        findex = {k: i for i, k in enumerate(self.filename_vocab)}
+        keywords = np.zeros((n_types, len(self.filename_vocab)), dtype=np.float32)
+        for row, t in enumerate(types):
+            for k in t.get("filename", []):
+                keywords[row, findex[k.lower()]] = 1.0
+        self.filename_keywords = keywords
+        self._filename_index = findex
+
+    def features(self, texts: list):
+        """(documents x phrases) matrix of sublinear phrase counts, rows L2-normalised."""
+        import numpy as np
+
+        mat = np.zeros((len(texts), len(self.vocab)), dtype=np.float32)
+        if self._pattern is None:
+            return mat
+        keys = {}
+        for row, text in enumerate(texts):
+            counts = Counter(self._pattern.findall((text or "")[:self.head_chars].lower()))
+            for raw, n in counts.items():
+                key = keys.get(raw)
+                if key is None:
+                    key = keys[raw] = term_key(raw)
+                for col in self._implied[key]:
+                    mat[row, col] += n
+        np.log1p(mat, out=mat)
+        mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+        return mat
+
+    def filename_features(self, filenames: list):
+        import numpy as np
+
+        mat = np.zeros((len(filenames), len(self.filename_vocab)), dtype=np.float32)
+        for row, name in enumerate(filenames):
+            for token in _FILENAME_TOKEN.findall(os.path.basename(name or "").lower()):
+                col = self._filename_index.get(token)
+                if col is not None:
+                    mat[row, col] = 1.0
+        return mat
+
+    def scores(self, texts: list, filenames: list = None):
+        """(documents x types) raw scores: cosine to each centroid + filename bonus."""
+        import numpy as np
+
+        scores = self.features(texts) @ self.centroids.T
+        if filenames is not None:
+            hits = self.filename_features(filenames) @ self.filename_keywords.T
+            scores += self.filename_weight * np.minimum(hits, 1.0)
+        return scores
+
+    def classify_batch(self, texts: list, filenames: list = None) -> list:
+        """
+        Rank all types for each document in one pass.
+
+        Args:
+            texts: extracted document texts
+            filenames: matching filenames, or None
+
+        Returns:
+            list: per document, [(type, confidence)] best first, including
+            "Unknown"; confidences sum to 1
+        """
+        import numpy as np
+
+        if not texts:
+            return []
+        scores = self.scores(texts, filenames)
+        logits = np.hstack([scores, np.full((len(texts), 1), self.min_score, dtype=np.float32)])
+        logits = (logits - logits.max(axis=1, keepdims=True)) / self.temperature
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        order = np.argsort(-probs, axis=1)
+        return [
+            [(self.labels[col], float(probs[row, col])) for col in order[row]]
+            for row in range(len(texts))
+        ]
+
+    def classify(self, text: str, filename: str = "") -> list:
+        return self.classify_batch([text], [filename])[0]
+
+
+def load_doc_types(path: str = DEFAULT_TYPES_PATH, **kwargs) -> DocTypeClassifier:
+    """
+    Load a type prototype file and build its classifier.
+
+    Returns:
+        DocTypeClassifier: .version is a short hash of the file contents
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    data = json.loads(raw.decode("utf-8"))
+    types = data.get("types", []) if isinstance(data, dict) else data
+    version = hashlib.sha256(raw).hexdigest()[:12]
+    return DocTypeClassifier(types, version=version, **kwargs)
+
+
+_default_classifier = None
+
+
+def get_default_classifier() -> DocTypeClassifier:
+    """The bundled classifier, built once per process."""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = load_doc_types(DEFAULT_TYPES_PATH)
+    return _default_classifier
+
+
+def classify_documents(texts: list, filenames: list = None) -> list:
+    """Ranked (type, confidence) lists for a batch of documents; see DocTypeClassifier.classify_batch."""
+    return get_default_classifier().classify_batch(texts, filenames)
+
+
+def detect_document_type(text: str, filename: str = "") -> str:
+    """
+    Detects the type of legal document based on its text content and filename.
+
+    Args:
+        text (str): Extracted text from the document
+        filename (str): Optional filename; its keywords add to the text score
+
+    Returns:
+        str: The most likely document type, or 'Unknown'
+    """
+    return get_default_classifier().classify(text or "", filename)[0][0]